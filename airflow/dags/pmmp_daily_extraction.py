@@ -8,6 +8,7 @@ from airflow.utils.dates import days_ago
 from airflow.models import Variable
 from datetime import datetime, timedelta
 import logging
+import os
 
 # Configuration par défaut
 default_args = {
@@ -80,6 +81,52 @@ def analyze_extraction_results():
         db.close()
 
 
+def reconcile_statistics():
+    """Recalcule stats_globales (maintenue par triggers) et log la dérive corrigée"""
+    from database.connection import SessionLocal
+    from api.crud import reconcile_stats
+    
+    db = SessionLocal()
+    try:
+        drift = reconcile_stats(db)
+        if drift:
+            for field, (before, after) in drift.items():
+                logging.warning(f"⚠️ Dérive stats_globales.{field}: {before} -> {after}")
+        else:
+            logging.info("✅ stats_globales cohérente avec les tables sources")
+    finally:
+        db.close()
+
+
+def refresh_analytics():
+    """Rafraîchit les vues matérialisées d'analyse (séries mensuelles, tops)"""
+    from database.connection import SessionLocal
+    from api.crud import refresh_analytics_views
+    from database.data_version import bump_data_version
+    
+    db = SessionLocal()
+    try:
+        for view, seconds in refresh_analytics_views(db).items():
+            logging.info(f"  - {view} rafraîchie en {seconds:.1f}s")
+        # Statistiques réconciliées et vues rafraîchies: invalide le cache de l'API
+        logging.info(f"Version des données: {bump_data_version(db)}")
+    finally:
+        db.close()
+
+
+def purge_changes():
+    """Purge les entrées du journal des modifications au-delà de la rétention"""
+    from database.connection import SessionLocal
+    from api.crud import purge_change_log
+    
+    days = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', '30'))
+    db = SessionLocal()
+    try:
+        logging.info(f"Journal des modifications: {purge_change_log(db, days)} entrées de plus de {days} jours purgées")
+    finally:
+        db.close()
+
+
 # ============================================================================
 # TÂCHES DU DAG
 # ============================================================================
@@ -126,7 +173,28 @@ task_analyze = PythonOperator(
     dag=dag,
 )
 
-# Tâche 7: Log fin
+# Tâche 7: Réconcilier les statistiques globales
+task_reconcile_stats = PythonOperator(
+    task_id='reconcile_stats',
+    python_callable=reconcile_statistics,
+    dag=dag,
+)
+
+# Tâche 8: Rafraîchir les vues d'analyse (en dernier: données du jour complètes)
+task_refresh_analytics = PythonOperator(
+    task_id='refresh_analytics_views',
+    python_callable=refresh_analytics,
+    dag=dag,
+)
+
+# Tâche 9: Purger le journal des modifications (flux /api/v1/changes)
+task_purge_changes = PythonOperator(
+    task_id='purge_change_log',
+    python_callable=purge_changes,
+    dag=dag,
+)
+
+# Tâche 10: Log fin
 task_end = PythonOperator(
     task_id='log_end',
     python_callable=log_execution_end,
@@ -138,4 +206,4 @@ task_end = PythonOperator(
 # ============================================================================
 
 task_start >> task_check_db >> [task_scrape_consultations, task_scrape_pv, task_scrape_attributions]
-[task_scrape_consultations, task_scrape_pv, task_scrape_attributions] >> task_analyze >> task_end
+[task_scrape_consultations, task_scrape_pv, task_scrape_attributions] >> task_analyze >> task_reconcile_stats >> task_refresh_analytics >> task_purge_changes >> task_end
@@ -0,0 +1,214 @@
+"""
+Cache des réponses GET de l'API
+
+Les données ne changent qu'au passage d'un crawl: une réponse reste valide tant que la
+version des données (database/data_version.py) n'a pas bougé, sans TTL. Chaque entrée
+garde le corps brut et ses variantes précompressées (gzip, brotli si installé) avec un
+ETag fort par variante; If-None-Match donne un 304 sans toucher à la base.
+
+La mémoire est bornée en octets (CACHE_MAX_BYTES, toutes variantes comptées) en plus du
+nombre d'entrées. Les exports ne passent pas par le cache: les mettre en mémoire
+annulerait leur diffusion en flux.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # brotli optionnel: gzip seul
+    brotli = None
+
+CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '2048'))
+# Budget mémoire total du cache (corps et variantes compressées); LRU évincé au-delà
+CACHE_MAX_BYTES = int(os.getenv('API_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Au-delà, la réponse (liste volumineuse) est transmise sans être mise en cache
+CACHE_MAX_BODY = int(os.getenv('API_CACHE_MAX_BODY', str(8 * 1024 * 1024)))
+# En dessous, la compression ne vaut pas l'en-tête
+COMPRESS_MIN_SIZE = 500
+
+CACHEABLE_PREFIXES = (
+    '/api/v1/consultations', '/api/v1/pv', '/api/v1/attributions',
+    '/api/v1/stats',
+)
+# Flux SSE sans fin: jamais mis en mémoire
+EVENT_STREAM_TYPE = 'text/event-stream'
+# En-têtes de la réponse d'origine recopiés sur les réponses servies depuis le cache
+_KEPT_HEADERS = ('content-type', 'content-disposition', 'x-next-cursor', 'link')
+
+
+@dataclass
+class CachedResponse:
+    version: int
+    status_code: int
+    headers: Dict[str, str]
+    etag: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag_for(self, encoding: str) -> str:
+        # ETag fort distinct par représentation (Content-Encoding)
+        return self.etag if encoding == 'identity' else f'{self.etag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return any(self.etag_for(encoding) in tags for encoding in self.bodies)
+
+    @property
+    def size(self) -> int:
+        """Octets retenus: toutes les variantes du corps, en-têtes compris"""
+        return sum(map(len, self.bodies.values())) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+def cache_key(request) -> Tuple[str, str, str]:
+    """Clé normalisée: chemin, paramètres triés sans valeurs vides, en-tête Accept"""
+    params = sorted((k, v) for k, v in parse_qsl(request.url.query) if v != '')
+    return request.url.path, urlencode(params), request.headers.get('accept', '')
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return 'identity'
+
+
+def build_entry(version: int, status_code: int, headers, body: bytes) -> CachedResponse:
+    """Calcule l'ETag et précompresse le corps une fois pour toutes"""
+    entry = CachedResponse(
+        version=version,
+        status_code=status_code,
+        headers={k: headers[k] for k in _KEPT_HEADERS if k in headers},
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        bodies={'identity': body},
+    )
+    if len(body) >= COMPRESS_MIN_SIZE:
+        entry.bodies['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            entry.bodies['br'] = brotli.compress(body, quality=5)
+    return entry
+
+
+class ResponseCache:
+    """LRU des réponses, valide pour une version des données, borné en entrées et en octets"""
+
+    def __init__(self, version_source=None, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.version_source = version_source
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[tuple, CachedResponse]' = OrderedDict()
+        self.size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def current_version(self) -> Optional[int]:
+        return self.version_source.current() if self.version_source is not None else None
+
+    def get(self, key, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry: CachedResponse):
+        size = entry.size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            # Plus grosse que tout le budget: ne viderait le cache que pour elle
+            if size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def cached_response(entry: CachedResponse, request, status: str) -> Response:
+    encoding = choose_encoding(request.headers.get('accept-encoding', ''), entry.bodies)
+    headers = {
+        'ETag': entry.etag_for(encoding),
+        'Vary': 'Accept, Accept-Encoding',
+        'X-Cache': status,
+    }
+    if entry.matches(request.headers.get('if-none-match')):
+        return Response(status_code=304, headers=headers)
+    headers.update(entry.headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=entry.bodies[encoding], status_code=entry.status_code, headers=headers)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Sert les GET des listes, détails et statistiques depuis le ResponseCache"""
+
+    def __init__(self, app, cache: ResponseCache):
+        super().__init__(app)
+        self.cache = cache
+
+    async def dispatch(self, request, call_next):
+        if request.method != 'GET' or not request.url.path.startswith(CACHEABLE_PREFIXES):
+            return await call_next(request)
+        version = self.cache.current_version()
+        if version is None:
+            # Version inconnue (écoute non établie): pas de cache plutôt qu'un cache périmé
+            return await call_next(request)
+
+        key = cache_key(request)
+        entry = self.cache.get(key, version)
+        if entry is not None:
+            return cached_response(entry, request, 'HIT')
+
+        response = await call_next(request)
+        if (response.status_code != 200 or 'content-encoding' in response.headers
+                or response.headers.get('content-type', '').startswith(EVENT_STREAM_TYPE)):
+            return response
+
+        chunks, size, iterator = [], 0, response.body_iterator
+        async for chunk in iterator:
+            chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode(response.charset))
+            size += len(chunks[-1])
+            if size > CACHE_MAX_BODY:
+                return StreamingResponse(
+                    _resume(chunks, iterator, response.charset), status_code=response.status_code,
+                    headers=dict(response.headers), background=response.background,
+                )
+
+        entry = build_entry(version, response.status_code, response.headers, b''.join(chunks))
+        # Une écriture pendant le calcul: la réponse est servie mais pas conservée
+        if self.cache.current_version() == version:
+            self.cache.put(key, entry)
+        return cached_response(entry, request, 'MISS')
+
+
+async def _resume(head: list, iterator, charset: str):
+    """Réémet le début déjà lu puis la suite du flux d'origine"""
+    for chunk in head:
+        yield chunk
+    async for chunk in iterator:
+        yield chunk if isinstance(chunk, bytes) else chunk.encode(charset)
@@ -1,35 +1,142 @@
 """
 Fonctions CRUD pour l'accès aux données
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, load_only, raiseload, selectinload
+from sqlalchemy import func, or_, and_, any_, bindparam, tuple_, literal_column, text, select, type_coerce, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import ProgrammingError
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from datetime import date, datetime
+import base64
+import json
+import logging
+import time
 
 from database.models import (
-    Consultation, Lot, PVExtrait, Attribution, Achevement, StatutConsultation
+    Consultation, Lot, PVExtrait, Attribution, Achevement, ChangeLog, StatutConsultation,
+    v_stats_consultations, v_top_organismes, v_top_attributaires
 )
 
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# PAGINATION PAR CURSEUR (keyset)
+# ============================================================================
+
+# Clé de tri de chaque liste: (colonne de date, clé primaire), parcourue en ordre décroissant.
+# Un index composite sur ces deux colonnes sert le tri et le filtre du curseur.
+KEYSET_COLUMNS = {
+    Consultation: ('date_publication', 'id_interne'),
+    PVExtrait: ('date_publication_pv', 'id_pv'),
+    Attribution: ('date_attribution', 'id_attribution'),
+}
+
+
+def encode_cursor(sort_value: Union[date, datetime], pk: int) -> str:
+    """Encode la position (date, id) de la dernière ligne en curseur opaque"""
+    kind = 't' if isinstance(sort_value, datetime) else 'd'
+    raw = json.dumps([kind, sort_value.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Union[date, datetime], int]:
+    """Décode un curseur; ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        kind, value, pk = json.loads(raw)
+        sort_value = datetime.fromisoformat(value) if kind == 't' else date.fromisoformat(value)
+        return sort_value, int(pk)
+    except Exception:
+        raise ValueError("Curseur invalide")
+
+
+def next_cursor(rows: list, limit: int, model=None) -> Optional[str]:
+    """
+    Curseur de la page suivante (None si la page n'est pas pleine); model est requis
+    pour des lignes de colonnes, qui doivent alors inclure la date et la clé de tri
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    sort_attr, pk_attr = KEYSET_COLUMNS[model or type(last)]
+    return encode_cursor(getattr(last, sort_attr), getattr(last, pk_attr))
+
+
+def _base_query(db: Session, model, columns: Optional[list] = None):
+    """Objets ORM, ou seulement les colonnes demandées (lignes Core, sans objets ni identity map)"""
+    return db.query(*columns) if columns else db.query(model)
+
+
+def _any_of(db: Session, column, values: list):
+    """column IN values; = ANY(tableau) sous PostgreSQL: un seul paramètre, plan stable quel que soit le nombre de valeurs"""
+    if db.get_bind().dialect.name == 'postgresql':
+        return column == any_(bindparam(f'{column.key}_values', list(values), type_=ARRAY(column.type)))
+    return column.in_(list(values))
+
+
+def _paginate(query, model, limit: int, offset: int, cursor: Optional[str]):
+    """Tri (date, id) décroissant; curseur prioritaire sur offset (conservé pour compatibilité)"""
+    sort_attr, pk_attr = KEYSET_COLUMNS[model]
+    sort_column, pk_column = getattr(model, sort_attr), getattr(model, pk_attr)
+    query = query.order_by(sort_column.desc(), pk_column.desc())
+    if cursor:
+        sort_value, pk = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, pk_column) < tuple_(sort_value, pk))
+    elif offset:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+# ============================================================================
+# FILTRES TEXTE (organisme, entreprise)
+# ============================================================================
+
+# exact/prefix: index B-tree lower(col) text_pattern_ops; contains/fuzzy: index GIN pg_trgm
+# (database/migrations/003_text_filter_indexes.sql)
+MATCH_MODES = ('contains', 'exact', 'prefix', 'fuzzy')
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def match_filter(db: Session, column, value: str, mode: str = 'contains'):
+    """
+    Condition de filtre texte insensible à la casse:
+    - contains: col ILIKE '%valeur%' (comportement historique, par défaut)
+    - exact:    lower(col) = lower(valeur)
+    - prefix:   lower(col) LIKE 'valeur%'
+    - fuzzy:    contains ou similarité trigramme (fautes de frappe, PostgreSQL seulement);
+                sur demande explicite: ONEE correspond aussi à ONEP
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Mode de correspondance invalide: {mode} (attendu: {', '.join(MATCH_MODES)})")
+    if mode == 'exact':
+        return func.lower(column) == value.lower()
+    if mode == 'prefix':
+        return func.lower(column).like(_escape_like(value.lower()) + '%', escape='\\')
+    substring = column.ilike('%' + _escape_like(value) + '%', escape='\\')
+    if mode == 'contains' or db.get_bind().dialect.name != 'postgresql':
+        return substring
+    return or_(substring, column.op('%')(value))
+
 
 # ============================================================================
 # CONSULTATIONS
 # ============================================================================
 
-def get_consultations(
+def filter_consultations(
     db: Session,
+    query,
     statut: Optional[str] = None,
     type_marche: Optional[str] = None,
     organisme: Optional[str] = None,
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
-    limit: int = 100,
-    offset: int = 0
-) -> List[Consultation]:
-    """Récupère les consultations avec filtres"""
-    
-    query = db.query(Consultation)
-    
-    # Filtres
+    organisme_match: str = 'contains'
+):
+    """Applique les filtres de la liste des consultations (liste et export)"""
     if statut:
         query = query.filter(Consultation.statut == statut)
     
@@ -37,7 +144,7 @@ def get_consultations(
         query = query.filter(Consultation.type_marche == type_marche)
     
     if organisme:
-        query = query.filter(Consultation.organisme_acronyme.ilike(f"%{organisme}%"))
+        query = query.filter(match_filter(db, Consultation.organisme_acronyme, organisme, organisme_match))
     
     if date_debut:
         query = query.filter(Consultation.date_publication >= date_debut)
@@ -45,13 +152,62 @@ def get_consultations(
     if date_fin:
         query = query.filter(Consultation.date_publication <= date_fin)
     
+    return query
+
+
+def get_consultations(
+    db: Session,
+    statut: Optional[str] = None,
+    type_marche: Optional[str] = None,
+    organisme: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    organisme_match: str = 'contains',
+    columns: Optional[list] = None
+) -> List[Consultation]:
+    """Récupère les consultations avec filtres"""
+    
+    query = filter_consultations(
+        db, _base_query(db, Consultation, columns), statut=statut, type_marche=type_marche, organisme=organisme,
+        date_debut=date_debut, date_fin=date_fin, organisme_match=organisme_match
+    )
+    
     # Tri et pagination
-    query = query.order_by(Consultation.date_publication.desc())
-    query = query.offset(offset).limit(limit)
+    query = _paginate(query, Consultation, limit, offset, cursor)
     
     return query.all()
 
 
+# Colonnes de l'export CSV, dans l'ordre du fichier
+EXPORT_COLUMNS = [
+    Consultation.ref_consultation, Consultation.titre, Consultation.organisme_acronyme,
+    Consultation.type_marche, Consultation.statut, Consultation.date_publication,
+    Consultation.date_limite, Consultation.montant_estime,
+]
+EXPORT_BATCH_SIZE = 2000
+
+
+def iter_export_consultations(db: Session, batch_size: int = EXPORT_BATCH_SIZE, **filters) -> Iterator[list]:
+    """
+    Lignes de l'export par lots de batch_size, sans limite de nombre
+
+    yield_per ouvre un curseur côté serveur (stream_results): seul le lot courant
+    est en mémoire, quelle que soit la taille du résultat. Tuples de colonnes,
+    pas d'objets ORM.
+    """
+    query = filter_consultations(db, db.query(*EXPORT_COLUMNS), **filters).order_by(
+        Consultation.date_publication.desc(), Consultation.id_interne.desc()
+    )
+    result = db.execute(query.statement.execution_options(yield_per=batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
 def get_consultation_by_ref(db: Session, ref: str) -> Optional[Consultation]:
     """Récupère une consultation par sa référence"""
     return db.query(Consultation).filter(
@@ -59,19 +215,89 @@ def get_consultation_by_ref(db: Session, ref: str) -> Optional[Consultation]:
     ).first()
 
 
-def search_consultations(db: Session, search_term: str, limit: int = 100) -> List[Consultation]:
-    """Recherche full-text dans les consultations"""
+def get_consultations_by_refs(db: Session, refs: List[str], columns: Optional[list] = None) -> list:
+    """
+    Consultations des références données en une seule requête (index unique sur
+    ref_consultation); ordre quelconque, références inconnues absentes du résultat
+    """
+    return _base_query(db, Consultation, columns).filter(
+        _any_of(db, Consultation.ref_consultation, dict.fromkeys(refs))
+    ).all()
+
+
+def get_consultation_lifecycle(
+    db: Session,
+    ref: str,
+    fields: Optional[List[str]] = None,
+    relations: Optional[Dict[str, List[str]]] = None
+) -> Optional[Consultation]:
+    """
+    Consultation et les relations demandées (lots, pv_extraits, attributions, achevements)
+
+    Chaque relation est chargée d'avance par selectinload: une requête pour la
+    consultation puis une par relation, quel que soit le nombre de lignes.
+    fields / relations limitent les colonnes lues (load_only); tout autre accès
+    lèverait une erreur au lieu d'émettre une requête paresseuse.
+    """
+    options = []
+    for name, columns in (relations or {}).items():
+        related = getattr(Consultation, name).property.mapper.class_
+        options.append(selectinload(getattr(Consultation, name)).load_only(
+            *[getattr(related, column) for column in columns], related.ref_consultation, raiseload=True
+        ))
+    if fields is not None:
+        options.append(load_only(
+            *[getattr(Consultation, field) for field in fields], Consultation.ref_consultation, raiseload=True
+        ))
+    return db.query(Consultation).options(*options, raiseload('*')).filter(
+        Consultation.ref_consultation == ref
+    ).first()
+
+
+# Colonne tsvector générée (database/migrations/002_consultations_fulltext.sql),
+# volontairement absente du modèle: elle n'existe que sous PostgreSQL
+SEARCH_VECTOR = literal_column('consultations.search_vector')
+
+
+def fulltext_search_query(db: Session, search_term: str, columns: Optional[list] = None):
+    """Requête plein texte (index GIN sur search_vector) triée par ts_rank puis date"""
+    tsquery = func.websearch_to_tsquery('french', func.f_unaccent(search_term))
+    rank = func.ts_rank(SEARCH_VECTOR, tsquery)
+    return _base_query(db, Consultation, columns).filter(
+        SEARCH_VECTOR.op('@@')(tsquery)
+    ).order_by(
+        rank.desc(), Consultation.date_publication.desc(), Consultation.id_interne.desc()
+    )
+
+
+def ilike_search_query(db: Session, search_term: str, columns: Optional[list] = None):
+    """Recherche par sous-chaîne (ILIKE, sans index); référence du benchmark et repli hors PostgreSQL"""
     search = f"%{search_term}%"
-    
-    query = db.query(Consultation).filter(
+    return _base_query(db, Consultation, columns).filter(
         or_(
             Consultation.titre.ilike(search),
             Consultation.objet.ilike(search),
             Consultation.ref_consultation.ilike(search)
         )
-    ).order_by(Consultation.date_publication.desc()).limit(limit)
-    
-    return query.all()
+    ).order_by(Consultation.date_publication.desc(), Consultation.id_interne.desc())
+
+
+def search_consultations(
+    db: Session,
+    search_term: str,
+    limit: int = 100,
+    offset: int = 0,
+    columns: Optional[list] = None
+) -> List[Consultation]:
+    """
+    Recherche plein texte dans les consultations (titre, objet, référence), triée par pertinence.
+    La requête accepte la syntaxe websearch ("mots exacts", OR, -exclu) et ignore les accents.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        query = fulltext_search_query(db, search_term, columns)
+    else:
+        query = ilike_search_query(db, search_term, columns)
+    return query.offset(offset).limit(limit).all()
 
 
 # ============================================================================
@@ -85,17 +311,20 @@ def get_pvs(
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    organisme_match: str = 'contains',
+    columns: Optional[list] = None
 ) -> List[PVExtrait]:
     """Récupère les PV avec filtres"""
     
-    query = db.query(PVExtrait)
+    query = _base_query(db, PVExtrait, columns)
     
     if ref_consultation:
         query = query.filter(PVExtrait.ref_consultation == ref_consultation)
     
     if organisme:
-        query = query.filter(PVExtrait.organisme_acronyme.ilike(f"%{organisme}%"))
+        query = query.filter(match_filter(db, PVExtrait.organisme_acronyme, organisme, organisme_match))
     
     if date_debut:
         query = query.filter(PVExtrait.date_publication_pv >= date_debut)
@@ -103,8 +332,7 @@ def get_pvs(
     if date_fin:
         query = query.filter(PVExtrait.date_publication_pv <= date_fin)
     
-    query = query.order_by(PVExtrait.date_publication_pv.desc())
-    query = query.offset(offset).limit(limit)
+    query = _paginate(query, PVExtrait, limit, offset, cursor)
     
     return query.all()
 
@@ -123,20 +351,24 @@ def get_attributions(
     montant_min: Optional[float] = None,
     montant_max: Optional[float] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    entreprise_match: str = 'contains',
+    organisme_match: str = 'contains',
+    columns: Optional[list] = None
 ) -> List[Attribution]:
     """Récupère les attributions avec filtres"""
     
-    query = db.query(Attribution)
+    query = _base_query(db, Attribution, columns)
     
     if ref_consultation:
         query = query.filter(Attribution.ref_consultation == ref_consultation)
     
     if entreprise:
-        query = query.filter(Attribution.entreprise_nom.ilike(f"%{entreprise}%"))
+        query = query.filter(match_filter(db, Attribution.entreprise_nom, entreprise, entreprise_match))
     
     if organisme:
-        query = query.filter(Attribution.organisme_acronyme.ilike(f"%{organisme}%"))
+        query = query.filter(match_filter(db, Attribution.organisme_acronyme, organisme, organisme_match))
     
     if date_debut:
         query = query.filter(Attribution.date_attribution >= date_debut)
@@ -150,8 +382,7 @@ def get_attributions(
     if montant_max:
         query = query.filter(Attribution.montant_ttc <= montant_max)
     
-    query = query.order_by(Attribution.date_attribution.desc())
-    query = query.offset(offset).limit(limit)
+    query = _paginate(query, Attribution, limit, offset, cursor)
     
     return query.all()
 
@@ -160,13 +391,66 @@ def get_attributions(
 # STATISTIQUES
 # ============================================================================
 
+# Ligne unique maintenue par les triggers de la migration 004 (stats_globales)
+STATS_FIELDS = [
+    'total_consultations', 'consultations_en_cours', 'total_attributions',
+    'montant_total_estime', 'montant_total_attribue', 'nombre_organismes',
+    'nombre_entreprises', 'derniere_extraction',
+]
+
+
+def _read_stats_row(db: Session) -> Optional[dict]:
+    row = db.execute(
+        text(f"SELECT {', '.join(STATS_FIELDS)} FROM stats_globales WHERE id = 1")
+    ).mappings().first()
+    if row is None:
+        return None
+    stats = dict(row)
+    for key in ('montant_total_estime', 'montant_total_attribue'):
+        stats[key] = float(stats[key] or 0)
+    return stats
+
+
 def get_stats(db: Session) -> dict:
-    """Calcule les statistiques globales"""
+    """
+    Statistiques globales: lecture de la ligne stats_globales (O(1)) sur PostgreSQL,
+    agrégation complète (compute_stats) sinon ou si la migration 004 n'est pas appliquée
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        try:
+            stats = _read_stats_row(db)
+        except ProgrammingError:
+            db.rollback()
+            logger.warning("Table stats_globales absente, agrégation complète")
+            stats = None
+        if stats is not None:
+            return stats
+    return compute_stats(db)
+
+
+def reconcile_stats(db: Session) -> dict:
+    """
+    Recalcule stats_globales depuis les tables sources (reconcile_stats_globales())
+    et retourne la dérive corrigée par champ: {champ: (avant, après)}
+    """
+    before = _read_stats_row(db) or {}
+    db.execute(text("SELECT reconcile_stats_globales()"))
+    db.commit()
+    after = _read_stats_row(db)
+    return {
+        key: (before.get(key), after[key])
+        for key in STATS_FIELDS
+        if before.get(key) != after[key]
+    }
+
+
+def compute_stats(db: Session) -> dict:
+    """Calcule les statistiques globales par agrégation complète des tables sources"""
     
     total_consultations = db.query(func.count(Consultation.id_interne)).scalar()
     
     consultations_en_cours = db.query(func.count(Consultation.id_interne)).filter(
-        Consultation.statut == 'en_cours'
+        Consultation.statut == StatutConsultation.EN_COURS
     ).scalar()
     
     total_attributions = db.query(func.count(Attribution.id_attribution)).scalar()
@@ -201,3 +485,232 @@ def get_stats(db: Session) -> dict:
         "nombre_entreprises": nombre_entreprises,
         "derniere_extraction": derniere_extraction
     }
+
+
+# ============================================================================
+# ANALYSES (vues matérialisées, migration 005)
+# ============================================================================
+
+ANALYTICS_VIEWS = [v_stats_consultations, v_top_organismes, v_top_attributaires]
+
+
+def _month(db: Session, column):
+    if db.get_bind().dialect.name == 'sqlite':
+        # Format de stockage DateTime de SQLAlchemy sous SQLite (comparaisons textuelles)
+        return type_coerce(func.strftime('%Y-%m-01 00:00:00.000000', column), DateTime)
+    return func.date_trunc('month', column)
+
+
+def _analytics_fallback(db: Session, view):
+    """Même agrégation que la vue matérialisée, calculée à la volée (hors PostgreSQL)"""
+    if view is v_stats_consultations:
+        mois = _month(db, Consultation.date_publication)
+        return select(
+            mois.label('mois'),
+            Consultation.type_marche,
+            Consultation.statut,
+            func.count().label('nombre_consultations'),
+            func.count(Consultation.montant_estime).label('nombre_montants'),
+            func.coalesce(func.sum(Consultation.montant_estime), 0).label('montant_total_estime'),
+            func.avg(Consultation.montant_estime).label('montant_moyen_estime'),
+        ).group_by(mois, Consultation.type_marche, Consultation.statut)
+    if view is v_top_organismes:
+        return select(
+            Consultation.organisme_acronyme,
+            func.max(Consultation.organisme_nom_complet).label('organisme_nom_complet'),
+            func.count().label('nombre_consultations'),
+            func.coalesce(func.sum(Consultation.montant_estime), 0).label('montant_total_estime'),
+            func.max(Consultation.date_publication).label('derniere_publication'),
+        ).group_by(Consultation.organisme_acronyme)
+    return select(
+        Attribution.entreprise_nom,
+        func.max(Attribution.entreprise_ville).label('entreprise_ville'),
+        func.count().label('nombre_marches'),
+        func.coalesce(func.sum(Attribution.montant_ttc), 0).label('montant_total_ttc'),
+        func.avg(Attribution.montant_ttc).label('montant_moyen_ttc'),
+    ).group_by(Attribution.entreprise_nom)
+
+
+def analytics_source(db: Session, view):
+    """
+    Vue matérialisée sur PostgreSQL (lignes précalculées uniquement); ailleurs
+    (tests SQLite) sous-requête équivalente sur les tables sources
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        return view
+    return _analytics_fallback(db, view).subquery(view.name)
+
+
+def get_stats_mensuelles(
+    db: Session,
+    type_marche: Optional[str] = None,
+    statut: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None
+) -> List[dict]:
+    """Série mensuelle des consultations (nombre, montants), filtrable par type et statut"""
+    v = analytics_source(db, v_stats_consultations)
+    query = db.query(
+        v.c.mois,
+        func.sum(v.c.nombre_consultations).label('nombre_consultations'),
+        func.sum(v.c.nombre_montants).label('nombre_montants'),
+        func.sum(v.c.montant_total_estime).label('montant_total_estime'),
+    )
+
+    if type_marche:
+        query = query.filter(v.c.type_marche == type_marche)
+
+    if statut:
+        query = query.filter(v.c.statut == statut)
+
+    if date_debut:
+        query = query.filter(v.c.mois >= datetime(date_debut.year, date_debut.month, 1))
+
+    if date_fin:
+        query = query.filter(v.c.mois <= datetime(date_fin.year, date_fin.month, 1))
+
+    rows = query.group_by(v.c.mois).order_by(v.c.mois).all()
+    return [
+        {
+            "mois": r.mois,
+            "nombre_consultations": int(r.nombre_consultations),
+            "montant_total_estime": float(r.montant_total_estime or 0),
+            # Moyenne recalculée sur les montants renseignés, pas moyenne des moyennes
+            "montant_moyen_estime": (
+                float(r.montant_total_estime) / r.nombre_montants if r.nombre_montants else None
+            ),
+        }
+        for r in rows
+    ]
+
+
+def get_top_organismes(db: Session, limit: int = 20) -> List[dict]:
+    """Top des organismes par nombre de consultations"""
+    v = analytics_source(db, v_top_organismes)
+    rows = db.query(v).order_by(
+        v.c.nombre_consultations.desc(), v.c.organisme_acronyme
+    ).limit(limit).all()
+    return [
+        {
+            "acronyme": r.organisme_acronyme,
+            "nom": r.organisme_nom_complet,
+            "nombre_consultations": r.nombre_consultations,
+            "montant_total": float(r.montant_total_estime or 0),
+            "derniere_publication": r.derniere_publication,
+        }
+        for r in rows
+    ]
+
+
+def get_top_attributaires(db: Session, limit: int = 20) -> List[dict]:
+    """Top des entreprises attributaires par nombre de marchés"""
+    v = analytics_source(db, v_top_attributaires)
+    rows = db.query(v).order_by(
+        v.c.nombre_marches.desc(), v.c.entreprise_nom
+    ).limit(limit).all()
+    return [
+        {
+            "entreprise": r.entreprise_nom,
+            "ville": r.entreprise_ville,
+            "nombre_marches": r.nombre_marches,
+            "montant_total_ttc": float(r.montant_total_ttc or 0),
+            "montant_moyen_ttc": float(r.montant_moyen_ttc) if r.montant_moyen_ttc is not None else None,
+        }
+        for r in rows
+    ]
+
+
+def refresh_analytics_views(db: Session) -> dict:
+    """
+    Rafraîchit les vues matérialisées sans bloquer les lectures (CONCURRENTLY, via leur
+    index unique); retourne la durée en secondes par vue
+    """
+    durations = {}
+    for view in ANALYTICS_VIEWS:
+        start = time.perf_counter()
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+        db.commit()
+        durations[view.name] = time.perf_counter() - start
+    return durations
+
+
+# ============================================================================
+# FLUX DE MODIFICATIONS (change_log, migration 007)
+# ============================================================================
+
+# Tables journalisées et leur clé primaire
+CHANGE_TABLES = {
+    'consultations': (Consultation, 'id_interne'),
+    'pv_extraits': (PVExtrait, 'id_pv'),
+    'attributions': (Attribution, 'id_attribution'),
+}
+
+
+class ChangeCursorExpired(Exception):
+    """Le curseur précède la dernière purge du journal: resynchronisation complète requise"""
+
+
+def encode_change_cursor(txid: int, seq: int) -> str:
+    raw = json.dumps(['c', txid, seq], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    """Décode un curseur du flux; ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        kind, txid, seq = json.loads(raw)
+        if kind != 'c':
+            raise ValueError
+        return int(txid), int(seq)
+    except Exception:
+        raise ValueError("Curseur invalide")
+
+
+def _visible_changes(db: Session):
+    """Entrées des transactions terminées (sous le filigrane); tout le journal hors PostgreSQL"""
+    query = db.query(ChangeLog)
+    if db.get_bind().dialect.name == 'postgresql':
+        watermark = db.execute(text("SELECT change_log_watermark()")).scalar()
+        query = query.filter(ChangeLog.txid < watermark)
+    return query
+
+
+def get_changes(db: Session, since: Optional[Tuple[int, int]] = None, limit: int = 1000) -> List[ChangeLog]:
+    """
+    Entrées du journal après la position since, dans l'ordre (txid, seq)
+
+    Coût proportionnel au nombre de modifications (index sur txid, seq), pas à la
+    taille des tables. ChangeCursorExpired si since précède la dernière purge.
+    """
+    if since is not None and db.get_bind().dialect.name == 'postgresql':
+        horizon = db.execute(text("SELECT txid, seq FROM change_log_horizon WHERE id = 1")).first()
+        if horizon is not None and since < tuple(horizon):
+            raise ChangeCursorExpired("Curseur antérieur à la purge du journal")
+    query = _visible_changes(db)
+    if since is not None:
+        query = query.filter(tuple_(ChangeLog.txid, ChangeLog.seq) > tuple_(*since))
+    return query.order_by(ChangeLog.txid, ChangeLog.seq).limit(limit).all()
+
+
+def get_change_head(db: Session) -> Tuple[int, int]:
+    """Position de la dernière entrée visible: point de départ après un chargement complet"""
+    last = _visible_changes(db).order_by(ChangeLog.txid.desc(), ChangeLog.seq.desc()).first()
+    return (last.txid, last.seq) if last else (0, 0)
+
+
+def get_rows_by_ids(db: Session, table: str, ids: list, columns: list) -> dict:
+    """Lignes actuelles d'une table journalisée, par clé primaire (une requête)"""
+    model, pk_attr = CHANGE_TABLES[table]
+    pk_column = getattr(model, pk_attr)
+    rows = db.query(pk_column, *columns).filter(_any_of(db, pk_column, ids)).all()
+    return {row[0]: row[1:] for row in rows}
+
+
+def purge_change_log(db: Session, days: int) -> int:
+    """Supprime les entrées de plus de days jours (PostgreSQL); retourne leur nombre"""
+    if db.get_bind().dialect.name != 'postgresql':
+        return 0
+    deleted = db.execute(text("SELECT purge_change_log(:days)"), {'days': days}).scalar()
+    db.commit()
+    return deleted
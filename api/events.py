@@ -0,0 +1,147 @@
+"""
+Diffusion en direct des consultations insérées ou modifiées (Server-Sent Events)
+
+Un seul écouteur par processus (LISTEN pmmp_consultations, migration 008) relit les
+lignes notifiées en une requête et les répartit en mémoire entre les abonnés SSE,
+filtres appliqués côté serveur. Chaque abonné a un tampon borné: un client trop lent
+reçoit un événement overflow et la connexion est fermée (il se resynchronise via
+/api/v1/changes) au lieu de faire grossir la mémoire du serveur.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import orjson
+
+from api.crud import get_rows_by_ids
+from api.schemas import ConsultationResponse
+from api.serialization import rows_to_dicts, schema_columns
+from database.listener import PostgresListener
+from database.models import Consultation
+
+logger = logging.getLogger(__name__)
+
+CONSULTATIONS_CHANNEL = 'pmmp_consultations'
+SSE_BUFFER_SIZE = int(os.getenv('API_SSE_BUFFER_SIZE', '100'))
+# Commentaire périodique: garde la connexion ouverte derrière les proxys
+SSE_HEARTBEAT = float(os.getenv('API_SSE_HEARTBEAT', '15'))
+
+# Marqueur de fin placé dans la file d'un abonné débordé
+OVERFLOW = object()
+
+
+class Subscriber:
+    """File bornée d'un client SSE, alimentée depuis le thread d'écoute"""
+
+    def __init__(self, loop, organisme: Optional[str] = None, type_marche: Optional[str] = None,
+                 buffer_size: int = SSE_BUFFER_SIZE):
+        self.loop = loop
+        self.organisme = organisme.upper() if organisme else None
+        self.type_marche = type_marche
+        self.buffer_size = buffer_size
+        # Non bornée: la limite est appliquée par offer(), qui garde une place pour OVERFLOW
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.overflowed = False
+
+    def accepts(self, consultation: dict) -> bool:
+        if self.organisme and (consultation.get('organisme_acronyme') or '').upper() != self.organisme:
+            return False
+        if self.type_marche and consultation.get('type_marche') != self.type_marche:
+            return False
+        return True
+
+    def offer(self, event):
+        """Appelé dans la boucle de l'abonné (call_soon_threadsafe)"""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.buffer_size:
+            self.overflowed = True
+            self.queue.put_nowait(OVERFLOW)
+            return
+        self.queue.put_nowait(event)
+
+
+class ConsultationBroadcaster(PostgresListener):
+    """Écouteur partagé et répartition des événements entre abonnés"""
+
+    def __init__(self, engine, session_factory, channel: str = CONSULTATIONS_CHANNEL, **kwargs):
+        super().__init__(engine, channel, **kwargs)
+        self.session_factory = session_factory
+        self.fields = list(ConsultationResponse.model_fields)
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    @property
+    def subscribers(self) -> List[Subscriber]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def subscribe(self, **filters) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop(), **filters)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def on_notify(self, payloads: List[str]):
+        changes = []
+        for payload in payloads:
+            operation, _, row_id = payload.partition(':')
+            changes.append((operation, int(row_id)))
+        if self.subscribers:
+            self.dispatch(changes)
+
+    def dispatch(self, changes: List[Tuple[str, int]]):
+        """Relit les consultations notifiées (une requête) et publie les événements"""
+        db = self.session_factory()
+        try:
+            ids = list(dict.fromkeys(row_id for _, row_id in changes))
+            rows = get_rows_by_ids(db, 'consultations', ids, schema_columns(Consultation, self.fields))
+        finally:
+            db.close()
+        current = dict(zip(rows, rows_to_dicts(rows.values(), self.fields)))
+        # Une ligne supprimée depuis la notification n'est pas diffusée
+        self.publish([
+            {'operation': operation, 'consultation': current[row_id]}
+            for operation, row_id in changes if row_id in current
+        ])
+
+    def publish(self, events: List[dict]):
+        """Répartit les événements entre les abonnés dont les filtres correspondent (thread-safe)"""
+        for subscriber in self.subscribers:
+            for event in events:
+                if subscriber.accepts(event['consultation']):
+                    try:
+                        subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+                    except RuntimeError:  # boucle fermée: client parti entre-temps
+                        break
+
+
+def format_event(event: dict) -> bytes:
+    return b'event: consultation\ndata: ' + orjson.dumps(event) + b'\n\n'
+
+
+async def event_stream(broadcaster: ConsultationBroadcaster, heartbeat: float = SSE_HEARTBEAT, **filters):
+    """Flux text/event-stream d'un abonné; abonné au premier envoi, désabonné à la déconnexion"""
+    subscriber = broadcaster.subscribe(**filters)
+    try:
+        # Délai de reconnexion conseillé au client (ms)
+        yield b'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield b': ping\n\n'
+                continue
+            if event is OVERFLOW:
+                yield b'event: overflow\ndata: {}\n\n'
+                break
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
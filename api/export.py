@@ -0,0 +1,183 @@
+"""
+Sérialisation en flux des exports (API et scripts/export_data.py)
+
+Les lignes arrivent par lots (curseur serveur, yield_per) et chaque lot est écrit
+puis émis aussitôt: la mémoire reste celle d'un lot, quelle que soit la taille de
+l'export.
+- CSV: csv_stream (gzip optionnel à la volée)
+- Colonnaire: lots Arrow typés (décimaux, dates, dictionnaires) pour le flux
+  Arrow IPC de l'API et les fichiers Parquet du script; nécessite pyarrow
+"""
+import csv
+import enum
+import io
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, select
+
+from database.models import Attribution, Consultation, Lot, PVExtrait
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow optionnel: exports colonnaires indisponibles
+    pa = None
+
+
+def export_value(value):
+    """Valeur de cellule: '' pour NULL, valeur des enums, dates ISO 8601"""
+    if value is None:
+        return ''
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def csv_stream(fieldnames: List[str], batches: Iterable[list], compress: bool = False) -> Iterator[bytes]:
+    """
+    CSV UTF-8 émis lot par lot; compress=True produit un flux gzip à la volée
+    (compressobj: pas de fichier ni de corps complet en mémoire)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # wbits=31: en-tête et somme de contrôle gzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor is not None else data
+
+    writer.writerow(fieldnames)
+    yield drain()
+    for rows in batches:
+        writer.writerows([export_value(value) for value in row] for row in rows)
+        chunk = drain()
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+# ============================================================================
+# EXPORT COLONNAIRE (Arrow IPC / Parquet)
+# ============================================================================
+
+# Colonnes exportées par table (HTML archivé et URLs exclus)
+COLUMNAR_TABLES = {
+    'consultations': [
+        Consultation.id_interne, Consultation.ref_consultation, Consultation.organisme_acronyme,
+        Consultation.titre, Consultation.objet, Consultation.type_marche, Consultation.statut,
+        Consultation.date_publication, Consultation.date_limite, Consultation.date_seance,
+        Consultation.montant_estime, Consultation.cautionnement_provisoire,
+        Consultation.organisme_nom_complet, Consultation.organisme_ville, Consultation.secteur,
+        Consultation.code_cpv, Consultation.date_extraction,
+    ],
+    'lots': [
+        Lot.id_lot, Lot.ref_consultation, Lot.numero_lot, Lot.designation,
+        Lot.montant_estime, Lot.cautionnement_provisoire, Lot.cautionnement_definitif,
+        Lot.delai_execution, Lot.date_extraction,
+    ],
+    'pv': [
+        PVExtrait.id_pv, PVExtrait.ref_consultation, PVExtrait.organisme_acronyme,
+        PVExtrait.type_pv, PVExtrait.date_seance, PVExtrait.date_publication_pv,
+        PVExtrait.nombre_soumissionnaires, PVExtrait.date_extraction,
+    ],
+    'attributions': [
+        Attribution.id_attribution, Attribution.ref_consultation, Attribution.organisme_acronyme,
+        Attribution.date_attribution, Attribution.date_publication, Attribution.entreprise_nom,
+        Attribution.entreprise_ice, Attribution.entreprise_ville, Attribution.montant_ht,
+        Attribution.montant_ttc, Attribution.taux_rabais, Attribution.numero_lot,
+        Attribution.delai_execution, Attribution.date_extraction,
+    ],
+}
+
+# Peu de valeurs distinctes: encodage dictionnaire (index int32 + valeurs uniques)
+DICTIONARY_COLUMNS = {'organisme_acronyme', 'type_marche', 'statut'}
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow n'est pas installé (pip install pyarrow)")
+
+
+def arrow_type(column):
+    """Type Arrow d'une colonne SQLAlchemy"""
+    if column.key in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    sql_type = column.type
+    if isinstance(sql_type, Numeric):
+        return pa.decimal128(sql_type.precision, sql_type.scale)
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(table: str):
+    require_pyarrow()
+    return pa.schema([
+        pa.field(column.key, arrow_type(column), nullable=column.nullable)
+        for column in COLUMNAR_TABLES[table]
+    ])
+
+
+def iter_table_batches(db, table: str, batch_size: int = 10000) -> Iterator[list]:
+    """Tuples de colonnes par lots (curseur serveur), sans objets ORM"""
+    columns = COLUMNAR_TABLES[table]
+    stmt = select(*columns).order_by(columns[0]).execution_options(yield_per=batch_size)
+    result = db.execute(stmt)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def to_record_batch(schema, rows: list):
+    """Transpose un lot de tuples en colonnes Arrow typées"""
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_dictionary(field.type):
+            values = [v.value if isinstance(v, enum.Enum) else v for v in values]
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            array = pa.array(values, type=field.type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(db, table: str, batch_size: int = 10000):
+    schema = arrow_schema(table)
+    for rows in iter_table_batches(db, table, batch_size):
+        yield to_record_batch(schema, rows)
+
+
+def arrow_ipc_stream(db, table: str, batch_size: int = 10000) -> Iterator[bytes]:
+    """Format Arrow IPC streaming: schéma puis un message par lot, émis au fil de l'eau"""
+    schema = arrow_schema(table)
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield drain()
+        for batch in iter_record_batches(db, table, batch_size):
+            writer.write_batch(batch)
+            yield drain()
+    # Marqueur de fin de flux écrit à la fermeture
+    yield drain()
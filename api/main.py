@@ -1,39 +1,105 @@
 """
 API REST FastAPI pour accéder aux données du PMMP
 """
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
-import csv
-import io
+from contextlib import asynccontextmanager
 import logging
+import os
 
-from database.connection import get_db
+import anyio
+
+from database.connection import engine, get_db, SessionLocal, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from database.data_version import PostgresDataVersion
+from api.cache import EVENT_STREAM_TYPE, ResponseCache, ResponseCacheMiddleware
+from api.events import ConsultationBroadcaster, event_stream
+from api.export import (
+    csv_stream, arrow_ipc_stream, require_pyarrow, COLUMNAR_TABLES, ARROW_STREAM_MEDIA_TYPE
+)
 from api.schemas import (
-    ConsultationResponse, ConsultationDetail, PVResponse, 
-    AttributionResponse, StatsResponse
+    ConsultationResponse, ConsultationDetail, LotResponse, PVResponse,
+    AttributionResponse, AchevementResponse, StatsResponse, MatchMode,
+    BatchLookupRequest, BatchLookupItem,
+    StatsMensuelleResponse, TopOrganismeResponse, TopAttributaireResponse
 )
 from api.crud import (
-    get_consultations, get_consultation_by_ref, get_pvs,
-    get_attributions, get_stats, search_consultations
+    get_consultations, get_consultations_by_refs, get_consultation_lifecycle, get_pvs,
+    get_attributions, get_stats, search_consultations, next_cursor,
+    get_stats_mensuelles, get_top_organismes, get_top_attributaires,
+    iter_export_consultations, EXPORT_COLUMNS, KEYSET_COLUMNS,
+    CHANGE_TABLES, ChangeCursorExpired, decode_change_cursor, encode_change_cursor,
+    get_changes, get_change_head, get_rows_by_ids
+)
+from api.serialization import (
+    LIST_RESPONSES, NDJSON, STREAM_CHUNK, iter_encoded, negotiate, object_to_dict, parse_fields,
+    render, render_one, rows_to_dicts, schema_columns
 )
+from database.models import Attribution, Consultation, PVExtrait
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# Les endpoints qui utilisent la base sont synchrones (def): FastAPI les exécute dans
+# le threadpool d'anyio et une requête lente ne bloque plus la boucle asyncio. Un thread
+# par connexion du pool: au-delà, les threads attendraient une connexion libre.
+API_THREADPOOL_SIZE = int(os.getenv('API_THREADPOOL_SIZE', str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
+
+def configure_threadpool(size: int = API_THREADPOOL_SIZE) -> None:
+    """Dimensionne le threadpool de la boucle courante (40 threads par défaut dans anyio)"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Dimensionne le threadpool, suit la version des données (cache des réponses) et
+    écoute les consultations modifiées (flux SSE)
+    """
+    configure_threadpool()
+    listeners = []
+    if os.getenv('API_CACHE_ENABLED', 'True') == 'True' and engine.dialect.name == 'postgresql':
+        listener = PostgresDataVersion(engine)
+        response_cache.version_source = listener
+        listeners.append(listener)
+    else:
+        logger.info("Cache des réponses désactivé")
+    if engine.dialect.name == 'postgresql':
+        listeners.append(consultation_events)
+    else:
+        logger.info("Flux SSE des consultations sans écoute (PostgreSQL requis)")
+    for listener in listeners:
+        listener.start()
+    yield
+    for listener in listeners:
+        listener.stop()
+
+
 # Création de l'app FastAPI
 app = FastAPI(
     title="API PMMP - Portail Marchés Publics Marocains",
     description="API pour accéder aux données des marchés publics marocains",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Cache des réponses GET, invalidé par la version des données (ajouté avant CORS:
+# le middleware CORS l'enveloppe et ses en-têtes s'appliquent aussi aux réponses en cache)
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+# Écouteur partagé des consultations modifiées, réparti entre les clients SSE
+consultation_events = ConsultationBroadcaster(engine, SessionLocal)
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -41,7 +107,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", "X-Cache"],
+)
+
+
+CURSOR_DESCRIPTION = "Curseur opaque de pagination (en-tête X-Next-Cursor de la page précédente); prioritaire sur offset"
+MATCH_DESCRIPTION = (
+    "Correspondance: contains (sous-chaîne, par défaut), exact, prefix (début) "
+    "ou fuzzy (sous-chaîne et valeurs proches: fautes de frappe)"
 )
+FIELDS_DESCRIPTION = "Champs à renvoyer, séparés par des virgules (ex: ref_consultation,titre,date_limite); tous par défaut"
+
+
+def set_next_cursor(response: Response, request_url, rows: list, limit: int, model=None) -> None:
+    """Expose le curseur de la page suivante (X-Next-Cursor + Link rel=next) sans changer le corps"""
+    cursor = next_cursor(rows, limit, model)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+        next_url = request_url.remove_query_params("offset").include_query_params(cursor=cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+def list_columns(model, fields: List[str]) -> list:
+    """Colonnes sélectionnées par une liste: champs rendus + clés de pagination (date, id)"""
+    return schema_columns(model, fields, KEYSET_COLUMNS[model])
+
+
+def list_response(request: Request, rows: list, fields: List[str], model=None, limit: int = 0) -> Response:
+    """
+    Sérialise des lignes Core au format négocié (JSON, NDJSON, MessagePack); les champs
+    viennent du schéma Pydantic (pas de validation par ligne). model: expose le curseur
+    de la page suivante (listes paginées par clé)
+    """
+    response = render(rows_to_dicts(rows, fields), negotiate(request.headers.get('accept')))
+    if model is not None:
+        set_next_cursor(response, request.url, rows, limit, model)
+    return response
 
 
 @app.get("/", tags=["Root"])
@@ -55,11 +156,11 @@ async def root():
 
 
 @app.get("/health", tags=["Health"])
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """Vérification de santé de l'API et de la connexion DB"""
     try:
         # Test de connexion DB
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -70,15 +171,19 @@ async def health_check(db: Session = Depends(get_db)):
 # ENDPOINTS CONSULTATIONS
 # ============================================================================
 
-@app.get("/api/v1/consultations", response_model=List[ConsultationResponse], tags=["Consultations"])
-async def list_consultations(
+@app.get("/api/v1/consultations", response_model=List[ConsultationResponse], responses=LIST_RESPONSES, tags=["Consultations"])
+def list_consultations(
+    request: Request,
     statut: Optional[str] = Query(None, description="Filtrer par statut (en_cours, cloture, etc.)"),
     type_marche: Optional[str] = Query(None, description="Type de marché (travaux, fournitures, services)"),
     organisme: Optional[str] = Query(None, description="Acronyme de l'organisme"),
+    organisme_match: MatchMode = Query(MatchMode.CONTAINS, description=MATCH_DESCRIPTION),
     date_debut: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
     date_fin: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)"),
     limit: int = Query(100, ge=1, le=1000, description="Nombre maximum de résultats"),
     offset: int = Query(0, ge=0, description="Offset pour pagination"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -87,8 +192,12 @@ async def list_consultations(
     Exemples:
     - /api/v1/consultations?statut=en_cours&limit=50
     - /api/v1/consultations?type_marche=travaux&organisme=ONEE
+    - /api/v1/consultations?organisme=ONEE&organisme_match=prefix
+    - /api/v1/consultations?cursor=<X-Next-Cursor> (page suivante, stable et sans OFFSET)
+    - /api/v1/consultations?fields=ref_consultation,titre,date_limite,montant_estime
     """
     try:
+        names = parse_fields(fields, ConsultationResponse.model_fields)
         consultations = get_consultations(
             db=db,
             statut=statut,
@@ -97,101 +206,236 @@ async def list_consultations(
             date_debut=date_debut,
             date_fin=date_fin,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            organisme_match=organisme_match.value,
+            columns=list_columns(Consultation, names)
         )
-        return consultations
+        return list_response(request, consultations, names, Consultation, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching consultations: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.get("/api/v1/consultations/{ref_consultation}", response_model=ConsultationDetail, tags=["Consultations"])
-async def get_consultation_detail(
-    ref_consultation: str,
-    db: Session = Depends(get_db)
+# Déclarées avant /consultations/{ref_consultation}, qui capturerait sinon "stream" et "search"
+@app.get("/api/v1/consultations/stream", tags=["Consultations"])
+async def stream_consultations(
+    organisme: Optional[str] = Query(None, description="Acronyme de l'organisme (exact)"),
+    type_marche: Optional[str] = Query(None, description="Type de marché (travaux, fournitures, services)"),
 ):
     """
-    Récupère le détail complet d'une consultation avec ses lots, PV, attributions
+    Consultations insérées ou modifiées, poussées en direct (Server-Sent Events)
+
+    Un événement "consultation" par ligne validée: {"operation": "insert"|"update",
+    "consultation": {...}}. Un client trop lent reçoit "overflow" puis la connexion est
+    fermée: reprendre via /api/v1/changes avant de se réabonner.
+
+    Exemple: curl -N /api/v1/consultations/stream?organisme=ONEE&type_marche=travaux
     """
-    consultation = get_consultation_by_ref(db, ref_consultation)
-    if not consultation:
-        raise HTTPException(status_code=404, detail="Consultation non trouvée")
-    return consultation
+    return StreamingResponse(
+        event_stream(consultation_events, organisme=organisme, type_marche=type_marche),
+        media_type=EVENT_STREAM_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 
-@app.get("/api/v1/consultations/search", tags=["Consultations"])
-async def search_consultations_endpoint(
-    q: str = Query(..., min_length=3, description="Recherche dans titre et objet"),
+@app.get("/api/v1/consultations/search", response_model=List[ConsultationResponse], responses=LIST_RESPONSES, tags=["Consultations"])
+def search_consultations_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=3, description="Recherche dans titre, objet et référence"),
     limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0, description="Offset pour pagination"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
-    Recherche full-text dans les consultations
+    Recherche plein texte dans les consultations, triée par pertinence
     
-    Exemple: /api/v1/consultations/search?q=construction route
+    Exemples:
+    - /api/v1/consultations/search?q=construction route
+    - /api/v1/consultations/search?q="station d'épuration" -etude
+    """
+    try:
+        names = parse_fields(fields, ConsultationResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = search_consultations(db, q, limit, offset, columns=schema_columns(Consultation, names))
+    return list_response(request, results, names)
+
+
+@app.post("/api/v1/consultations/batch", response_model=List[BatchLookupItem], responses=LIST_RESPONSES, tags=["Consultations"])
+def batch_consultations(
+    payload: BatchLookupRequest,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
     """
-    results = search_consultations(db, q, limit)
-    return results
+    Résout jusqu'à BATCH_MAX_REFS références en une requête
+
+    Un élément par référence demandée, dans l'ordre de la requête (doublons compris):
+    found=false et consultation=null pour une référence inconnue. Au-delà de
+    STREAM_CHUNK références, la réponse est émise en flux par morceaux.
+
+    Exemple: POST /api/v1/consultations/batch?fields=ref_consultation,statut
+    {"refs": ["AO-2025-001", "AO-2025-002"]}
+    """
+    try:
+        names = parse_fields(fields, ConsultationResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = get_consultations_by_refs(
+        db, payload.refs, columns=schema_columns(Consultation, names, ('ref_consultation',))
+    )
+    found = {row.ref_consultation: item for row, item in zip(rows, rows_to_dicts(rows, names))}
+    items = (
+        {'ref_consultation': ref, 'found': ref in found, 'consultation': found.get(ref)}
+        for ref in payload.refs
+    )
+    fmt = negotiate(request.headers.get('accept'))
+    if len(payload.refs) <= STREAM_CHUNK:
+        return render(list(items), fmt)
+    return StreamingResponse(iter_encoded(items, len(payload.refs), fmt), media_type=fmt)
+
+
+# Relations du détail (cycle de vie) et leur schéma
+DETAIL_RELATIONS = {
+    'lots': LotResponse,
+    'pv_extraits': PVResponse,
+    'attributions': AttributionResponse,
+    'achevements': AchevementResponse,
+}
+
+
+@app.get("/api/v1/consultations/{ref_consultation}", response_model=ConsultationDetail, tags=["Consultations"])
+def get_consultation_detail(
+    ref_consultation: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION + " (relations incluses)"),
+    include: Optional[str] = Query(
+        None, description="Relations à inclure: lots, pv_extraits, attributions, achevements (toutes par défaut, aucune si vide)"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Récupère le détail complet d'une consultation: lots, PV, attributions et achèvements
+
+    Une requête pour la consultation puis une par relation incluse. include choisit les
+    relations (sinon celles nommées dans fields, sinon toutes); fields limite aussi les
+    colonnes lues.
+
+    Exemples:
+    - /api/v1/consultations/{ref}?include=attributions
+    - /api/v1/consultations/{ref}?fields=titre,date_limite,lots
+    """
+    try:
+        names = parse_fields(fields, ConsultationDetail.model_fields)
+        if include is None:
+            relations = [name for name in names if name in DETAIL_RELATIONS]
+        else:
+            relations = parse_fields(include, DETAIL_RELATIONS) if include.strip() else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    scalars = [name for name in names if name not in DETAIL_RELATIONS]
+
+    consultation = get_consultation_lifecycle(
+        db, ref_consultation,
+        fields=scalars if fields else None,
+        relations={name: list(DETAIL_RELATIONS[name].model_fields) for name in relations}
+    )
+    if not consultation:
+        raise HTTPException(status_code=404, detail="Consultation non trouvée")
+    item = object_to_dict(consultation, scalars)
+    for name in relations:
+        related_fields = list(DETAIL_RELATIONS[name].model_fields)
+        item[name] = [object_to_dict(related, related_fields) for related in getattr(consultation, name)]
+    return render_one(item)
 
 
 # ============================================================================
 # ENDPOINTS PV
 # ============================================================================
 
-@app.get("/api/v1/pv", response_model=List[PVResponse], tags=["Procès-Verbaux"])
-async def list_pv(
+@app.get("/api/v1/pv", response_model=List[PVResponse], responses=LIST_RESPONSES, tags=["Procès-Verbaux"])
+def list_pv(
+    request: Request,
     ref_consultation: Optional[str] = Query(None, description="Référence consultation"),
     organisme: Optional[str] = Query(None, description="Organisme"),
+    organisme_match: MatchMode = Query(MatchMode.CONTAINS, description=MATCH_DESCRIPTION),
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Liste les procès-verbaux avec filtres"""
-    pvs = get_pvs(
-        db=db,
-        ref_consultation=ref_consultation,
-        organisme=organisme,
-        date_debut=date_debut,
-        date_fin=date_fin,
-        limit=limit,
-        offset=offset
-    )
-    return pvs
+    try:
+        names = parse_fields(fields, PVResponse.model_fields)
+        pvs = get_pvs(
+            db=db,
+            ref_consultation=ref_consultation,
+            organisme=organisme,
+            date_debut=date_debut,
+            date_fin=date_fin,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            organisme_match=organisme_match.value,
+            columns=list_columns(PVExtrait, names)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return list_response(request, pvs, names, PVExtrait, limit)
 
 
 # ============================================================================
 # ENDPOINTS ATTRIBUTIONS
 # ============================================================================
 
-@app.get("/api/v1/attributions", response_model=List[AttributionResponse], tags=["Attributions"])
-async def list_attributions(
+@app.get("/api/v1/attributions", response_model=List[AttributionResponse], responses=LIST_RESPONSES, tags=["Attributions"])
+def list_attributions(
+    request: Request,
     ref_consultation: Optional[str] = Query(None),
     entreprise: Optional[str] = Query(None, description="Nom de l'entreprise"),
+    entreprise_match: MatchMode = Query(MatchMode.CONTAINS, description=MATCH_DESCRIPTION),
     organisme: Optional[str] = Query(None),
+    organisme_match: MatchMode = Query(MatchMode.CONTAINS, description=MATCH_DESCRIPTION),
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     montant_min: Optional[float] = Query(None, description="Montant minimum"),
     montant_max: Optional[float] = Query(None, description="Montant maximum"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Liste les attributions avec filtres"""
-    attributions = get_attributions(
-        db=db,
-        ref_consultation=ref_consultation,
-        entreprise=entreprise,
-        organisme=organisme,
-        date_debut=date_debut,
-        date_fin=date_fin,
-        montant_min=montant_min,
-        montant_max=montant_max,
-        limit=limit,
-        offset=offset
-    )
-    return attributions
+    try:
+        names = parse_fields(fields, AttributionResponse.model_fields)
+        attributions = get_attributions(
+            db=db,
+            ref_consultation=ref_consultation,
+            entreprise=entreprise,
+            organisme=organisme,
+            date_debut=date_debut,
+            date_fin=date_fin,
+            montant_min=montant_min,
+            montant_max=montant_max,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            entreprise_match=entreprise_match.value,
+            organisme_match=organisme_match.value,
+            columns=list_columns(Attribution, names)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return list_response(request, attributions, names, Attribution, limit)
 
 
 # ============================================================================
@@ -199,7 +443,7 @@ async def list_attributions(
 # ============================================================================
 
 @app.get("/api/v1/stats", response_model=StatsResponse, tags=["Statistiques"])
-async def get_statistics(db: Session = Depends(get_db)):
+def get_statistics(db: Session = Depends(get_db)):
     """
     Statistiques globales sur les marchés publics
     """
@@ -207,34 +451,116 @@ async def get_statistics(db: Session = Depends(get_db)):
     return stats
 
 
-@app.get("/api/v1/stats/organismes", tags=["Statistiques"])
-async def get_organismes_stats(
-    limit: int = Query(20, description="Top N organismes"),
+@app.get("/api/v1/stats/mensuelles", response_model=List[StatsMensuelleResponse], tags=["Statistiques"])
+def get_monthly_stats(
+    type_marche: Optional[str] = Query(None, description="Type de marché (travaux, fournitures, services)"),
+    statut: Optional[str] = Query(None, description="Filtrer par statut (en_cours, cloture, etc.)"),
+    date_debut: Optional[date] = Query(None, description="Premier mois inclus (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(None, description="Dernier mois inclus (YYYY-MM-DD)"),
     db: Session = Depends(get_db)
 ):
-    """Top des organismes par nombre de consultations"""
-    from database.models import Consultation
-    from sqlalchemy import func
-    
-    results = db.query(
-        Consultation.organisme_acronyme,
-        Consultation.organisme_nom_complet,
-        func.count(Consultation.id_interne).label('count'),
-        func.sum(Consultation.montant_estime).label('total_montant')
-    ).group_by(
-        Consultation.organisme_acronyme,
-        Consultation.organisme_nom_complet
-    ).order_by(func.count(Consultation.id_interne).desc()).limit(limit).all()
+    """
+    Série mensuelle des consultations publiées (nombre, montant total et moyen)
     
-    return [
+    Lue dans la vue matérialisée v_stats_consultations (rafraîchie chaque nuit).
+    """
+    return get_stats_mensuelles(
+        db, type_marche=type_marche, statut=statut, date_debut=date_debut, date_fin=date_fin
+    )
+
+
+@app.get("/api/v1/stats/organismes", response_model=List[TopOrganismeResponse], tags=["Statistiques"])
+def get_organismes_stats(
+    limit: int = Query(20, ge=1, le=1000, description="Top N organismes"),
+    db: Session = Depends(get_db)
+):
+    """Top des organismes par nombre de consultations (vue matérialisée v_top_organismes)"""
+    return get_top_organismes(db, limit=limit)
+
+
+@app.get("/api/v1/stats/attributaires", response_model=List[TopAttributaireResponse], tags=["Statistiques"])
+def get_attributaires_stats(
+    limit: int = Query(20, ge=1, le=1000, description="Top N entreprises"),
+    db: Session = Depends(get_db)
+):
+    """Top des entreprises attributaires par nombre de marchés (vue matérialisée v_top_attributaires)"""
+    return get_top_attributaires(db, limit=limit)
+
+
+# ============================================================================
+# FLUX DE MODIFICATIONS
+# ============================================================================
+
+# Champs rendus par table journalisée
+CHANGE_SCHEMAS = {
+    'consultations': ConsultationResponse,
+    'pv_extraits': PVResponse,
+    'attributions': AttributionResponse,
+}
+
+
+@app.get("/api/v1/changes", tags=["Synchronisation"])
+def list_changes(
+    since: Optional[str] = Query(None, description="Curseur de reprise (champ cursor de la dernière ligne lue, ou X-Next-Cursor)"),
+    limit: int = Query(1000, ge=1, le=10000, description="Nombre maximum d'entrées du journal lues"),
+    db: Session = Depends(get_db)
+):
+    """
+    Modifications (insert, update, delete) des consultations, PV et attributions, en NDJSON
+
+    Une ligne par ligne modifiée, dans l'ordre des transactions, avec son état actuel
+    (data, null si supprimée) et le curseur de reprise. Plusieurs modifications de la
+    même ligne dans la page n'en donnent qu'une. Page suivante: since=X-Next-Cursor,
+    jusqu'à une page vide. 410 si le curseur est antérieur à la purge du journal.
+
+    Démarrage: export complet puis since=<cursor de /api/v1/changes/head lu avant l'export>
+    """
+    try:
+        position = decode_change_cursor(since) if since else None
+        entries = get_changes(db, position, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ChangeCursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    # Dernière modification de chaque ligne dans la page
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.table_name, entry.row_id), None)
+        latest[(entry.table_name, entry.row_id)] = entry
+
+    current = {}
+    for table, schema in CHANGE_SCHEMAS.items():
+        ids = [row_id for name, row_id in latest if name == table]
+        if ids:
+            model = CHANGE_TABLES[table][0]
+            fields = list(schema.model_fields)
+            rows = get_rows_by_ids(db, table, ids, schema_columns(model, fields))
+            current[table] = dict(zip(rows, rows_to_dicts(rows.values(), fields)))
+
+    items = [
         {
-            "acronyme": r.organisme_acronyme,
-            "nom": r.organisme_nom_complet,
-            "nombre_consultations": r.count,
-            "montant_total": float(r.total_montant) if r.total_montant else 0
+            'cursor': encode_change_cursor(entry.txid, entry.seq),
+            'table': entry.table_name,
+            'operation': entry.operation,
+            'id': entry.row_id,
+            'ref_consultation': entry.ref_consultation,
+            'data': current.get(entry.table_name, {}).get(entry.row_id),
         }
-        for r in results
+        for entry in latest.values()
     ]
+    headers = {}
+    if entries:
+        headers['X-Next-Cursor'] = encode_change_cursor(entries[-1].txid, entries[-1].seq)
+    elif since:
+        headers['X-Next-Cursor'] = since
+    return StreamingResponse(iter_encoded(items, len(items), NDJSON), media_type=NDJSON, headers=headers)
+
+
+@app.get("/api/v1/changes/head", tags=["Synchronisation"])
+def changes_head(db: Session = Depends(get_db)):
+    """Curseur de la position actuelle du journal (à lire avant un chargement complet)"""
+    return {"cursor": encode_change_cursor(*get_change_head(db))}
 
 
 # ============================================================================
@@ -242,51 +568,70 @@ async def get_organismes_stats(
 # ============================================================================
 
 @app.get("/api/v1/export/csv", tags=["Export"])
-async def export_consultations_csv(
+def export_consultations_csv(
     statut: Optional[str] = None,
     type_marche: Optional[str] = None,
+    organisme: Optional[str] = Query(None, description="Acronyme de l'organisme"),
+    organisme_match: MatchMode = Query(MatchMode.CONTAINS, description=MATCH_DESCRIPTION),
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
+    gzip: bool = Query(False, description="Compresser le fichier à la volée (.csv.gz)"),
     db: Session = Depends(get_db)
 ):
-    """Export des consultations au format CSV"""
+    """
+    Export des consultations au format CSV, sans limite de lignes
     
-    consultations = get_consultations(
-        db=db,
+    Le fichier est produit en flux: lecture par lots via un curseur serveur et
+    écriture de chaque lot dès sa réception (mémoire constante).
+    """
+    batches = iter_export_consultations(
+        db,
         statut=statut,
         type_marche=type_marche,
+        organisme=organisme,
+        organisme_match=organisme_match.value,
         date_debut=date_debut,
-        date_fin=date_fin,
-        limit=10000
+        date_fin=date_fin
     )
+    fieldnames = [column.key for column in EXPORT_COLUMNS]
+    filename = f"consultations_{datetime.now().strftime('%Y%m%d')}.csv"
+    if gzip:
+        filename += '.gz'
     
-    # Créer le CSV en mémoire
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'ref_consultation', 'titre', 'organisme_acronyme', 'type_marche',
-        'statut', 'date_publication', 'date_limite', 'montant_estime'
-    ])
-    
-    writer.writeheader()
-    for c in consultations:
-        writer.writerow({
-            'ref_consultation': c.ref_consultation,
-            'titre': c.titre,
-            'organisme_acronyme': c.organisme_acronyme,
-            'type_marche': c.type_marche,
-            'statut': c.statut,
-            'date_publication': c.date_publication.isoformat() if c.date_publication else '',
-            'date_limite': c.date_limite.isoformat() if c.date_limite else '',
-            'montant_estime': c.montant_estime or ''
-        })
+    return StreamingResponse(
+        csv_stream(fieldnames, batches, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv; charset=utf-8",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+@app.get("/api/v1/export/arrow/{table}", tags=["Export"])
+def export_table_arrow(
+    table: str,
+    batch_size: int = Query(10000, ge=100, le=100000, description="Lignes par lot Arrow"),
+    db: Session = Depends(get_db)
+):
+    """
+    Export colonnaire d'une table (consultations, lots, pv, attributions) au format
+    Arrow IPC streaming
     
-    output.seek(0)
+    Colonnes typées (décimaux, dates, horodatages); organisme_acronyme, type_marche et
+    statut encodés en dictionnaire. Lecture: pyarrow.ipc.open_stream(corps).
+    """
+    if table not in COLUMNAR_TABLES:
+        raise HTTPException(status_code=404, detail=f"Table inconnue: {table}")
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
     
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
+        arrow_ipc_stream(db, table, batch_size),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
         headers={
-            "Content-Disposition": f"attachment; filename=consultations_{datetime.now().strftime('%Y%m%d')}.csv"
+            "Content-Disposition": f"attachment; filename={table}_{datetime.now().strftime('%Y%m%d')}.arrows"
         }
     )
 
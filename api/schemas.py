@@ -21,6 +21,14 @@ class StatutConsultation(str, Enum):
     REPORTE = "reporte"
 
 
+class MatchMode(str, Enum):
+    """Mode de correspondance des filtres texte (organisme, entreprise)"""
+    CONTAINS = "contains"
+    EXACT = "exact"
+    PREFIX = "prefix"
+    FUZZY = "fuzzy"
+
+
 # ============================================================================
 # SCHEMAS CONSULTATIONS
 # ============================================================================
@@ -46,6 +54,22 @@ class ConsultationResponse(ConsultationBase):
     url_detail: Optional[str] = None
 
 
+# Nombre maximal de références par recherche groupée
+BATCH_MAX_REFS = 5000
+
+
+class BatchLookupRequest(BaseModel):
+    """Corps de POST /api/v1/consultations/batch"""
+    refs: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_REFS)
+
+
+class BatchLookupItem(BaseModel):
+    """Résultat pour une référence demandée, dans l'ordre de la requête"""
+    ref_consultation: str
+    found: bool
+    consultation: Optional[ConsultationResponse] = None
+
+
 class LotResponse(BaseModel):
     """Réponse pour un lot"""
     numero_lot: str
@@ -66,8 +90,11 @@ class ConsultationDetail(ConsultationResponse):
     url_dce: Optional[str] = None
     date_extraction: Optional[datetime] = None
     
-    # Relations
+    # Relations (cycle de vie complet)
     lots: List[LotResponse] = []
+    pv_extraits: List["PVResponse"] = []
+    attributions: List["AttributionResponse"] = []
+    achevements: List["AchevementResponse"] = []
 
 
 # ============================================================================
@@ -109,6 +136,25 @@ class AttributionResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ============================================================================
+# SCHEMAS ACHEVEMENTS
+# ============================================================================
+
+class AchevementResponse(BaseModel):
+    """Réponse pour un rapport d'achèvement"""
+    date_achevement: date
+    date_publication: Optional[datetime] = None
+    entreprise_nom: Optional[str] = None
+    montant_definitif: Optional[float] = None
+    observations: Optional[str] = None
+    url_rapport: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+ConsultationDetail.model_rebuild()
+
+
 # ============================================================================
 # SCHEMAS STATISTIQUES
 # ============================================================================
@@ -123,3 +169,29 @@ class StatsResponse(BaseModel):
     nombre_organismes: int
     nombre_entreprises: int
     derniere_extraction: Optional[datetime] = None
+
+
+class StatsMensuelleResponse(BaseModel):
+    """Point mensuel de la série des consultations"""
+    mois: datetime
+    nombre_consultations: int
+    montant_total_estime: float
+    montant_moyen_estime: Optional[float] = None
+
+
+class TopOrganismeResponse(BaseModel):
+    """Organisme classé par nombre de consultations"""
+    acronyme: str
+    nom: Optional[str] = None
+    nombre_consultations: int
+    montant_total: float
+    derniere_publication: Optional[datetime] = None
+
+
+class TopAttributaireResponse(BaseModel):
+    """Entreprise classée par nombre de marchés attribués"""
+    entreprise: str
+    ville: Optional[str] = None
+    nombre_marches: int
+    montant_total_ttc: float
+    montant_moyen_ttc: Optional[float] = None
@@ -0,0 +1,167 @@
+"""
+Sérialisation rapide des listes de l'API avec négociation de contenu (Accept)
+
+Les listes sélectionnent seulement les colonnes de leur schéma (lignes Core, pas
+d'objets ORM) et les sérialisent directement, sans validation Pydantic par ligne.
+Les schémas de api/schemas.py restent la référence OpenAPI (response_model) et
+fixent les champs et leur ordre.
+
+Le paramètre fields= restreint les champs rendus et les colonnes lues (SELECT projeté)
+à une liste blanche tirée des mêmes schémas.
+
+Formats: JSON (orjson, par défaut), NDJSON (une ligne JSON par élément) et
+MessagePack (si msgpack est installé; dates en chaînes ISO 8601 comme en JSON).
+"""
+import enum
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Optional
+
+import orjson
+from fastapi import Response
+
+try:
+    import msgpack
+except ImportError:  # msgpack optionnel: JSON / NDJSON seulement
+    msgpack = None
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+MSGPACK = 'application/msgpack'
+
+_MEDIA_TYPES = {
+    'application/json': JSON,
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+}
+
+
+def parse_fields(fields: Optional[str], allowed) -> List[str]:
+    """
+    Champs demandés par ?fields=a,b: liste blanche allowed (champs d'un schéma), rendus
+    dans son ordre; tous les champs si le paramètre est absent ou vide
+    """
+    allowed = list(allowed)
+    requested = {name.strip() for name in (fields or '').split(',') if name.strip()}
+    if not requested:
+        return allowed
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(sorted(unknown))} (autorisés: {', '.join(allowed)})")
+    return [name for name in allowed if name in requested]
+
+
+def schema_columns(model, fields: List[str], extra=()) -> list:
+    """
+    Colonnes du modèle pour les champs donnés, dans leur ordre, suivies des colonnes
+    supplémentaires (clés de pagination) qui n'en font pas partie
+    """
+    return [getattr(model, name) for name in list(fields) + [name for name in extra if name not in fields]]
+
+
+def negotiate(accept: str) -> str:
+    """Format de réponse d'après l'en-tête Accept (préférence q décroissante); JSON par défaut"""
+    candidates = []
+    for position, part in enumerate((accept or '').split(',')):
+        media, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, media.strip().lower()))
+    for negative_quality, _, media in sorted(candidates):
+        if negative_quality == 0:
+            break
+        fmt = _MEDIA_TYPES.get(media)
+        if fmt == MSGPACK and msgpack is None:
+            continue
+        if fmt is not None:
+            return fmt
+        if media in ('*/*', 'application/*'):
+            return JSON
+    return JSON
+
+
+def _plain(value):
+    # Mêmes valeurs que les schémas Pydantic: valeur des enums, décimaux en float
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def rows_to_dicts(rows, fields: List[str]) -> List[dict]:
+    """Lignes Core -> dicts limités aux champs du schéma (colonnes supplémentaires ignorées)"""
+    return [dict(zip(fields, map(_plain, row))) for row in rows]
+
+
+def _msgpack_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def object_to_dict(obj, fields: List[str]) -> dict:
+    return {name: _plain(getattr(obj, name)) for name in fields}
+
+
+def render(items: List[dict], fmt: str) -> Response:
+    if fmt == NDJSON:
+        body = b''.join(orjson.dumps(item) + b'\n' for item in items)
+    elif fmt == MSGPACK:
+        body = msgpack.packb(items, default=_msgpack_default, use_bin_type=True)
+    else:
+        body = orjson.dumps(items)
+    return Response(content=body, media_type=fmt)
+
+
+# Éléments encodés par morceau dans les réponses en flux
+STREAM_CHUNK = 500
+
+
+def iter_encoded(items: Iterable[dict], count: int, fmt: str, chunk_size: int = STREAM_CHUNK) -> Iterator[bytes]:
+    """
+    Même corps que render(), émis par morceaux de chunk_size éléments (StreamingResponse);
+    count: nombre d'éléments (en-tête de tableau MessagePack)
+    """
+    if fmt == MSGPACK:
+        packer = msgpack.Packer(default=_msgpack_default, use_bin_type=True)
+        head, encode, separator, tail = packer.pack_array_header(count), packer.pack, b'', b''
+    elif fmt == NDJSON:
+        head, encode, separator, tail = b'', lambda item: orjson.dumps(item) + b'\n', b'', b''
+    else:
+        head, encode, separator, tail = b'[', orjson.dumps, b',', b']'
+
+    yield head
+    chunk, first = [], True
+    for item in items:
+        chunk.append(encode(item))
+        if len(chunk) >= chunk_size:
+            yield (b'' if first else separator) + separator.join(chunk)
+            chunk, first = [], False
+    if chunk:
+        yield (b'' if first else separator) + separator.join(chunk)
+    yield tail
+
+
+def render_one(item: dict) -> Response:
+    """Objet unique (détail, relations imbriquées) en JSON"""
+    return Response(content=orjson.dumps(item), media_type=JSON)
+
+
+# Description OpenAPI des formats alternatifs des listes
+LIST_RESPONSES = {
+    200: {
+        'content': {
+            NDJSON: {'schema': {'type': 'string', 'description': 'Un objet JSON par ligne'}},
+            MSGPACK: {'schema': {'type': 'string', 'format': 'binary'}},
+        },
+        'description': "Liste au format JSON (défaut), NDJSON ou MessagePack selon l'en-tête Accept",
+    }
+}
@@ -0,0 +1,81 @@
+"""
+Version des données (migration 006) pour l'invalidation du cache de l'API
+
+Les écrivains appellent bump_data_version() après leurs commits; l'API suit la
+version via PostgresDataVersion (LISTEN pmmp_data_version) sans requête par appel.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from database.listener import PostgresListener
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_CHANNEL = 'pmmp_data_version'
+
+
+def bump_data_version(db) -> Optional[int]:
+    """
+    Incrémente la version des données et notifie les API (au commit)
+
+    db: Session ou Connection. Retourne la nouvelle version, None hors PostgreSQL ou
+    si la migration 006 manque.
+    """
+    bind = db.get_bind() if hasattr(db, 'get_bind') else db
+    if bind.dialect.name != 'postgresql':
+        return None
+    try:
+        version = db.execute(text("SELECT bump_data_version()")).scalar()
+        db.commit()
+    except ProgrammingError:
+        db.rollback()
+        logger.warning("Fonction bump_data_version absente (migration 006 non appliquée)")
+        return None
+    return version
+
+
+class LocalDataVersion:
+    """Version tenue en mémoire: instance unique sans PostgreSQL (tests, développement)"""
+
+    def __init__(self, version: int = 0):
+        self.version = version
+
+    def current(self) -> Optional[int]:
+        return self.version
+
+    def bump(self) -> int:
+        self.version += 1
+        return self.version
+
+
+class PostgresDataVersion(PostgresListener):
+    """
+    Suit data_version par LISTEN/NOTIFY dans un thread dédié
+
+    current() retourne None tant que l'écoute n'est pas établie (ou après une coupure):
+    le cache est alors contourné plutôt que de servir des réponses périmées.
+    """
+
+    def __init__(self, engine, channel: str = DATA_VERSION_CHANNEL,
+                 poll_timeout: float = 5.0, reconnect_delay: float = 5.0):
+        super().__init__(engine, channel, poll_timeout, reconnect_delay)
+        self.version = None
+
+    def current(self) -> Optional[int]:
+        return self.version
+
+    def on_listen(self, cursor):
+        # Lue après LISTEN: aucun bump ne peut passer entre les deux
+        cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        row = cursor.fetchone()
+        self.version = row[0] if row else 0
+        logger.info(f"Version des données: {self.version}")
+
+    def on_notify(self, payloads):
+        self.version = int(payloads[-1])
+
+    def on_disconnect(self):
+        self.version = None
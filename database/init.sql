@@ -21,48 +21,13 @@ GRANT USAGE ON SCHEMA public TO pmmp_readonly;
 GRANT SELECT ON ALL TABLES IN SCHEMA public TO pmmp_readonly;
 ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO pmmp_readonly;
 
--- Index pour améliorer les performances de recherche full-text
--- (À exécuter après la création des tables par SQLAlchemy)
+-- Index de recherche (tsvector + GIN, trigrammes organisme/entreprise): créés après les
+-- tables SQLAlchemy par les migrations de database/migrations/ (appliquées par init_db()
+-- ou python -m database.migrations)
 
--- CREATE INDEX IF NOT EXISTS idx_consultations_titre_trgm ON consultations USING gin (titre gin_trgm_ops);
--- CREATE INDEX IF NOT EXISTS idx_consultations_objet_trgm ON consultations USING gin (objet gin_trgm_ops);
--- CREATE INDEX IF NOT EXISTS idx_attributions_entreprise_trgm ON attributions USING gin (entreprise_nom gin_trgm_ops);
-
--- Vue pour les statistiques
-CREATE OR REPLACE VIEW v_stats_consultations AS
-SELECT 
-    DATE_TRUNC('month', date_publication) AS mois,
-    type_marche,
-    statut,
-    COUNT(*) AS nombre_consultations,
-    SUM(montant_estime) AS montant_total_estime,
-    AVG(montant_estime) AS montant_moyen_estime
-FROM consultations
-GROUP BY DATE_TRUNC('month', date_publication), type_marche, statut
-ORDER BY mois DESC;
-
--- Vue pour les organismes les plus actifs
-CREATE OR REPLACE VIEW v_top_organismes AS
-SELECT 
-    organisme_acronyme,
-    organisme_nom_complet,
-    COUNT(*) AS nombre_consultations,
-    SUM(montant_estime) AS montant_total_estime
-FROM consultations
-GROUP BY organisme_acronyme, organisme_nom_complet
-ORDER BY nombre_consultations DESC;
-
--- Vue pour les entreprises gagnantes
-CREATE OR REPLACE VIEW v_top_attributaires AS
-SELECT 
-    entreprise_nom,
-    entreprise_ville,
-    COUNT(*) AS nombre_marches,
-    SUM(montant_ttc) AS montant_total_ttc,
-    AVG(montant_ttc) AS montant_moyen_ttc
-FROM attributions
-GROUP BY entreprise_nom, entreprise_ville
-ORDER BY nombre_marches DESC;
+-- Vues d'analyse (v_stats_consultations, v_top_organismes, v_top_attributaires):
+-- vues matérialisées créées par database/migrations/005_analytics_materialized_views.sql,
+-- rafraîchies chaque nuit par le DAG pmmp_daily_extraction
 
 -- Fonction pour nettoyer les anciennes données d'extraction
 CREATE OR REPLACE FUNCTION clean_old_extraction_logs()
@@ -0,0 +1,79 @@
+"""
+Écoute PostgreSQL LISTEN/NOTIFY dans un thread dédié
+
+Une connexion psycopg2 détachée du pool reste ouverte en LISTEN; les notifications
+arrivent au COMMIT de la transaction émettrice. Reconnexion automatique après une
+coupure. Les sous-classes traitent l'état initial (on_listen), les notifications par
+lot (on_notify) et la perte de l'écoute (on_disconnect).
+"""
+import logging
+import select
+import threading
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresListener:
+
+    def __init__(self, engine, channel: str, poll_timeout: float = 5.0, reconnect_delay: float = 5.0):
+        self.engine = engine
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'listen-{self.channel}', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_timeout + 1)
+            self._thread = None
+
+    def on_listen(self, cursor):
+        """Écoute établie: lecture de l'état initial (aucune notification ne peut manquer)"""
+
+    def on_notify(self, payloads: List[str]):
+        """Notifications reçues ensemble, dans l'ordre des COMMIT"""
+
+    def on_disconnect(self):
+        """Écoute interrompue: des notifications ont pu être perdues"""
+
+    def _connect(self):
+        # Connexion psycopg2 dédiée, détachée du pool (elle reste ouverte en LISTEN)
+        raw = self.engine.raw_connection()
+        raw.detach()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        return conn
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                self.on_listen(cursor)
+                logger.info(f"Écoute {self.channel} établie")
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    payloads = [notify.payload for notify in conn.notifies]
+                    conn.notifies.clear()
+                    if payloads:
+                        self.on_notify(payloads)
+            except Exception as e:
+                self.on_disconnect()
+                logger.warning(f"Écoute {self.channel} interrompue: {e}")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,16 @@
+-- Migration 001: index composites pour la pagination par curseur (keyset)
+-- Les listes /api/v1/consultations, /api/v1/pv et /api/v1/attributions sont triées
+-- par (date, clé primaire) décroissant et filtrées par (date, id) < curseur.
+-- Un index B-tree sur (date, id) sert ce tri et ce filtre (parcours inverse).
+--
+-- Les index sont aussi déclarés dans database/models.py (create_all).
+-- CONCURRENTLY: pas de verrou bloquant les écritures (hors transaction).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_consultation_date_id
+    ON consultations (date_publication, id_interne);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pv_date_id
+    ON pv_extraits (date_publication_pv, id_pv);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attribution_date_id
+    ON attributions (date_attribution, id_attribution);
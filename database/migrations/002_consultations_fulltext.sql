@@ -0,0 +1,25 @@
+-- Migration 002: recherche plein texte sur les consultations
+-- Colonne tsvector générée (configuration french, accents retirés) sur
+-- ref_consultation / titre (poids A) et objet (poids B), indexée en GIN.
+-- Utilisée par search_consultations (api/crud.py) avec websearch_to_tsquery + ts_rank.
+--
+-- ADD COLUMN ... STORED réécrit la table (verrou exclusif le temps du calcul):
+-- à appliquer hors des heures de collecte sur une base volumineuse.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() est STABLE: une colonne générée exige une expression IMMUTABLE.
+-- Le dictionnaire est fixé explicitement pour que le résultat ne dépende pas du search_path.
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+ALTER TABLE consultations ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', f_unaccent(coalesce(ref_consultation, ''))), 'A') ||
+        setweight(to_tsvector('french', f_unaccent(coalesce(titre, ''))), 'A') ||
+        setweight(to_tsvector('french', f_unaccent(coalesce(objet, ''))), 'B')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_consultation_search_vector
+    ON consultations USING gin (search_vector);
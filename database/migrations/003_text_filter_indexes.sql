@@ -0,0 +1,30 @@
+-- Migration 003: index des filtres texte organisme / entreprise (api/crud.py, match_filter)
+-- - exact / prefix: lower(col) = ... et lower(col) LIKE 'x%' -> B-tree lower(col) text_pattern_ops
+--   (text_pattern_ops compare octet par octet: utilisable par LIKE préfixe quel que soit le collationnement)
+-- - contains: col ILIKE '%x%' (défaut); fuzzy: contains OR col % 'x' (similarité) -> GIN gin_trgm_ops
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_consultation_organisme_pattern
+    ON consultations (lower(organisme_acronyme) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_consultation_organisme_trgm
+    ON consultations USING gin (organisme_acronyme gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pv_organisme_pattern
+    ON pv_extraits (lower(organisme_acronyme) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pv_organisme_trgm
+    ON pv_extraits USING gin (organisme_acronyme gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attribution_organisme_pattern
+    ON attributions (lower(organisme_acronyme) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attribution_organisme_trgm
+    ON attributions USING gin (organisme_acronyme gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attribution_entreprise_pattern
+    ON attributions (lower(entreprise_nom) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attribution_entreprise_trgm
+    ON attributions USING gin (entreprise_nom gin_trgm_ops);
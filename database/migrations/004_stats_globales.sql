@@ -0,0 +1,183 @@
+-- Migration 004: statistiques globales maintenues incrémentalement (GET /api/v1/stats)
+-- stats_globales contient une seule ligne (id = 1), tenue à jour par des triggers sur
+-- consultations et attributions: tout écrivain est couvert (DatabasePipeline,
+-- scripts/ingest_jsonl.py, corrections manuelles).
+-- Les comptages distincts passent par des tables de dimension avec compteur de
+-- références: un organisme / une entreprise compte tant qu'au moins une ligne le cite.
+-- reconcile_stats_globales() recalcule tout depuis les tables sources (dérive,
+-- suppressions qui ne font pas baisser derniere_extraction); appelée par le DAG quotidien.
+-- Les colonnes statut stockent le nom de l'enum SQLAlchemy ('EN_COURS').
+-- Les triggers par ligne ci-dessous sont remplacés par des triggers par instruction
+-- (migration 009).
+
+CREATE TABLE IF NOT EXISTS stats_globales (
+    id INTEGER PRIMARY KEY,
+    total_consultations INTEGER NOT NULL DEFAULT 0,
+    consultations_en_cours INTEGER NOT NULL DEFAULT 0,
+    total_attributions INTEGER NOT NULL DEFAULT 0,
+    montant_total_estime NUMERIC(20, 2) NOT NULL DEFAULT 0,
+    montant_total_attribue NUMERIC(20, 2) NOT NULL DEFAULT 0,
+    nombre_organismes INTEGER NOT NULL DEFAULT 0,
+    nombre_entreprises INTEGER NOT NULL DEFAULT 0,
+    derniere_extraction TIMESTAMP,
+    date_reconciliation TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stats_organismes (
+    organisme_acronyme VARCHAR(50) PRIMARY KEY,
+    nb_references INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stats_entreprises (
+    entreprise_nom VARCHAR(255) PRIMARY KEY,
+    nb_references INTEGER NOT NULL
+);
+
+-- Compteur de références d'une dimension; retourne +1 / -1 quand la valeur apparaît / disparaît
+CREATE OR REPLACE FUNCTION stats_dimension_delta(dimension TEXT, valeur TEXT, delta INTEGER)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    nb INTEGER;
+BEGIN
+    IF valeur IS NULL OR delta = 0 THEN
+        RETURN 0;
+    END IF;
+    IF dimension = 'organisme' THEN
+        INSERT INTO stats_organismes AS s (organisme_acronyme, nb_references) VALUES (valeur, delta)
+            ON CONFLICT (organisme_acronyme) DO UPDATE SET nb_references = s.nb_references + delta
+            RETURNING nb_references INTO nb;
+        IF nb <= 0 THEN
+            DELETE FROM stats_organismes WHERE organisme_acronyme = valeur;
+        END IF;
+    ELSE
+        INSERT INTO stats_entreprises AS s (entreprise_nom, nb_references) VALUES (valeur, delta)
+            ON CONFLICT (entreprise_nom) DO UPDATE SET nb_references = s.nb_references + delta
+            RETURNING nb_references INTO nb;
+        IF nb <= 0 THEN
+            DELETE FROM stats_entreprises WHERE entreprise_nom = valeur;
+        END IF;
+    END IF;
+    IF delta > 0 AND nb = delta THEN
+        RETURN 1;
+    ELSIF delta < 0 AND nb <= 0 THEN
+        RETURN -1;
+    END IF;
+    RETURN 0;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stats_consultations_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    d_total INTEGER := 0;
+    d_en_cours INTEGER := 0;
+    d_montant NUMERIC := 0;
+    d_organismes INTEGER := 0;
+    extraction TIMESTAMP;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        d_total := d_total - 1;
+        d_en_cours := d_en_cours - (OLD.statut::TEXT = 'EN_COURS')::INTEGER;
+        d_montant := d_montant - coalesce(OLD.montant_estime, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        d_total := d_total + 1;
+        d_en_cours := d_en_cours + (NEW.statut::TEXT = 'EN_COURS')::INTEGER;
+        d_montant := d_montant + coalesce(NEW.montant_estime, 0);
+        extraction := NEW.date_extraction;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.organisme_acronyme IS DISTINCT FROM NEW.organisme_acronyme) THEN
+        d_organismes := d_organismes + stats_dimension_delta('organisme', OLD.organisme_acronyme, -1);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.organisme_acronyme IS DISTINCT FROM NEW.organisme_acronyme) THEN
+        d_organismes := d_organismes + stats_dimension_delta('organisme', NEW.organisme_acronyme, 1);
+    END IF;
+
+    UPDATE stats_globales SET
+        total_consultations = total_consultations + d_total,
+        consultations_en_cours = consultations_en_cours + d_en_cours,
+        montant_total_estime = montant_total_estime + d_montant,
+        nombre_organismes = nombre_organismes + d_organismes,
+        derniere_extraction = GREATEST(derniere_extraction, extraction)
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stats_attributions_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    d_total INTEGER := 0;
+    d_montant NUMERIC := 0;
+    d_entreprises INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        d_total := d_total - 1;
+        d_montant := d_montant - coalesce(OLD.montant_ttc, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        d_total := d_total + 1;
+        d_montant := d_montant + coalesce(NEW.montant_ttc, 0);
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.entreprise_nom IS DISTINCT FROM NEW.entreprise_nom) THEN
+        d_entreprises := d_entreprises + stats_dimension_delta('entreprise', OLD.entreprise_nom, -1);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.entreprise_nom IS DISTINCT FROM NEW.entreprise_nom) THEN
+        d_entreprises := d_entreprises + stats_dimension_delta('entreprise', NEW.entreprise_nom, 1);
+    END IF;
+
+    UPDATE stats_globales SET
+        total_attributions = total_attributions + d_total,
+        montant_total_attribue = montant_total_attribue + d_montant,
+        nombre_entreprises = nombre_entreprises + d_entreprises
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$;
+
+-- Recalcul complet. Le verrou EXCLUSIVE fait attendre les triggers concurrents, qui
+-- s'appliquent après le recalcul sur des lignes qu'il n'a pas vues (pas de double comptage).
+CREATE OR REPLACE FUNCTION reconcile_stats_globales() RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    LOCK TABLE stats_globales, stats_organismes, stats_entreprises IN EXCLUSIVE MODE;
+
+    DELETE FROM stats_organismes;
+    INSERT INTO stats_organismes (organisme_acronyme, nb_references)
+        SELECT organisme_acronyme, count(*) FROM consultations
+        WHERE organisme_acronyme IS NOT NULL GROUP BY organisme_acronyme;
+
+    DELETE FROM stats_entreprises;
+    INSERT INTO stats_entreprises (entreprise_nom, nb_references)
+        SELECT entreprise_nom, count(*) FROM attributions
+        WHERE entreprise_nom IS NOT NULL GROUP BY entreprise_nom;
+
+    INSERT INTO stats_globales (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+    UPDATE stats_globales SET
+        (total_consultations, consultations_en_cours, montant_total_estime, derniere_extraction) = (
+            SELECT count(*), count(*) FILTER (WHERE statut::TEXT = 'EN_COURS'),
+                   coalesce(sum(montant_estime), 0), max(date_extraction)
+            FROM consultations),
+        (total_attributions, montant_total_attribue) = (
+            SELECT count(*), coalesce(sum(montant_ttc), 0) FROM attributions),
+        nombre_organismes = (SELECT count(*) FROM stats_organismes),
+        nombre_entreprises = (SELECT count(*) FROM stats_entreprises),
+        date_reconciliation = now()
+    WHERE id = 1;
+END;
+$$;
+
+-- UPDATE limité aux colonnes agrégées: les mises à jour de date_derniere_maj, URLs, etc.
+-- ne touchent pas la ligne stats_globales
+DROP TRIGGER IF EXISTS trg_stats_consultations ON consultations;
+
+CREATE TRIGGER trg_stats_consultations
+    AFTER INSERT OR DELETE OR UPDATE OF statut, montant_estime, organisme_acronyme, date_extraction
+    ON consultations
+    FOR EACH ROW EXECUTE FUNCTION stats_consultations_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_attributions ON attributions;
+
+CREATE TRIGGER trg_stats_attributions
+    AFTER INSERT OR DELETE OR UPDATE OF montant_ttc, entreprise_nom
+    ON attributions
+    FOR EACH ROW EXECUTE FUNCTION stats_attributions_trigger();
+
+SELECT reconcile_stats_globales();
@@ -0,0 +1,67 @@
+-- Migration 005: vues d'analyse matérialisées (GET /api/v1/stats/mensuelles, /organismes, /attributaires)
+-- Les vues simples de init.sql réagrégeaient les tables sources à chaque lecture.
+-- Elles deviennent des vues matérialisées (mêmes noms), rafraîchies par la dernière tâche
+-- du DAG pmmp_daily_extraction (REFRESH MATERIALIZED VIEW CONCURRENTLY: les lectures ne
+-- sont pas bloquées pendant le rafraîchissement).
+-- REFRESH ... CONCURRENTLY exige un index UNIQUE sur des colonnes (ni expression ni WHERE):
+-- chaque vue a une clé naturelle issue de son GROUP BY (colonnes NOT NULL).
+-- Les définitions de repli hors PostgreSQL sont dans api/crud.py (analytics_source).
+
+DROP VIEW IF EXISTS v_stats_consultations;
+
+DROP VIEW IF EXISTS v_top_organismes;
+
+DROP VIEW IF EXISTS v_top_attributaires;
+
+-- nombre_montants: nombre de montants renseignés, pour recalculer une moyenne sur
+-- plusieurs lignes (la moyenne des moyennes serait fausse)
+CREATE MATERIALIZED VIEW IF NOT EXISTS v_stats_consultations AS
+SELECT
+    DATE_TRUNC('month', date_publication) AS mois,
+    type_marche,
+    statut,
+    COUNT(*) AS nombre_consultations,
+    COUNT(montant_estime) AS nombre_montants,
+    COALESCE(SUM(montant_estime), 0) AS montant_total_estime,
+    AVG(montant_estime) AS montant_moyen_estime
+FROM consultations
+GROUP BY DATE_TRUNC('month', date_publication), type_marche, statut
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_v_stats_consultations_cle
+    ON v_stats_consultations (mois, type_marche, statut);
+
+-- Un organisme par acronyme (le nom complet varie d'une fiche à l'autre)
+CREATE MATERIALIZED VIEW IF NOT EXISTS v_top_organismes AS
+SELECT
+    organisme_acronyme,
+    MAX(organisme_nom_complet) AS organisme_nom_complet,
+    COUNT(*) AS nombre_consultations,
+    COALESCE(SUM(montant_estime), 0) AS montant_total_estime,
+    MAX(date_publication) AS derniere_publication
+FROM consultations
+GROUP BY organisme_acronyme
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_v_top_organismes_cle
+    ON v_top_organismes (organisme_acronyme);
+
+CREATE INDEX IF NOT EXISTS idx_v_top_organismes_rang
+    ON v_top_organismes (nombre_consultations DESC);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS v_top_attributaires AS
+SELECT
+    entreprise_nom,
+    MAX(entreprise_ville) AS entreprise_ville,
+    COUNT(*) AS nombre_marches,
+    COALESCE(SUM(montant_ttc), 0) AS montant_total_ttc,
+    AVG(montant_ttc) AS montant_moyen_ttc
+FROM attributions
+GROUP BY entreprise_nom
+WITH DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_v_top_attributaires_cle
+    ON v_top_attributaires (entreprise_nom);
+
+CREATE INDEX IF NOT EXISTS idx_v_top_attributaires_rang
+    ON v_top_attributaires (nombre_marches DESC);
@@ -0,0 +1,25 @@
+-- Migration 006: version des données pour l'invalidation du cache de réponses de l'API
+-- data_version contient une seule ligne (id = 1). bump_data_version() l'incrémente et
+-- publie la nouvelle valeur sur le canal pmmp_data_version (NOTIFY, délivré au COMMIT).
+-- Appelée par les écrivains (DatabasePipeline, scripts/ingest_jsonl.py, DAG quotidien);
+-- l'API écoute le canal (api/cache.py) et n'interroge pas la base pour valider son cache.
+
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    date_maj TIMESTAMP
+);
+
+INSERT INTO data_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS BIGINT LANGUAGE plpgsql AS $$
+DECLARE
+    nouvelle BIGINT;
+BEGIN
+    UPDATE data_version SET version = version + 1, date_maj = now()
+        WHERE id = 1
+        RETURNING version INTO nouvelle;
+    PERFORM pg_notify('pmmp_data_version', nouvelle::TEXT);
+    RETURN nouvelle;
+END;
+$$;
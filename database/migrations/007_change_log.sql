@@ -0,0 +1,98 @@
+-- Migration 007: journal des modifications (GET /api/v1/changes)
+-- Des triggers sur consultations, pv_extraits et attributions écrivent une ligne par
+-- insertion, modification ou suppression: tout écrivain est couvert (DatabasePipeline,
+-- scripts/ingest_jsonl.py, corrections manuelles). Une mise à jour qui ne change que
+-- les métadonnées d'extraction (re-crawl à l'identique) n'est pas journalisée.
+--
+-- Ordre du flux: (txid, seq). seq est attribué à l'écriture, pas au COMMIT: une
+-- transaction plus ancienne peut encore valider des seq inférieurs. L'API ne lit que
+-- les transactions sous change_log_watermark() (plus ancienne transaction en cours):
+-- toute transaction encore ouverte aura un txid supérieur au dernier curseur rendu.
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL,
+    table_name VARCHAR(50) NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    row_id BIGINT NOT NULL,
+    ref_consultation VARCHAR(100),
+    date_changement TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_txid_seq ON change_log (txid, seq);
+CREATE INDEX IF NOT EXISTS idx_change_log_date ON change_log (date_changement);
+
+-- Dernière position purgée: un curseur antérieur a perdu des modifications (410)
+CREATE TABLE IF NOT EXISTS change_log_horizon (
+    id INTEGER PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT 0,
+    seq BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO change_log_horizon (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- TG_ARGV[0]: colonne de clé primaire de la table
+CREATE OR REPLACE FUNCTION change_log_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    ignorees TEXT[] := ARRAY['date_extraction', 'date_derniere_maj', 'page_html_archivee'];
+    ligne JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        ligne := to_jsonb(OLD);
+    ELSE
+        ligne := to_jsonb(NEW);
+    END IF;
+    IF TG_OP = 'UPDATE' AND (to_jsonb(OLD) - ignorees) = (ligne - ignorees) THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO change_log (txid, table_name, operation, row_id, ref_consultation, date_changement)
+    VALUES (
+        pg_current_xact_id()::TEXT::BIGINT, TG_TABLE_NAME, lower(TG_OP),
+        (ligne ->> TG_ARGV[0])::BIGINT, ligne ->> 'ref_consultation', now()
+    );
+    RETURN NULL;
+END;
+$$;
+
+-- Les transactions de txid inférieur sont toutes terminées
+CREATE OR REPLACE FUNCTION change_log_watermark() RETURNS BIGINT LANGUAGE sql AS $$
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT;
+$$;
+
+-- Supprime les entrées de plus de `jours` jours; retourne le nombre de lignes supprimées
+CREATE OR REPLACE FUNCTION purge_change_log(jours INTEGER) RETURNS BIGINT LANGUAGE plpgsql AS $$
+DECLARE
+    dernier RECORD;
+    nb BIGINT;
+BEGIN
+    SELECT txid, seq INTO dernier FROM change_log
+        WHERE date_changement < now() - make_interval(days => jours)
+          AND txid < change_log_watermark()
+        ORDER BY txid DESC, seq DESC LIMIT 1;
+    IF NOT FOUND THEN
+        RETURN 0;
+    END IF;
+    DELETE FROM change_log WHERE (txid, seq) <= (dernier.txid, dernier.seq);
+    GET DIAGNOSTICS nb = ROW_COUNT;
+    UPDATE change_log_horizon SET txid = dernier.txid, seq = dernier.seq WHERE id = 1;
+    RETURN nb;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_change_log_consultations ON consultations;
+
+CREATE TRIGGER trg_change_log_consultations
+    AFTER INSERT OR UPDATE OR DELETE ON consultations
+    FOR EACH ROW EXECUTE FUNCTION change_log_trigger('id_interne');
+
+DROP TRIGGER IF EXISTS trg_change_log_pv_extraits ON pv_extraits;
+
+CREATE TRIGGER trg_change_log_pv_extraits
+    AFTER INSERT OR UPDATE OR DELETE ON pv_extraits
+    FOR EACH ROW EXECUTE FUNCTION change_log_trigger('id_pv');
+
+DROP TRIGGER IF EXISTS trg_change_log_attributions ON attributions;
+
+CREATE TRIGGER trg_change_log_attributions
+    AFTER INSERT OR UPDATE OR DELETE ON attributions
+    FOR EACH ROW EXECUTE FUNCTION change_log_trigger('id_attribution');
@@ -0,0 +1,24 @@
+-- Migration 008: notification des consultations insérées ou modifiées (flux SSE de l'API)
+-- Chaque insertion / modification publie "<operation>:<id_interne>" sur le canal
+-- pmmp_consultations; NOTIFY est délivré au COMMIT, donc seulement pour des lignes
+-- visibles. L'API (api/events.py) écoute le canal une fois par processus, relit les
+-- lignes et les diffuse aux abonnés. Comme pour change_log (migration 007), une mise à
+-- jour limitée aux métadonnées d'extraction n'est pas notifiée.
+
+CREATE OR REPLACE FUNCTION notify_consultation_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    ignorees TEXT[] := ARRAY['date_extraction', 'date_derniere_maj', 'page_html_archivee'];
+BEGIN
+    IF TG_OP = 'UPDATE' AND (to_jsonb(OLD) - ignorees) = (to_jsonb(NEW) - ignorees) THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('pmmp_consultations', lower(TG_OP) || ':' || NEW.id_interne);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_notify_consultations ON consultations;
+
+CREATE TRIGGER trg_notify_consultations
+    AFTER INSERT OR UPDATE ON consultations
+    FOR EACH ROW EXECUTE FUNCTION notify_consultation_trigger();
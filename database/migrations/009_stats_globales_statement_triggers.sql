@@ -0,0 +1,194 @@
+-- Migration 009: triggers de statistiques globales par instruction (remplace ceux de 004)
+-- Les triggers FOR EACH ROW de la migration 004 mettaient à jour l'unique ligne
+-- stats_globales pour chaque ligne écrite: un lot de N consultations prenait N fois le
+-- verrou de cette ligne et y écrivait N versions. Ici, un trigger par instruction lit
+-- les tables de transition (lignes insérées / supprimées / avant et après UPDATE),
+-- agrège un seul delta et l'applique en un UPDATE; les compteurs de dimension sont mis
+-- à jour en une instruction par valeur distincte, dans l'ordre des clés (pas d'interblocage
+-- entre deux lots concurrents).
+-- Les tables de transition excluent les listes de colonnes (UPDATE OF ...): un UPDATE qui
+-- ne touche aucune colonne agrégée donne un delta nul et ne touche pas stats_globales.
+-- La réconciliation finale rattrape les écritures faites pendant le remplacement.
+
+-- Applique des deltas de références à une dimension (valeurs distinctes);
+-- retourne le nombre de valeurs apparues moins le nombre de valeurs disparues
+CREATE OR REPLACE FUNCTION stats_dimension_apply(dimension TEXT, valeurs TEXT[], deltas INTEGER[])
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    variation INTEGER;
+BEGIN
+    IF valeurs IS NULL THEN
+        RETURN 0;
+    END IF;
+    IF dimension = 'organisme' THEN
+        WITH delta AS (
+            SELECT v, d FROM unnest(valeurs, deltas) AS x(v, d)
+        ), maj AS (
+            INSERT INTO stats_organismes AS s (organisme_acronyme, nb_references)
+                SELECT v, d FROM delta ORDER BY v
+                ON CONFLICT (organisme_acronyme) DO UPDATE SET nb_references = s.nb_references + excluded.nb_references
+                RETURNING s.organisme_acronyme AS v, s.nb_references AS nb
+        )
+        SELECT coalesce(sum(CASE WHEN delta.d > 0 AND maj.nb = delta.d THEN 1
+                                 WHEN delta.d < 0 AND maj.nb <= 0 THEN -1
+                                 ELSE 0 END), 0)
+            INTO variation FROM maj JOIN delta USING (v);
+        DELETE FROM stats_organismes WHERE organisme_acronyme = ANY (valeurs) AND nb_references <= 0;
+    ELSE
+        WITH delta AS (
+            SELECT v, d FROM unnest(valeurs, deltas) AS x(v, d)
+        ), maj AS (
+            INSERT INTO stats_entreprises AS s (entreprise_nom, nb_references)
+                SELECT v, d FROM delta ORDER BY v
+                ON CONFLICT (entreprise_nom) DO UPDATE SET nb_references = s.nb_references + excluded.nb_references
+                RETURNING s.entreprise_nom AS v, s.nb_references AS nb
+        )
+        SELECT coalesce(sum(CASE WHEN delta.d > 0 AND maj.nb = delta.d THEN 1
+                                 WHEN delta.d < 0 AND maj.nb <= 0 THEN -1
+                                 ELSE 0 END), 0)
+            INTO variation FROM maj JOIN delta USING (v);
+        DELETE FROM stats_entreprises WHERE entreprise_nom = ANY (valeurs) AND nb_references <= 0;
+    END IF;
+    RETURN variation;
+END;
+$$;
+
+-- Lignes de l'instruction signées: +1 pour NEW TABLE (nouvelles), -1 pour OLD TABLE (anciennes).
+-- Les tables de transition ne sont visibles que dans la fonction trigger elle-même (EXECUTE inclus)
+CREATE OR REPLACE FUNCTION stats_consultations_statement_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    lignes TEXT;
+    d_total INTEGER;
+    d_en_cours INTEGER;
+    d_montant NUMERIC;
+    d_organismes INTEGER;
+    extraction TIMESTAMP;
+    valeurs TEXT[];
+    deltas INTEGER[];
+BEGIN
+    lignes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS signe, * FROM nouvelles'
+        WHEN 'DELETE' THEN 'SELECT -1 AS signe, * FROM anciennes'
+        ELSE 'SELECT -1 AS signe, * FROM anciennes UNION ALL SELECT 1, * FROM nouvelles'
+    END;
+    EXECUTE format(
+        'SELECT coalesce(sum(signe), 0),
+                coalesce(sum(signe * (statut::TEXT = ''EN_COURS'')::INTEGER), 0),
+                coalesce(sum(signe * coalesce(montant_estime, 0)), 0),
+                max(date_extraction) FILTER (WHERE signe > 0)
+         FROM (%s) l', lignes)
+        INTO d_total, d_en_cours, d_montant, extraction;
+    EXECUTE format(
+        'SELECT array_agg(v ORDER BY v), array_agg(d ORDER BY v)
+         FROM (SELECT organisme_acronyme AS v, sum(signe)::INTEGER AS d FROM (%s) l
+               WHERE organisme_acronyme IS NOT NULL
+               GROUP BY organisme_acronyme HAVING sum(signe) <> 0) x', lignes)
+        INTO valeurs, deltas;
+    d_organismes := stats_dimension_apply('organisme', valeurs, deltas);
+
+    IF d_total = 0 AND d_en_cours = 0 AND d_montant = 0 AND d_organismes = 0
+       AND (extraction IS NULL OR extraction <= (SELECT derniere_extraction FROM stats_globales WHERE id = 1)) THEN
+        RETURN NULL;
+    END IF;
+    UPDATE stats_globales SET
+        total_consultations = total_consultations + d_total,
+        consultations_en_cours = consultations_en_cours + d_en_cours,
+        montant_total_estime = montant_total_estime + d_montant,
+        nombre_organismes = nombre_organismes + d_organismes,
+        derniere_extraction = GREATEST(derniere_extraction, extraction)
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stats_attributions_statement_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    lignes TEXT;
+    d_total INTEGER;
+    d_montant NUMERIC;
+    d_entreprises INTEGER;
+    valeurs TEXT[];
+    deltas INTEGER[];
+BEGIN
+    lignes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS signe, * FROM nouvelles'
+        WHEN 'DELETE' THEN 'SELECT -1 AS signe, * FROM anciennes'
+        ELSE 'SELECT -1 AS signe, * FROM anciennes UNION ALL SELECT 1, * FROM nouvelles'
+    END;
+    EXECUTE format(
+        'SELECT coalesce(sum(signe), 0), coalesce(sum(signe * coalesce(montant_ttc, 0)), 0)
+         FROM (%s) l', lignes)
+        INTO d_total, d_montant;
+    EXECUTE format(
+        'SELECT array_agg(v ORDER BY v), array_agg(d ORDER BY v)
+         FROM (SELECT entreprise_nom AS v, sum(signe)::INTEGER AS d FROM (%s) l
+               WHERE entreprise_nom IS NOT NULL
+               GROUP BY entreprise_nom HAVING sum(signe) <> 0) x', lignes)
+        INTO valeurs, deltas;
+    d_entreprises := stats_dimension_apply('entreprise', valeurs, deltas);
+
+    IF d_total = 0 AND d_montant = 0 AND d_entreprises = 0 THEN
+        RETURN NULL;
+    END IF;
+    UPDATE stats_globales SET
+        total_attributions = total_attributions + d_total,
+        montant_total_attribue = montant_total_attribue + d_montant,
+        nombre_entreprises = nombre_entreprises + d_entreprises
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_stats_consultations ON consultations;
+
+DROP TRIGGER IF EXISTS trg_stats_consultations_insert ON consultations;
+
+CREATE TRIGGER trg_stats_consultations_insert
+    AFTER INSERT ON consultations
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_consultations_statement_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_consultations_update ON consultations;
+
+CREATE TRIGGER trg_stats_consultations_update
+    AFTER UPDATE ON consultations
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_consultations_statement_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_consultations_delete ON consultations;
+
+CREATE TRIGGER trg_stats_consultations_delete
+    AFTER DELETE ON consultations
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_consultations_statement_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_attributions ON attributions;
+
+DROP TRIGGER IF EXISTS trg_stats_attributions_insert ON attributions;
+
+CREATE TRIGGER trg_stats_attributions_insert
+    AFTER INSERT ON attributions
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_attributions_statement_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_attributions_update ON attributions;
+
+CREATE TRIGGER trg_stats_attributions_update
+    AFTER UPDATE ON attributions
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_attributions_statement_trigger();
+
+DROP TRIGGER IF EXISTS trg_stats_attributions_delete ON attributions;
+
+CREATE TRIGGER trg_stats_attributions_delete
+    AFTER DELETE ON attributions
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION stats_attributions_statement_trigger();
+
+DROP FUNCTION IF EXISTS stats_consultations_trigger();
+
+DROP FUNCTION IF EXISTS stats_attributions_trigger();
+
+DROP FUNCTION IF EXISTS stats_dimension_delta(TEXT, TEXT, INTEGER);
+
+SELECT reconcile_stats_globales();
@@ -0,0 +1,85 @@
+"""
+Migrations SQL versionnées de la base PMMP
+
+Chaque fichier NNN_nom.sql de ce dossier est appliqué une seule fois, dans l'ordre,
+et enregistré dans la table schema_migrations. Les instructions sont exécutées une à
+une en autocommit (CREATE INDEX CONCURRENTLY ne peut pas tourner dans une transaction);
+elles doivent donc être idempotentes (IF NOT EXISTS, CREATE OR REPLACE).
+
+Usage:
+    python -m database.migrations          # applique les migrations en attente
+    python -m database.migrations --list   # état des migrations
+"""
+import logging
+import re
+import sys
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent
+_MIGRATION_FILE = re.compile(r'^(\d{3})_[\w-]+\.sql$')
+
+
+def migration_files() -> List[Path]:
+    return sorted(p for p in MIGRATIONS_DIR.glob('*.sql') if _MIGRATION_FILE.match(p.name))
+
+
+def split_statements(sql: str) -> List[str]:
+    """Découpe un script en instructions (fin de ligne ';' hors bloc $$ ... $$, commentaires ignorés)"""
+    statements, current = [], []
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith('--')):
+            continue
+        current.append(line)
+        block = '\n'.join(current)
+        if line.rstrip().endswith(';') and block.count('$$') % 2 == 0:
+            statements.append(block.strip())
+            current = []
+    if current and '\n'.join(current).strip():
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def applied_versions(conn) -> set:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT NOW())"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def apply_migrations(engine) -> List[str]:
+    """Applique les migrations en attente; retourne les versions appliquées"""
+    applied = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        done = applied_versions(conn)
+        for path in migration_files():
+            version = path.stem
+            if version in done:
+                continue
+            logger.info(f"Migration {version}...")
+            for statement in split_statements(path.read_text(encoding='utf-8')):
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {'v': version})
+            applied.append(version)
+    return applied
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from database.connection import engine
+
+    if '--list' in sys.argv[1:]:
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+            conn.commit()
+        for path in migration_files():
+            print(f"{'✅' if path.stem in done else '⏳'} {path.stem}")
+    else:
+        versions = apply_migrations(engine)
+        print(f"✅ {len(versions)} migration(s) appliquée(s): {', '.join(versions) or '-'}")
@@ -1,12 +1,13 @@
 """
 Modèles de base de données pour le système PMMP
-Définit les tables: consultations, lots, pv_extraits, attributions, achevements
+Définit les tables: consultations, lots, pv_extraits, attributions, achevements,
+alertes (recherches sauvegardées, notifications) et journal des modifications
 """
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, Date, 
-    Numeric, Boolean, ForeignKey, Enum, Index
+    Column, Integer, BigInteger, String, Text, DateTime, Date, 
+    Numeric, Boolean, ForeignKey, Enum, Index, MetaData, Table, UniqueConstraint
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -81,16 +82,22 @@ class Consultation(Base):
     page_html_archivee = Column(Text)  # Path vers fichier HTML archivé
     
     # Relations
-    lots = relationship("Lot", back_populates="consultation", cascade="all, delete-orphan")
-    pv_extraits = relationship("PVExtrait", back_populates="consultation", cascade="all, delete-orphan")
-    attributions = relationship("Attribution", back_populates="consultation", cascade="all, delete-orphan")
-    achevements = relationship("Achevement", back_populates="consultation", cascade="all, delete-orphan")
+    lots = relationship("Lot", back_populates="consultation", cascade="all, delete-orphan",
+                        order_by="Lot.id_lot")
+    pv_extraits = relationship("PVExtrait", back_populates="consultation", cascade="all, delete-orphan",
+                               order_by="PVExtrait.date_publication_pv, PVExtrait.id_pv")
+    attributions = relationship("Attribution", back_populates="consultation", cascade="all, delete-orphan",
+                                order_by="Attribution.date_attribution, Attribution.id_attribution")
+    achevements = relationship("Achevement", back_populates="consultation", cascade="all, delete-orphan",
+                               order_by="Achevement.date_achevement, Achevement.id_achevement")
     
     # Index composites
     __table_args__ = (
         Index('idx_consultation_organisme_date', 'organisme_acronyme', 'date_publication'),
         Index('idx_consultation_statut_date', 'statut', 'date_publication'),
         Index('idx_consultation_type_date', 'type_marche', 'date_publication'),
+        # Pagination par curseur (date_publication, id_interne)
+        Index('idx_consultation_date_id', 'date_publication', 'id_interne'),
     )
     
     def __repr__(self):
@@ -161,6 +168,7 @@ class PVExtrait(Base):
     __table_args__ = (
         Index('idx_pv_consultation', 'ref_consultation'),
         Index('idx_pv_date', 'date_publication_pv'),
+        Index('idx_pv_date_id', 'date_publication_pv', 'id_pv'),
     )
     
     def __repr__(self):
@@ -210,6 +218,7 @@ class Attribution(Base):
         Index('idx_attribution_consultation', 'ref_consultation'),
         Index('idx_attribution_entreprise', 'entreprise_nom'),
         Index('idx_attribution_date', 'date_attribution'),
+        Index('idx_attribution_date_id', 'date_attribution', 'id_attribution'),
     )
     
     def __repr__(self):
@@ -277,3 +286,108 @@ class ExtractionLog(Base):
     
     def __repr__(self):
         return f"<ExtractionLog(spider={self.spider_name}, date={self.date_execution}, statut={self.statut})>"
+
+
+class RechercheSauvegardee(Base):
+    """Alerte d'un abonné: mots-clés et filtres confrontés aux nouvelles consultations"""
+    __tablename__ = 'recherches_sauvegardees'
+    
+    id_recherche = Column(Integer, primary_key=True, autoincrement=True)
+    abonne = Column(String(255), nullable=False, index=True)  # Email ou identifiant
+    nom = Column(String(255))
+    
+    # Critères (tous optionnels, combinés en ET)
+    mots_cles = Column(Text)  # Tous présents dans titre ou objet
+    organisme_acronyme = Column(String(50))
+    type_marche = Column(Enum(TypeMarche))
+    montant_min = Column(Numeric(15, 2))
+    montant_max = Column(Numeric(15, 2))
+    
+    active = Column(Boolean, default=True, nullable=False)
+    date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<RechercheSauvegardee(id={self.id_recherche}, abonne={self.abonne}, mots_cles={self.mots_cles})>"
+
+
+class NotificationAlerte(Base):
+    """Consultation correspondant à une recherche sauvegardée, en attente d'envoi"""
+    __tablename__ = 'notifications_alertes'
+    
+    id_notification = Column(Integer, primary_key=True, autoincrement=True)
+    id_recherche = Column(Integer, ForeignKey('recherches_sauvegardees.id_recherche', ondelete='CASCADE'), nullable=False)
+    ref_consultation = Column(String(100), ForeignKey('consultations.ref_consultation', ondelete='CASCADE'), nullable=False)
+    date_notification = Column(DateTime, default=datetime.utcnow, nullable=False)
+    envoyee = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        # Une seule notification par recherche et consultation (re-crawls, mises à jour)
+        UniqueConstraint('id_recherche', 'ref_consultation', name='uq_notification_recherche_consultation'),
+        Index('idx_notification_envoi', 'envoyee', 'date_notification'),
+    )
+    
+    def __repr__(self):
+        return f"<NotificationAlerte(recherche={self.id_recherche}, ref={self.ref_consultation})>"
+
+
+class ChangeLog(Base):
+    """
+    Journal des modifications (flux GET /api/v1/changes)
+
+    Écrit par les triggers de database/migrations/007_change_log.sql, jamais par
+    l'application; lu dans l'ordre (txid, seq).
+    """
+    __tablename__ = 'change_log'
+    
+    seq = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, nullable=False)  # Transaction d'écriture (pg_current_xact_id)
+    table_name = Column(String(50), nullable=False)
+    operation = Column(String(10), nullable=False)  # insert, update, delete
+    row_id = Column(BigInteger, nullable=False)
+    ref_consultation = Column(String(100))
+    date_changement = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_change_log_txid_seq', 'txid', 'seq'),
+        Index('idx_change_log_date', 'date_changement'),
+    )
+    
+    def __repr__(self):
+        return f"<ChangeLog(seq={self.seq}, {self.operation} {self.table_name}#{self.row_id})>"
+
+
+# ============================================================================
+# VUES D'ANALYSE MATÉRIALISÉES
+# ============================================================================
+# Définies en SQL (database/migrations/005_analytics_materialized_views.sql) et
+# rafraîchies par le DAG: hors Base.metadata, create_all ne les crée pas.
+analytics_metadata = MetaData()
+
+v_stats_consultations = Table(
+    'v_stats_consultations', analytics_metadata,
+    Column('mois', DateTime, primary_key=True),
+    Column('type_marche', Enum(TypeMarche), primary_key=True),
+    Column('statut', Enum(StatutConsultation), primary_key=True),
+    Column('nombre_consultations', Integer),
+    Column('nombre_montants', Integer),
+    Column('montant_total_estime', Numeric(20, 2)),
+    Column('montant_moyen_estime', Numeric(20, 2)),
+)
+
+v_top_organismes = Table(
+    'v_top_organismes', analytics_metadata,
+    Column('organisme_acronyme', String(50), primary_key=True),
+    Column('organisme_nom_complet', String(255)),
+    Column('nombre_consultations', Integer),
+    Column('montant_total_estime', Numeric(20, 2)),
+    Column('derniere_publication', DateTime),
+)
+
+v_top_attributaires = Table(
+    'v_top_attributaires', analytics_metadata,
+    Column('entreprise_nom', String(255), primary_key=True),
+    Column('entreprise_ville', String(100)),
+    Column('nombre_marches', Integer),
+    Column('montant_total_ttc', Numeric(20, 2)),
+    Column('montant_moyen_ttc', Numeric(20, 2)),
+)
@@ -0,0 +1,312 @@
+"""
+Percolation des recherches sauvegardées (alertes) contre les nouvelles consultations
+
+Sens inverse d'une recherche: les requêtes sont indexées, chaque consultation entrante
+est confrontée à toutes les recherches actives sans les parcourir une à une.
+
+- Chaque recherche occupe un emplacement (bit) dans des bitmaps (entiers Python).
+- Mots-clés: index inversé mot -> bitmap. Une recherche n'est indexée que sous son
+  mot-clé le plus rare (ses autres mots-clés sont vérifiés ensuite): une consultation
+  n'active que les recherches dont ce mot apparaît dans son titre ou son objet.
+- Filtres organisme / type de marché: un bitmap par valeur plus un bitmap "sans filtre".
+- Montant: tranches fixes (AMOUNT_BOUNDS); une recherche est posée dans chaque tranche
+  que son intervalle recouvre.
+
+Candidats = ET des quatre bitmaps, puis vérification exacte des seuls candidats (inutile
+pour une recherche à un seul mot-clé sans filtre de montant: les bitmaps suffisent).
+Le coût dépend des mots de la consultation et du nombre de candidats, pas du nombre
+total de recherches (scripts/benchmark_percolator.py).
+"""
+import logging
+import re
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database.models import NotificationAlerte, RechercheSauvegardee
+
+logger = logging.getLogger(__name__)
+
+# Mots vides (français) ignorés dans les mots-clés comme dans les consultations
+STOPWORDS = frozenset(
+    'a au aux avec ce ces dans de des du en et l la le les leur ou par pour sa se son '
+    'sur un une d n s'.split()
+)
+
+# Tranches de montant (MAD): [0, 100k[, [100k, 500k[, ... [100M, +inf[
+AMOUNT_BOUNDS = [100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000, 100_000_000]
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """Minuscules, sans accents ni mots vides; pluriel en -s ramené au singulier"""
+    if not text:
+        return set()
+    text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    tokens = set()
+    for word in _WORD.findall(text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s'):
+            word = word[:-1]
+        tokens.add(word)
+    return tokens
+
+
+def _amount(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if isinstance(value, Enum) else value
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    """Critères normalisés d'une recherche sauvegardée (tous combinés en ET)"""
+    id: int
+    keywords: FrozenSet[str] = frozenset()
+    organisme: Optional[str] = None
+    type_marche: Optional[str] = None
+    montant_min: Optional[float] = None
+    montant_max: Optional[float] = None
+
+    @classmethod
+    def from_model(cls, recherche: RechercheSauvegardee) -> 'SearchSpec':
+        return cls(
+            id=recherche.id_recherche,
+            keywords=frozenset(tokenize(recherche.mots_cles)),
+            organisme=recherche.organisme_acronyme.upper() if recherche.organisme_acronyme else None,
+            type_marche=_enum_value(recherche.type_marche),
+            montant_min=_amount(recherche.montant_min),
+            montant_max=_amount(recherche.montant_max),
+        )
+
+    @property
+    def has_amount(self) -> bool:
+        return self.montant_min is not None or self.montant_max is not None
+
+    def matches(self, doc: 'Document') -> bool:
+        """Vérification exacte (aussi utilisée comme référence naïve)"""
+        if self.organisme and doc.organisme != self.organisme:
+            return False
+        if self.type_marche and doc.type_marche != self.type_marche:
+            return False
+        if self.has_amount:
+            # Montant inconnu: ne satisfait pas un filtre de montant
+            if doc.montant is None:
+                return False
+            if self.montant_min is not None and doc.montant < self.montant_min:
+                return False
+            if self.montant_max is not None and doc.montant > self.montant_max:
+                return False
+        return self.keywords <= doc.tokens
+
+
+@dataclass(frozen=True)
+class Document:
+    """Consultation réduite aux champs percolés"""
+    ref: str
+    tokens: FrozenSet[str]
+    organisme: Optional[str] = None
+    type_marche: Optional[str] = None
+    montant: Optional[float] = None
+
+    @classmethod
+    def from_consultation(cls, consultation) -> 'Document':
+        """Depuis un ConsultationItem / dict ou un objet Consultation"""
+        if hasattr(consultation, 'get'):
+            get = consultation.get
+        else:
+            def get(name):
+                return getattr(consultation, name, None)
+        organisme = get('organisme_acronyme')
+        return cls(
+            ref=get('ref_consultation'),
+            tokens=frozenset(tokenize(get('titre')) | tokenize(get('objet'))),
+            organisme=organisme.upper() if organisme else None,
+            type_marche=_enum_value(get('type_marche')),
+            montant=_amount(get('montant_estime')),
+        )
+
+
+def _bits(bitmap: int):
+    """Positions des bits à 1, du plus faible au plus fort"""
+    # Une seule conversion en chaîne (bit de poids faible en tête): isoler les bits un à
+    # un (x & -x) recopierait tout l'entier à chaque bit
+    digits = bin(bitmap)[:1:-1]
+    position = digits.find('1')
+    while position >= 0:
+        yield position
+        position = digits.find('1', position + 1)
+
+
+class Percolator:
+    """Index des recherches sauvegardées (voir la docstring du module)"""
+
+    def __init__(self, searches: Iterable[SearchSpec] = ()):
+        self._specs: List[Optional[SearchSpec]] = []
+        self._slots: Dict[int, int] = {}  # id de recherche -> emplacement
+        self._anchors: Dict[int, Optional[str]] = {}  # emplacement -> mot-clé indexé
+        self._free: List[int] = []
+
+        self._keywords: Dict[str, int] = {}
+        self._no_keywords = 0
+        self._organismes: Dict[str, int] = {}
+        self._any_organisme = 0
+        self._types: Dict[str, int] = {}
+        self._any_type = 0
+        self._amounts = [0] * (len(AMOUNT_BOUNDS) + 1)
+        self._any_amount = 0
+        self._exact = 0  # recherches entièrement décidées par les bitmaps
+
+        for spec in searches:
+            self.add(spec)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, spec: SearchSpec):
+        """Ajoute (ou remplace) une recherche"""
+        if spec.id in self._slots:
+            self.remove(spec.id)
+        if self._free:
+            slot = self._free.pop()
+            self._specs[slot] = spec
+        else:
+            slot = len(self._specs)
+            self._specs.append(spec)
+        self._slots[spec.id] = slot
+        bit = 1 << slot
+
+        anchor = None
+        if spec.keywords:
+            # Mot-clé le moins partagé: listes de candidats les plus courtes
+            anchor = min(sorted(spec.keywords), key=lambda word: self._keywords.get(word, 0).bit_count())
+            self._keywords[anchor] = self._keywords.get(anchor, 0) | bit
+        else:
+            self._no_keywords |= bit
+        self._anchors[slot] = anchor
+
+        if spec.organisme:
+            self._organismes[spec.organisme] = self._organismes.get(spec.organisme, 0) | bit
+        else:
+            self._any_organisme |= bit
+        if spec.type_marche:
+            self._types[spec.type_marche] = self._types.get(spec.type_marche, 0) | bit
+        else:
+            self._any_type |= bit
+        for bucket in self._buckets(spec):
+            self._amounts[bucket] |= bit
+        if not spec.has_amount:
+            self._any_amount |= bit
+            if len(spec.keywords) <= 1:
+                self._exact |= bit
+
+    def remove(self, search_id: int):
+        slot = self._slots.pop(search_id, None)
+        if slot is None:
+            return
+        spec = self._specs[slot]
+        mask = ~(1 << slot)
+
+        anchor = self._anchors.pop(slot)
+        if anchor is None:
+            self._no_keywords &= mask
+        else:
+            self._keywords[anchor] &= mask
+            if not self._keywords[anchor]:
+                del self._keywords[anchor]
+        if spec.organisme:
+            self._organismes[spec.organisme] &= mask
+        self._any_organisme &= mask
+        if spec.type_marche:
+            self._types[spec.type_marche] &= mask
+        self._any_type &= mask
+        for bucket in self._buckets(spec):
+            self._amounts[bucket] &= mask
+        self._any_amount &= mask
+        self._exact &= mask
+
+        self._specs[slot] = None
+        self._free.append(slot)
+
+    @staticmethod
+    def _buckets(spec: SearchSpec) -> range:
+        if not spec.has_amount:
+            return range(0)
+        low = bisect_right(AMOUNT_BOUNDS, spec.montant_min) if spec.montant_min is not None else 0
+        high = bisect_right(AMOUNT_BOUNDS, spec.montant_max) if spec.montant_max is not None else len(AMOUNT_BOUNDS)
+        return range(low, high + 1)
+
+    def candidates(self, doc: Document) -> int:
+        """Bitmap des recherches à vérifier pour cette consultation"""
+        keywords = self._no_keywords
+        for token in doc.tokens:
+            keywords |= self._keywords.get(token, 0)
+        if not keywords:
+            return 0
+        bitmap = keywords & (self._any_organisme | self._organismes.get(doc.organisme, 0))
+        bitmap &= self._any_type | self._types.get(doc.type_marche, 0)
+        if doc.montant is None:
+            bitmap &= self._any_amount
+        else:
+            bitmap &= self._any_amount | self._amounts[bisect_right(AMOUNT_BOUNDS, doc.montant)]
+        return bitmap
+
+    def match(self, doc: Document) -> List[int]:
+        """Identifiants des recherches satisfaites par la consultation"""
+        candidates = self.candidates(doc)
+        specs = self._specs
+        matched = [specs[slot].id for slot in _bits(candidates & self._exact)]
+        matched.extend(
+            specs[slot].id for slot in _bits(candidates & ~self._exact) if specs[slot].matches(doc)
+        )
+        return matched
+
+
+def load_percolator(db: Session) -> Percolator:
+    """Index des recherches sauvegardées actives"""
+    searches = db.query(RechercheSauvegardee).filter(RechercheSauvegardee.active.is_(True))
+    percolator = Percolator(SearchSpec.from_model(recherche) for recherche in searches)
+    logger.info(f"Percolateur: {len(percolator)} recherches actives indexées")
+    return percolator
+
+
+def percolate(db: Session, percolator: Percolator, consultations: Iterable) -> int:
+    """
+    Confronte les consultations aux recherches et enregistre les nouvelles notifications
+
+    Une consultation déjà notifiée pour une recherche (re-crawl, mise à jour) ne l'est
+    pas une seconde fois: INSERT ... ON CONFLICT DO NOTHING sur la contrainte unique,
+    sans lecture préalable, donc sans course entre deux percolations concurrentes (crawl
+    et scripts/percolate_alerts.py). Retourne le nombre de notifications créées.
+    """
+    matches: Dict[Tuple[int, str], None] = {}
+    for consultation in consultations:
+        doc = Document.from_consultation(consultation)
+        for search_id in percolator.match(doc):
+            matches[(search_id, doc.ref)] = None
+    if not matches:
+        return 0
+
+    insert = postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
+    now = datetime.utcnow()
+    # Ordre des clés fixe: deux lots concurrents verrouillent les mêmes entrées dans le même ordre
+    rows = [
+        {'id_recherche': search_id, 'ref_consultation': ref, 'date_notification': now, 'envoyee': False}
+        for search_id, ref in sorted(matches)
+    ]
+    stmt = insert(NotificationAlerte).values(rows).on_conflict_do_nothing(
+        index_elements=['id_recherche', 'ref_consultation'],
+    )
+    created = db.execute(stmt).rowcount
+    db.commit()
+    return created
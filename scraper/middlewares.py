@@ -1,11 +1,15 @@
 """
 Middlewares personnalisés pour le scraper PMMP
 """
+import bisect
+import itertools
 import random
 import time
 import logging
 from scrapy import signals
-from scrapy.exceptions import NotConfigured
+from scrapy.exceptions import DontCloseSpider, NotConfigured
+from scrapy.http import Request
+from scraper.priorities import DetailPriorityPolicy
 
 
 class CustomUserAgentMiddleware:
@@ -126,3 +130,149 @@ class RetryWithDelayMiddleware:
                 spider.logger.error(f"Échec après 3 retries pour {request.url}")
         
         return response
+
+
+class DetailSchedulingMiddleware:
+    """
+    Middleware spider qui priorise et borne les requêtes de détail
+    La priorité est calculée par DetailPriorityPolicy à partir de l'item de la ligne.
+    Au-delà de DETAIL_MAX_IN_FLIGHT requêtes en cours, les suivantes sont retenues
+    (au plus DETAIL_MAX_PENDING) et relâchées au fur et à mesure que les pages détail
+    sortent du downloader.
+    Contre-pression: tant que la file retenue est pleine, les pages liste et de
+    pagination sont différées (plus aucune nouvelle ligne n'arrive). Si une seule page
+    liste déborde malgré tout, la ligne la moins prioritaire est émise sans détail
+    (item de la page liste) au lieu d'être perdue.
+    """
+    
+    def __init__(self, crawler, max_in_flight, max_pending):
+        self.crawler = crawler
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.policy = DetailPriorityPolicy()
+        self.in_flight = 0
+        # Liste triée de (priorité, -séquence, requête): la plus prioritaire en fin de liste
+        self.pending = []
+        # Pages liste / pagination différées tant que la file retenue est pleine
+        self.deferred = []
+        self._seq = itertools.count()
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('DETAIL_PRIORITY_ENABLED', True):
+            raise NotConfigured
+        
+        middleware = cls(
+            crawler,
+            crawler.settings.getint('DETAIL_MAX_IN_FLIGHT', 8),
+            crawler.settings.getint('DETAIL_MAX_PENDING', 500),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.request_left_downloader, signal=signals.request_left_downloader)
+        crawler.signals.connect(middleware.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(middleware.spider_idle, signal=signals.spider_idle)
+        return middleware
+    
+    def spider_opened(self, spider):
+        # Références déjà en base, exposées par DeduplicationPipeline
+        self.policy.known_refs = getattr(spider, 'known_refs', set())
+        spider.logger.info(
+            f'Priorisation des détails activée (en vol: {self.max_in_flight}, en attente: {self.max_pending})'
+        )
+    
+    def process_spider_output(self, response, result, spider):
+        for element in result:
+            if isinstance(element, Request) and 'consultation_item' in element.meta:
+                element.priority = self.policy.priority_for(element.meta['consultation_item'])
+                if self.in_flight < self.max_in_flight:
+                    self._acquire(element)
+                    yield element
+                else:
+                    overflow = self._hold(element, spider)
+                    if overflow is not None:
+                        yield overflow
+            elif isinstance(element, Request) and self._is_full():
+                self.deferred.append(element)
+                self.crawler.stats.inc_value('detail_scheduling/deferred_pages')
+            else:
+                yield element
+    
+    def process_spider_exception(self, response, exception, spider):
+        # Le callback de la page détail a échoué: le slot ne doit pas rester compté
+        self._release_slot(response.request, spider)
+    
+    def _is_full(self):
+        return len(self.pending) >= self.max_pending
+    
+    def _acquire(self, request):
+        request.meta['detail_slot'] = True
+        # Une requête écartée avant le downloader (IgnoreRequest dans process_request)
+        # ne passe que par son errback: aucun signal ne libérerait le slot
+        request.errback = self._releasing_errback(request.errback)
+        self.in_flight += 1
+        self.crawler.stats.inc_value('detail_scheduling/released')
+    
+    def _releasing_errback(self, errback):
+        def release_then_errback(failure):
+            self._release_slot(failure.request, self.crawler.spider)
+            return errback(failure) if errback else failure
+        return release_then_errback
+    
+    def _hold(self, request, spider):
+        """
+        Retient une requête. Si la file est pleine, la moins prioritaire n'est pas
+        téléchargée: retourne son item de la page liste, à émettre à la place
+        """
+        entry = (request.priority, -next(self._seq), request)
+        if self._is_full():
+            if entry[0] <= self.pending[0][0]:
+                return self._overflow(request, spider)
+            overflow = self._overflow(self.pending.pop(0)[2], spider)
+            bisect.insort(self.pending, entry)
+            return overflow
+        bisect.insort(self.pending, entry)
+        self.crawler.stats.inc_value('detail_scheduling/held')
+        self.crawler.stats.max_value('detail_scheduling/max_pending', len(self.pending))
+        return None
+    
+    def _overflow(self, request, spider):
+        self.crawler.stats.inc_value('detail_scheduling/overflow')
+        spider.logger.warning(
+            f"File de détails pleine ({self.max_pending}): consultation émise sans détail: {request.url}"
+        )
+        return request.meta['consultation_item']
+    
+    def _release_slot(self, request, spider):
+        # Le flag est retiré pour qu'une copie (retry) ne libère pas un second slot
+        if not request.meta.pop('detail_slot', False):
+            return
+        self.in_flight -= 1
+        self._release_pending()
+    
+    def _release_pending(self):
+        while self.pending and self.in_flight < self.max_in_flight:
+            next_request = self.pending.pop()[2]
+            self._acquire(next_request)
+            self.crawler.engine.crawl(next_request)
+        while self.deferred and not self._is_full():
+            self.crawler.engine.crawl(self.deferred.pop(0))
+    
+    def request_left_downloader(self, request, spider):
+        self._release_slot(request, spider)
+    
+    def request_dropped(self, request, spider):
+        self._release_slot(request, spider)
+    
+    def spider_idle(self, spider):
+        if not self.pending and not self.deferred:
+            return
+        waiting = len(self.pending) + len(self.deferred)
+        self._release_pending()
+        if len(self.pending) + len(self.deferred) < waiting:
+            raise DontCloseSpider
+        # Moteur inactif alors que des slots sont comptés en vol: fuite de slot
+        spider.logger.error(
+            f"Priorisation des détails: {self.in_flight} slots comptés en vol alors que le moteur est inactif, "
+            f"{len(self.pending)} détails et {len(self.deferred)} pages non relancés"
+        )
+        self.crawler.stats.set_value('detail_scheduling/leaked_slots', self.in_flight)
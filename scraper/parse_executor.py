@@ -0,0 +1,111 @@
+"""
+Exécuteur de parsing HTML hors de la boucle asyncio
+Déporte le parsing CPU (pages liste de 500 lignes, pages détail) dans un pool de
+processus pré-chauffés, pour que les I/O réseau continuent pendant le parsing.
+Les fonctions soumises doivent être définies au niveau module (picklables),
+prendre les octets bruts et renvoyer des structures simples (dict, list, str).
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Métriques Prometheus: une file qui grossit et une attente qui dépasse le temps de
+# parsing indiquent que le CPU (et non le réseau) limite le débit
+parse_queue_depth = Gauge('pmmp_parse_queue_depth', 'Parse tasks submitted and not yet finished', ['executor'])
+parse_wait_seconds = Histogram('pmmp_parse_wait_seconds', 'Time a parse task waited for a worker', ['executor'])
+parse_seconds = Histogram('pmmp_parse_seconds', 'Time spent parsing in a worker', ['executor'])
+
+
+def _warm_worker():
+    """Initialiseur des workers: importer et exercer lxml/BeautifulSoup une fois"""
+    import lxml.html
+    from bs4 import BeautifulSoup
+    lxml.html.document_fromstring("<html><body><p>warm</p></body></html>")
+    BeautifulSoup("<p>warm</p>", "lxml")
+
+
+def _noop():
+    return None
+
+
+def _timed_call(func, args, submitted_at):
+    """Exécuté dans le worker: renvoie (résultat, attente, durée de parsing)"""
+    started = time.time()
+    result = func(*args)
+    return result, started - submitted_at, time.time() - started
+
+
+class ParseExecutor:
+    """
+    Pool de processus pour le parsing, avec mode en ligne (workers=0) qui exécute
+    la fonction directement dans le processus courant, avec les mêmes métriques.
+    """
+
+    def __init__(self, workers=0, name='default'):
+        self.workers = workers
+        self.name = name
+        self._pool = None
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'max_queue_depth': 0,
+            'wait_seconds': 0.0,
+            'parse_seconds': 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls, settings, name='default'):
+        return cls(settings.getint('PARSE_EXECUTOR_WORKERS', 0), name=name)
+
+    def start(self):
+        """Démarre le pool et force le lancement de tous les workers (pré-chauffage)"""
+        if self.workers > 0 and self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+            for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+            logger.info(f"Pool de parsing '{self.name}' démarré ({self.workers} workers)")
+        return self
+
+    @property
+    def queue_depth(self):
+        return self.stats['submitted'] - self.stats['completed']
+
+    async def run(self, func, *args):
+        """Exécute func(*args) dans le pool (ou en ligne) et renvoie son résultat"""
+        self.stats['submitted'] += 1
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue_depth)
+        parse_queue_depth.labels(executor=self.name).set(self.queue_depth)
+        try:
+            if self._pool is None:
+                result, wait, duration = _timed_call(func, args, time.time())
+            else:
+                loop = asyncio.get_running_loop()
+                result, wait, duration = await loop.run_in_executor(
+                    self._pool, _timed_call, func, args, time.time()
+                )
+        finally:
+            self.stats['completed'] += 1
+            parse_queue_depth.labels(executor=self.name).set(self.queue_depth)
+        self.stats['wait_seconds'] += wait
+        self.stats['parse_seconds'] += duration
+        parse_wait_seconds.labels(executor=self.name).observe(wait)
+        parse_seconds.labels(executor=self.name).observe(duration)
+        return result
+
+    def summary(self):
+        done = max(self.stats['completed'], 1)
+        return (
+            f"Parsing '{self.name}': {self.stats['completed']} tâches, "
+            f"file max {self.stats['max_queue_depth']}, "
+            f"attente moy. {self.stats['wait_seconds'] / done * 1000:.1f} ms, "
+            f"parsing moy. {self.stats['parse_seconds'] / done * 1000:.1f} ms"
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -1,6 +1,6 @@
 """
 Pipelines de traitement des items extraits
-Validation, nettoyage, déduplication, archivage et stockage en base
+Validation, nettoyage, déduplication, archivage, stockage en base et alertes
 """
 import os
 import hashlib
@@ -9,8 +9,11 @@ from datetime import datetime
 from pathlib import Path
 import logging
 from scrapy.exceptions import DropItem
+from twisted.internet import task
 from sqlalchemy.exc import IntegrityError
 from database.connection import SessionLocal
+from database.data_version import bump_data_version
+from database.percolator import load_percolator, percolate
 from database.models import (
     Consultation, Lot, PVExtrait, Attribution, Achevement, ExtractionLog
 )
@@ -21,6 +24,7 @@ from prometheus_client import Counter, Histogram
 items_processed = Counter('pmmp_items_processed_total', 'Total items processed', ['type'])
 items_saved = Counter('pmmp_items_saved_total', 'Total items saved to database', ['type'])
 items_dropped = Counter('pmmp_items_dropped_total', 'Total items dropped', ['reason'])
+alerts_created = Counter('pmmp_alerts_created_total', 'Total saved-search notifications created')
 processing_time = Histogram('pmmp_item_processing_seconds', 'Time to process item')
 
 
@@ -85,6 +89,8 @@ class DeduplicationPipeline:
         try:
             refs = db.query(Consultation.ref_consultation).all()
             self.seen_refs = {ref[0] for ref in refs}
+            # Partagé avec DetailSchedulingMiddleware pour prioriser les nouvelles consultations
+            spider.known_refs = self.seen_refs
             spider.logger.info(f"Chargé {len(self.seen_refs)} références existantes")
         finally:
             db.close()
@@ -157,23 +163,56 @@ class ArchivePipeline:
 class DatabasePipeline:
     """Stocke les items dans PostgreSQL"""
     
-    def __init__(self):
+    # Publie une nouvelle version des données (invalidation du cache de l'API) au plus
+    # N secondes après une écriture, et à la fermeture du spider
+    data_version_interval = 5.0
+    
+    def __init__(self, clock=None):
         self.session = None
+        self.clock = clock
+        self.version_timer = None
         self.stats = {
             'inserted': 0,
             'updated': 0,
             'errors': 0
         }
+        self.pending_writes = 0
     
     def open_spider(self, spider):
         self.session = SessionLocal()
+        # Minuterie du reactor: une écriture isolée (fin de crawl lente) est publiée
+        # sans attendre d'autres items
+        self.version_timer = task.LoopingCall(self._bump_if_pending, spider)
+        if self.clock is not None:
+            self.version_timer.clock = self.clock
+        self.version_timer.start(self.data_version_interval, now=False)
         spider.logger.info("Connexion à la base de données établie")
     
     def close_spider(self, spider):
+        if self.version_timer is not None and self.version_timer.running:
+            self.version_timer.stop()
         if self.session:
+            if self.pending_writes:
+                self._bump_data_version(spider)
             self.session.close()
         spider.logger.info(f"Pipeline DB - Stats: {self.stats}")
     
+    def _bump_data_version(self, spider):
+        version = bump_data_version(self.session)
+        self.pending_writes = 0
+        if version is not None:
+            spider.logger.info(f"Version des données: {version}")
+    
+    def _bump_if_pending(self, spider):
+        if not self.pending_writes:
+            return
+        try:
+            self._bump_data_version(spider)
+        except Exception as e:
+            # Base indisponible: nouvel essai au prochain tick (la minuterie s'arrêterait)
+            self.session.rollback()
+            spider.logger.error(f"Erreur de publication de la version des données: {e}")
+    
     def process_item(self, item, spider):
         item_type = item.__class__.__name__
         
@@ -190,6 +229,7 @@ class DatabasePipeline:
                 self._save_achevement(item, spider)
             
             items_saved.labels(type=item_type).inc()
+            self.pending_writes += 1
             return item
         
         except Exception as e:
@@ -253,6 +293,51 @@ class DatabasePipeline:
         self.stats['inserted'] += 1
 
 
+class AlertPipeline:
+    """Confronte les consultations enregistrées aux recherches sauvegardées (alertes)"""
+    
+    # Percolation par lots: un seul INSERT ... ON CONFLICT DO NOTHING par lot
+    batch_size = 100
+    
+    def __init__(self):
+        self.session = None
+        self.percolator = None
+        self.pending = []
+        self.created = 0
+    
+    def open_spider(self, spider):
+        self.session = SessionLocal()
+        self.percolator = load_percolator(self.session)
+    
+    def close_spider(self, spider):
+        if self.session:
+            self._flush(spider)
+            self.session.close()
+        spider.logger.info(f"Pipeline alertes - {self.created} notifications créées")
+    
+    def process_item(self, item, spider):
+        # Placé après DatabasePipeline: la consultation existe en base (clé étrangère)
+        if item.__class__.__name__ == 'ConsultationItem' and len(self.percolator):
+            self.pending.append(dict(item))
+            if len(self.pending) >= self.batch_size:
+                self._flush(spider)
+        return item
+    
+    def _flush(self, spider):
+        if not self.pending:
+            return
+        try:
+            created = percolate(self.session, self.percolator, self.pending)
+        except Exception as e:
+            # Les alertes ne bloquent pas l'extraction
+            self.session.rollback()
+            spider.logger.error(f"Erreur de percolation des alertes: {e}")
+            created = 0
+        self.pending = []
+        self.created += created
+        alerts_created.inc(created)
+
+
 class MetricsPipeline:
     """Collecte des métriques pour Prometheus"""
     
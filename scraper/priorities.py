@@ -0,0 +1,59 @@
+"""
+Politique de priorité des requêtes de détail
+Ordonne les pages détail à partir des données de la ligne du tableau
+(proximité de la date limite, consultation nouvelle ou déjà connue, statut)
+"""
+from datetime import datetime
+
+
+class DetailPriorityPolicy:
+    """
+    Calcule la priorité Scrapy d'une requête de détail à partir de l'item
+    partiellement rempli côté liste. Plus la valeur est haute, plus la
+    requête est servie tôt par le scheduler.
+    """
+
+    # Paliers de proximité de la date limite (heures restantes -> bonus)
+    DEADLINE_BUCKETS = [
+        (24, 500),
+        (72, 400),
+        (7 * 24, 300),
+        (30 * 24, 200),
+    ]
+    DEADLINE_FAR_BONUS = 100
+    DEADLINE_UNKNOWN_BONUS = 50
+    DEADLINE_PASSED_BONUS = 0
+
+    NEW_BONUS = 1000
+    KNOWN_BONUS = 0
+
+    STATUT_BONUS = {
+        'en_cours': 100,
+        'reporte': 80,
+        'cloture': 0,
+        'annule': -100,
+    }
+
+    def __init__(self, known_refs=None):
+        self.known_refs = known_refs if known_refs is not None else set()
+
+    def deadline_bonus(self, date_limite, now=None):
+        """Bonus selon le nombre d'heures restantes avant la date limite"""
+        if not isinstance(date_limite, datetime):
+            return self.DEADLINE_UNKNOWN_BONUS
+        now = now or datetime.now()
+        hours_left = (date_limite - now).total_seconds() / 3600
+        if hours_left < 0:
+            return self.DEADLINE_PASSED_BONUS
+        for max_hours, bonus in self.DEADLINE_BUCKETS:
+            if hours_left <= max_hours:
+                return bonus
+        return self.DEADLINE_FAR_BONUS
+
+    def priority_for(self, item, now=None):
+        """Priorité entière pour la requête de détail associée à l'item"""
+        ref = item.get('ref_consultation')
+        priority = self.KNOWN_BONUS if ref in self.known_refs else self.NEW_BONUS
+        priority += self.deadline_bonus(item.get('date_limite'), now=now)
+        priority += self.STATUT_BONUS.get(item.get('statut'), 0)
+        return priority
@@ -87,8 +87,18 @@ DOWNLOADER_MIDDLEWARES = {
 
 SPIDER_MIDDLEWARES = {
     'scraper.middlewares.CustomSpiderMiddleware': 543,
+    'scraper.middlewares.DetailSchedulingMiddleware': 550,
 }
 
+# Priorisation des pages détail (date limite proche, nouvelles, en cours d'abord)
+# et borne sur les requêtes de détail en vol / retenues
+DETAIL_PRIORITY_ENABLED = os.getenv('DETAIL_PRIORITY_ENABLED', 'True') == 'True'
+DETAIL_MAX_IN_FLIGHT = int(os.getenv('DETAIL_MAX_IN_FLIGHT', 8))
+DETAIL_MAX_PENDING = int(os.getenv('DETAIL_MAX_PENDING', 500))
+
+# Parsing HTML dans un pool de processus (0 = parsing en ligne dans la boucle asyncio)
+PARSE_EXECUTOR_WORKERS = int(os.getenv('PARSE_EXECUTOR_WORKERS', 0))
+
 # Pipelines de traitement des items
 ITEM_PIPELINES = {
     'scraper.pipelines.ValidationPipeline': 100,
@@ -96,6 +106,7 @@ ITEM_PIPELINES = {
     'scraper.pipelines.DeduplicationPipeline': 300,
     'scraper.pipelines.ArchivePipeline': 400,
     'scraper.pipelines.DatabasePipeline': 500,
+    'scraper.pipelines.AlertPipeline': 550,
     'scraper.pipelines.MetricsPipeline': 600,
 }
 
@@ -6,7 +6,9 @@ from scrapy_playwright.page import PageMethod
 from datetime import datetime, timedelta
 import logging
 import re
+from scrapy.http import HtmlResponse
 from scraper.items import ConsultationItem, LotItem
+from scraper.parse_executor import ParseExecutor
 from scraper.selectors import ConsultationsSelectors, DetailConsultationSelectors, URLs
 from urllib.parse import urlsplit, urlunsplit
 try:
@@ -14,6 +16,8 @@ try:
 except Exception:
     ZoneInfo = None
 
+logger = logging.getLogger(__name__)
+
 
 class ConsultationsSpider(scrapy.Spider):
     """
@@ -38,6 +42,15 @@ class ConsultationsSpider(scrapy.Spider):
             'errors': 0
         }
         self.logger.info(f"Initialisation du spider - Statut: {statut}, Période: {periode}")
+        # Parsing en ligne par défaut; remplacé par from_crawler selon les settings
+        self.parse_executor = ParseExecutor(name=self.name)
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Parsing des pages liste/détail hors de la boucle asyncio si PARSE_EXECUTOR_WORKERS > 0
+        spider.parse_executor = ParseExecutor.from_settings(crawler.settings, name=cls.name).start()
+        return spider
     
     def start_requests(self):
         """Point d'entrée du spider"""
@@ -70,38 +83,34 @@ class ConsultationsSpider(scrapy.Spider):
             html = await page.content()
             await page.close()
             
-            # Parser avec Scrapy Selector
-            from scrapy.http import HtmlResponse
-            response = HtmlResponse(url=response.url, body=html, encoding='utf-8')
+            # Parser (éventuellement dans le pool de processus)
+            page_data = await self.parse_executor.run(extract_list_page, html.encode('utf-8'), response.url)
             
             # Extraire les lignes du tableau
-            table = response.css(ConsultationsSelectors.TABLE).get()
-            if not table:
+            if not page_data['has_table']:
                 self.logger.warning(f"Aucun tableau trouvé sur {response.url}")
                 return
             
-            rows = response.css(ConsultationsSelectors.ROWS)
-            self.logger.info(f"Trouvé {len(rows)} consultations sur la page")
-            if len(rows) == 0:
+            self.logger.info(f"Trouvé {page_data['row_count']} consultations sur la page")
+            if page_data['row_count'] == 0:
                 try:
                     import os
                     os.makedirs('logs', exist_ok=True)
                     path = f"logs/empty_consultations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
                     with open(path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
+                        f.write(html)
                     self.logger.warning(f"Aucun item extrait. HTML dumpé dans {path}")
                 except Exception as e:
                     self.logger.error(f"Impossible de sauvegarder le dump HTML: {e}")
             
-            for row in rows:
-                # Extraire les données de la ligne
-                item = self.parse_consultation_row(row, response)
+            for row in page_data['rows']:
+                item = ConsultationItem(row['fields'])
                 
-                if item and item.get('ref_consultation'):
+                if item.get('ref_consultation'):
                     self.stats['consultations_extracted'] += 1
                     
                     # Si un lien vers le détail existe, le suivre
-                    detail_url = row.css(ConsultationsSelectors.DETAIL_LINK + '::attr(href)').get()
+                    detail_url = row['detail_link']
                     if detail_url:
                         detail_url = response.urljoin(detail_url)
                         yield scrapy.Request(
@@ -119,10 +128,7 @@ class ConsultationsSpider(scrapy.Spider):
                         yield item
             
             # Gestion de la pagination
-            next_page = response.css(ConsultationsSelectors.NEXT_PAGE + '::attr(href)').get()
-            if not next_page:
-                # Fallback XPath pour trouver un lien "Suivant"/"Next"
-                next_page = response.xpath("//a[contains(., 'Suivant') or contains(., 'Next')]/@href").get()
+            next_page = page_data['next_page']
 
             if next_page:
                 # Certains liens de pagination sont en javascript: on déclenche alors un clic via Playwright
@@ -162,73 +168,8 @@ class ConsultationsSpider(scrapy.Spider):
     
     def parse_consultation_row(self, row, response):
         """Extrait les données d'une ligne du tableau"""
-        try:
-            item = ConsultationItem()
-            
-            # Extraction des champs
-            item['ref_consultation'] = self.clean_text(
-                row.css(ConsultationsSelectors.REF_CONSULTATION + '::text').get()
-            )
-            item['titre'] = self.clean_text(
-                row.css(ConsultationsSelectors.TITRE + '::text').get()
-            )
-            item['organisme_acronyme'] = self.clean_text(
-                row.css(ConsultationsSelectors.ORGANISME + '::text').get()
-            )
-            item['type_marche'] = self.normalize_type_marche(
-                row.css(ConsultationsSelectors.TYPE_MARCHE + '::text').get()
-            )
-            item['date_publication'] = self.parse_date(
-                row.css(ConsultationsSelectors.DATE_PUBLICATION + '::text').get()
-            )
-            item['date_limite'] = self.parse_date(
-                row.css(ConsultationsSelectors.DATE_LIMITE + '::text').get()
-            )
-            item['statut'] = self.normalize_statut(
-                row.css(ConsultationsSelectors.STATUT + '::text').get()
-            )
-            
-            # URL de détail - IMPORTANT: Ce champ est essentiel pour accéder aux documents
-            # On essaie plusieurs sélecteurs pour maximiser les chances de trouver le lien
-            detail_url = None
-            
-            # Tentative 1: Sélecteur spécifique
-            detail_url = row.css(ConsultationsSelectors.DETAIL_LINK + '::attr(href)').get()
-            
-            # Tentative 2: Chercher tout lien dans la ligne
-            if not detail_url:
-                detail_url = row.css('a::attr(href)').get()
-            
-            # Tentative 3: Chercher un lien contenant "detail" ou "consultation"
-            if not detail_url:
-                all_links = row.css('a::attr(href)').getall()
-                for link in all_links:
-                    if link and ('detail' in link.lower() or 'consultation' in link.lower()):
-                        detail_url = link
-                        break
-            
-            # Construire l'URL complète
-            if detail_url:
-                item['url_detail'] = response.urljoin(detail_url)
-                self.logger.debug(f"✓ URL détail trouvée: {item['url_detail']}")
-            else:
-                # Si aucun lien n'est trouvé, construire l'URL à partir de la référence
-                # (adapter selon le format réel des URLs du site)
-                if item.get('ref_consultation') and item.get('organisme_acronyme'):
-                    item['url_detail'] = f"{URLs.DETAIL_CONSULTATION}&refConsultation={item['ref_consultation']}&orgAcronyme={item['organisme_acronyme']}"
-                    self.logger.warning(f"⚠ URL détail construite: {item['url_detail']}")
-                else:
-                    item['url_detail'] = ''
-                    self.logger.warning(f"✗ Aucune URL détail trouvée pour {item.get('ref_consultation', 'REF_INCONNUE')}")
-            
-            # Métadonnées
-            item['date_extraction'] = datetime.now()
-            
-            return item
-        
-        except Exception as e:
-            self.logger.error(f"Erreur extraction ligne: {e}")
-            return None
+        fields = extract_row_fields(row, response)
+        return ConsultationItem(fields) if fields is not None else None
     
     async def parse_detail_page(self, response):
         """Parse la page de détail d'une consultation"""
@@ -242,54 +183,10 @@ class ConsultationsSpider(scrapy.Spider):
             html = await page.content()
             await page.close()
             
-            from scrapy.http import HtmlResponse
-            detail_response = HtmlResponse(url=response.url, body=html, encoding='utf-8')
+            detail_data = await self.parse_executor.run(extract_detail_page, html.encode('utf-8'), response.url)
             
             # Enrichir l'item avec les détails
-            item['objet'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.OBJET + '::text').get()
-            )
-            item['organisme_nom_complet'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.ORGANISME_NOM + '::text').get()
-            )
-            item['organisme_ville'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.ORGANISME_VILLE + '::text').get()
-            )
-            item['organisme_telephone'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.ORGANISME_TEL + '::text').get()
-            )
-            item['organisme_email'] = detail_response.css(
-                DetailConsultationSelectors.ORGANISME_EMAIL + '::attr(href)'
-            ).get()
-            if item.get('organisme_email'):
-                item['organisme_email'] = item['organisme_email'].replace('mailto:', '')
-            
-            # Montants
-            item['montant_estime'] = self.parse_amount(
-                detail_response.css(DetailConsultationSelectors.MONTANT_ESTIME + '::text').get()
-            )
-            item['cautionnement_provisoire'] = self.parse_amount(
-                detail_response.css(DetailConsultationSelectors.CAUTIONNEMENT + '::text').get()
-            )
-            
-            # Classification
-            item['secteur'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.SECTEUR + '::text').get()
-            )
-            item['code_cpv'] = self.clean_text(
-                detail_response.css(DetailConsultationSelectors.CODE_CPV + '::text').get()
-            )
-            
-            # URLs documents (avec fallback XPath sur le texte)
-            avis_href = detail_response.css(DetailConsultationSelectors.URL_AVIS + '::attr(href)').get()
-            if not avis_href:
-                avis_href = detail_response.xpath("//a[contains(., 'Avis') or contains(., 'avis')]/@href").get()
-            item['url_avis'] = detail_response.urljoin(avis_href or '')
-
-            dce_href = detail_response.css(DetailConsultationSelectors.URL_DCE + '::attr(href)').get()
-            if not dce_href:
-                dce_href = detail_response.xpath("//a[contains(., 'DCE') or contains(., 'dce')]/@href").get()
-            item['url_dce'] = detail_response.urljoin(dce_href or '')
+            item.update(detail_data['fields'])
 
             # Enregistrer l'URL de détail au cas où elle n'aurait pas été posée côté liste
             if not item.get('url_detail'):
@@ -301,11 +198,11 @@ class ConsultationsSpider(scrapy.Spider):
             yield item
             
             # Extraire les lots s'il y en a
-            lots_rows = detail_response.css(DetailConsultationSelectors.LOT_ROW)
-            for lot_row in lots_rows:
-                lot_item = self.parse_lot(lot_row, item['ref_consultation'])
-                if lot_item:
-                    yield lot_item
+            for lot_fields in detail_data['lots']:
+                lot = LotItem(lot_fields)
+                lot['ref_consultation'] = item['ref_consultation']
+                lot['date_extraction'] = datetime.now()
+                yield lot
         
         except Exception as e:
             self.logger.error(f"Erreur parsing détail {response.url}: {e}")
@@ -317,32 +214,30 @@ class ConsultationsSpider(scrapy.Spider):
     
     def parse_lot(self, row, ref_consultation):
         """Extrait les informations d'un lot"""
-        try:
-            lot = LotItem()
-            lot['ref_consultation'] = ref_consultation
-            lot['numero_lot'] = self.clean_text(row.css('td:nth-child(1)::text').get())
-            lot['designation'] = self.clean_text(row.css('td:nth-child(2)::text').get())
-            lot['montant_estime'] = self.parse_amount(row.css('td:nth-child(3)::text').get())
-            lot['date_extraction'] = datetime.now()
-            return lot
-        except Exception as e:
-            self.logger.error(f"Erreur extraction lot: {e}")
+        fields = extract_lot_fields(row)
+        if fields is None:
             return None
+        lot = LotItem(fields)
+        lot['ref_consultation'] = ref_consultation
+        lot['date_extraction'] = datetime.now()
+        return lot
     
     # Méthodes utilitaires
-    def clean_text(self, text):
+    @staticmethod
+    def clean_text(text):
         """Nettoie et normalise le texte"""
         if not text:
             return None
         return ' '.join(text.strip().split())
     
-    def parse_date(self, date_str):
+    @staticmethod
+    def parse_date(date_str):
         """Parse une date au format du site"""
         if not date_str:
             return None
         try:
             # Adapter selon le format réel (ex: "23/10/2025" ou "2025-10-23")
-            date_str = self.clean_text(date_str)
+            date_str = ConsultationsSpider.clean_text(date_str)
             # Essayer différents formats
             for fmt in ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y %H:%M']:
                 try:
@@ -351,10 +246,11 @@ class ConsultationsSpider(scrapy.Spider):
                     continue
             return None
         except Exception as e:
-            self.logger.warning(f"Impossible de parser la date '{date_str}': {e}")
+            logger.warning(f"Impossible de parser la date '{date_str}': {e}")
             return None
     
-    def parse_amount(self, amount_str):
+    @staticmethod
+    def parse_amount(amount_str):
         """Parse un montant (ex: '1 234 567,89 DH')"""
         if not amount_str:
             return None
@@ -366,7 +262,8 @@ class ConsultationsSpider(scrapy.Spider):
         except Exception:
             return None
     
-    def normalize_type_marche(self, type_str):
+    @staticmethod
+    def normalize_type_marche(type_str):
         """Normalise le type de marché"""
         if not type_str:
             return None
@@ -381,7 +278,8 @@ class ConsultationsSpider(scrapy.Spider):
             return 'etudes'
         return type_str
     
-    def normalize_statut(self, statut_str):
+    @staticmethod
+    def normalize_statut(statut_str):
         """Normalise le statut"""
         if not statut_str:
             return 'en_cours'
@@ -406,3 +304,188 @@ class ConsultationsSpider(scrapy.Spider):
         """Appelé à la fin du spider"""
         self.logger.info(f"Spider fermé: {reason}")
         self.logger.info(f"Statistiques finales: {self.stats}")
+        self.logger.info(self.parse_executor.summary())
+        self.parse_executor.shutdown()
+
+
+# ----------------------------------------------------------------------
+# Extraction pure (sans état du spider), exécutable dans le pool de parsing:
+# les fonctions prennent les octets HTML bruts et renvoient des dict picklables.
+# ----------------------------------------------------------------------
+
+def extract_row_fields(row, response):
+    """Extrait les champs d'une ligne du tableau des consultations"""
+    try:
+        item = {}
+        
+        # Extraction des champs
+        item['ref_consultation'] = ConsultationsSpider.clean_text(
+            row.css(ConsultationsSelectors.REF_CONSULTATION + '::text').get()
+        )
+        item['titre'] = ConsultationsSpider.clean_text(
+            row.css(ConsultationsSelectors.TITRE + '::text').get()
+        )
+        item['organisme_acronyme'] = ConsultationsSpider.clean_text(
+            row.css(ConsultationsSelectors.ORGANISME + '::text').get()
+        )
+        item['type_marche'] = ConsultationsSpider.normalize_type_marche(
+            row.css(ConsultationsSelectors.TYPE_MARCHE + '::text').get()
+        )
+        item['date_publication'] = ConsultationsSpider.parse_date(
+            row.css(ConsultationsSelectors.DATE_PUBLICATION + '::text').get()
+        )
+        item['date_limite'] = ConsultationsSpider.parse_date(
+            row.css(ConsultationsSelectors.DATE_LIMITE + '::text').get()
+        )
+        item['statut'] = ConsultationsSpider.normalize_statut(
+            row.css(ConsultationsSelectors.STATUT + '::text').get()
+        )
+        
+        # URL de détail - IMPORTANT: Ce champ est essentiel pour accéder aux documents
+        # On essaie plusieurs sélecteurs pour maximiser les chances de trouver le lien
+        detail_url = None
+        
+        # Tentative 1: Sélecteur spécifique
+        detail_url = row.css(ConsultationsSelectors.DETAIL_LINK + '::attr(href)').get()
+        
+        # Tentative 2: Chercher tout lien dans la ligne
+        if not detail_url:
+            detail_url = row.css('a::attr(href)').get()
+        
+        # Tentative 3: Chercher un lien contenant "detail" ou "consultation"
+        if not detail_url:
+            all_links = row.css('a::attr(href)').getall()
+            for link in all_links:
+                if link and ('detail' in link.lower() or 'consultation' in link.lower()):
+                    detail_url = link
+                    break
+        
+        # Construire l'URL complète
+        if detail_url:
+            item['url_detail'] = response.urljoin(detail_url)
+            logger.debug(f"✓ URL détail trouvée: {item['url_detail']}")
+        else:
+            # Si aucun lien n'est trouvé, construire l'URL à partir de la référence
+            # (adapter selon le format réel des URLs du site)
+            if item.get('ref_consultation') and item.get('organisme_acronyme'):
+                item['url_detail'] = f"{URLs.DETAIL_CONSULTATION}&refConsultation={item['ref_consultation']}&orgAcronyme={item['organisme_acronyme']}"
+                logger.warning(f"⚠ URL détail construite: {item['url_detail']}")
+            else:
+                item['url_detail'] = ''
+                logger.warning(f"✗ Aucune URL détail trouvée pour {item.get('ref_consultation', 'REF_INCONNUE')}")
+        
+        # Métadonnées
+        item['date_extraction'] = datetime.now()
+        
+        return item
+    
+    except Exception as e:
+        logger.error(f"Erreur extraction ligne: {e}")
+        return None
+
+
+def extract_lot_fields(row):
+    """Extrait les champs d'une ligne de lot"""
+    try:
+        return {
+            'numero_lot': ConsultationsSpider.clean_text(row.css('td:nth-child(1)::text').get()),
+            'designation': ConsultationsSpider.clean_text(row.css('td:nth-child(2)::text').get()),
+            'montant_estime': ConsultationsSpider.parse_amount(row.css('td:nth-child(3)::text').get()),
+        }
+    except Exception as e:
+        logger.error(f"Erreur extraction lot: {e}")
+        return None
+
+
+def extract_list_page(body, url):
+    """
+    Parse une page liste: lignes (champs + lien détail brut) et lien de pagination.
+    Retourne {'has_table', 'row_count', 'rows': [{'fields', 'detail_link'}], 'next_page'}
+    """
+    response = HtmlResponse(url=url, body=body, encoding='utf-8')
+    result = {'has_table': False, 'row_count': 0, 'rows': [], 'next_page': None}
+    if not response.css(ConsultationsSelectors.TABLE).get():
+        return result
+    
+    result['has_table'] = True
+    rows = response.css(ConsultationsSelectors.ROWS)
+    result['row_count'] = len(rows)
+    for row in rows:
+        fields = extract_row_fields(row, response)
+        if fields is None:
+            continue
+        result['rows'].append({
+            'fields': fields,
+            'detail_link': row.css(ConsultationsSelectors.DETAIL_LINK + '::attr(href)').get(),
+        })
+    
+    next_page = response.css(ConsultationsSelectors.NEXT_PAGE + '::attr(href)').get()
+    if not next_page:
+        # Fallback XPath pour trouver un lien "Suivant"/"Next"
+        next_page = response.xpath("//a[contains(., 'Suivant') or contains(., 'Next')]/@href").get()
+    result['next_page'] = next_page
+    return result
+
+
+def extract_detail_page(body, url):
+    """
+    Parse une page détail.
+    Retourne {'fields': {champs de ConsultationItem}, 'lots': [{champs de LotItem}]}
+    """
+    detail_response = HtmlResponse(url=url, body=body, encoding='utf-8')
+    clean_text = ConsultationsSpider.clean_text
+    parse_amount = ConsultationsSpider.parse_amount
+    fields = {}
+    
+    fields['objet'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.OBJET + '::text').get()
+    )
+    fields['organisme_nom_complet'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.ORGANISME_NOM + '::text').get()
+    )
+    fields['organisme_ville'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.ORGANISME_VILLE + '::text').get()
+    )
+    fields['organisme_telephone'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.ORGANISME_TEL + '::text').get()
+    )
+    fields['organisme_email'] = detail_response.css(
+        DetailConsultationSelectors.ORGANISME_EMAIL + '::attr(href)'
+    ).get()
+    if fields.get('organisme_email'):
+        fields['organisme_email'] = fields['organisme_email'].replace('mailto:', '')
+    
+    # Montants
+    fields['montant_estime'] = parse_amount(
+        detail_response.css(DetailConsultationSelectors.MONTANT_ESTIME + '::text').get()
+    )
+    fields['cautionnement_provisoire'] = parse_amount(
+        detail_response.css(DetailConsultationSelectors.CAUTIONNEMENT + '::text').get()
+    )
+    
+    # Classification
+    fields['secteur'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.SECTEUR + '::text').get()
+    )
+    fields['code_cpv'] = clean_text(
+        detail_response.css(DetailConsultationSelectors.CODE_CPV + '::text').get()
+    )
+    
+    # URLs documents (avec fallback XPath sur le texte)
+    avis_href = detail_response.css(DetailConsultationSelectors.URL_AVIS + '::attr(href)').get()
+    if not avis_href:
+        avis_href = detail_response.xpath("//a[contains(., 'Avis') or contains(., 'avis')]/@href").get()
+    fields['url_avis'] = detail_response.urljoin(avis_href or '')
+
+    dce_href = detail_response.css(DetailConsultationSelectors.URL_DCE + '::attr(href)').get()
+    if not dce_href:
+        dce_href = detail_response.xpath("//a[contains(., 'DCE') or contains(., 'dce')]/@href").get()
+    fields['url_dce'] = detail_response.urljoin(dce_href or '')
+    
+    lots = []
+    for lot_row in detail_response.css(DetailConsultationSelectors.LOT_ROW):
+        lot_fields = extract_lot_fields(lot_row)
+        if lot_fields:
+            lots.append(lot_fields)
+    
+    return {'fields': fields, 'lots': lots}
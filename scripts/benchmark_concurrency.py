@@ -0,0 +1,111 @@
+"""
+Benchmark de concurrence de l'API: latences p50 / p99 par endpoint sous charge mixte
+
+N clients concurrents enchaînent des requêtes tirées dans un mélange pondéré
+(listes, détail, recherche, statistiques complètes). Une requête lente qui bloque la
+boucle asyncio retarde toutes les autres: le p99 des requêtes rapides le montre.
+
+Par défaut l'application est appelée en processus (httpx.ASGITransport, base de
+DATABASE_URL, cache des réponses inactif: chaque requête atteint la base).
+--url vise un serveur uvicorn déjà lancé. Pour comparer avant / après une
+modification, lancer le script sur les deux versions du code.
+
+Usage:
+    python scripts/benchmark_concurrency.py [--clients 50] [--requests 2000] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+# (étiquette, chemin, poids)
+MIX = [
+    ('liste', '/api/v1/consultations?limit=50', 40),
+    ('liste_filtree', '/api/v1/consultations?statut=en_cours&limit=50', 15),
+    ('detail', '/api/v1/consultations/{ref}', 25),
+    ('recherche', '/api/v1/consultations/search?q=travaux&limit=20', 10),
+    ('stats', '/api/v1/stats', 5),
+    ('top_organismes', '/api/v1/stats/organismes?limit=20', 5),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def worker(client, jobs, refs, latencies, errors):
+    while True:
+        try:
+            label, path = jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        path = path.format(ref=random.choice(refs))
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        latencies[label].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            errors[label] += 1
+
+
+async def run(base_url, clients, total):
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        from api.main import app, configure_threadpool
+        configure_threadpool()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench', timeout=60)
+
+    async with client:
+        first = await client.get('/api/v1/consultations?limit=200')
+        refs = [c['ref_consultation'] for c in first.json()] or ['inconnue']
+
+        labels, paths, weights = zip(*[(label, path, weight) for label, path, weight in MIX])
+        jobs = asyncio.Queue()
+        for i in random.choices(range(len(MIX)), weights=weights, k=total):
+            jobs.put_nowait((labels[i], paths[i]))
+
+        latencies, errors = defaultdict(list), defaultdict(int)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, jobs, refs, latencies, errors) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{total} requêtes, {clients} clients, {elapsed:.1f}s, {total / elapsed:.0f} req/s\n")
+    print(f"  {'endpoint':<16}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'erreurs':>9}")
+    everything = []
+    for label in labels:
+        values = latencies[label]
+        if not values:
+            continue
+        everything.extend(values)
+        print(f"  {label:<16}{len(values):>6}{statistics.median(values):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{max(values):>10.1f}{errors[label]:>9}")
+    print(f"  {'total':<16}{len(everything):>6}{statistics.median(everything):>10.1f}"
+          f"{percentile(everything, 99):>10.1f}{max(everything):>10.1f}{sum(errors.values()):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrence de l'API PMMP")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--url', help="serveur à viser (défaut: application en processus)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(run(args.url, args.clients, args.requests))
+
+
+if __name__ == '__main__':
+    main()
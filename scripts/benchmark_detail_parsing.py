@@ -0,0 +1,78 @@
+"""
+Différentiel + benchmark des parseurs de pages détail du scraper httpx
+
+Pour chaque page détail archivée, compare parse_consultation_detail (BeautifulSoup,
+référence) et parse_consultation_detail_fast (lxml, bloc #recap-consultation seul),
+puis mesure le débit de chacun en pages/s par cœur (temps CPU, un seul processus).
+
+Usage:
+    python scripts/benchmark_detail_parsing.py [fichier_ou_dossier ...] [--repeat N]
+
+Par défaut: toutes les pages .html de data/archives/.
+"""
+import sys
+import os
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pmmp_consultations_scraper import parse_consultation_detail, parse_consultation_detail_fast
+
+
+def collect_pages(args):
+    paths = []
+    for arg in args or [os.path.join('data', 'archives')]:
+        p = Path(arg)
+        if p.is_dir():
+            paths.extend(sorted(p.rglob('*.html')))
+        elif p.exists():
+            paths.append(p)
+    return paths
+
+
+def pages_per_second(func, pages, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    elapsed = max(time.process_time() - start, 1e-9)
+    return len(pages) * repeat / elapsed
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = 3
+    if '--repeat' in args:
+        i = args.index('--repeat')
+        repeat = int(args[i + 1])
+        del args[i:i + 2]
+
+    paths = collect_pages(args)
+    if not paths:
+        print("Aucune page détail trouvée (data/archives/ vide?)")
+        sys.exit(1)
+
+    pages = [p.read_text(encoding='utf-8', errors='replace') for p in paths]
+
+    # Différentiel
+    mismatches = 0
+    for path, html in zip(paths, pages):
+        ref = parse_consultation_detail(html)
+        fast = parse_consultation_detail_fast(html)
+        if ref != fast:
+            mismatches += 1
+            diff = {k: (ref.get(k), fast.get(k)) for k in set(ref) | set(fast) if ref.get(k) != fast.get(k)}
+            print(f"❌ {path}: {diff}")
+    print(f"Différentiel: {len(pages) - mismatches}/{len(pages)} pages identiques")
+
+    # Débit
+    ref_pps = pages_per_second(parse_consultation_detail, pages, repeat)
+    fast_pps = pages_per_second(parse_consultation_detail_fast, pages, repeat)
+    print(f"  BeautifulSoup (référence) : {ref_pps:8.1f} pages/s/cœur")
+    print(f"  lxml bloc recap (rapide)  : {fast_pps:8.1f} pages/s/cœur (x{fast_pps / ref_pps:.1f})")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark des plans des filtres texte organisme / entreprise sur PostgreSQL
+
+Pour chaque colonne filtrée, prend une valeur réelle (la plus fréquente) et compare
+avec EXPLAIN (ANALYZE, BUFFERS) les modes de match_filter (api/crud.py): exact et prefix
+(B-tree lower(col) text_pattern_ops), contains (ILIKE '%x%', par défaut) et fuzzy
+(GIN pg_trgm, fuzzy testé aussi avec une faute de frappe).
+
+Prérequis: base peuplée et migrations appliquées (python -m database.migrations).
+
+Usage:
+    python scripts/benchmark_filters.py [--repeat N] [--limit N]
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from api.crud import match_filter
+from benchmark_search import benchmark
+from database.connection import engine
+from database.models import Attribution, Consultation, PVExtrait
+
+# (modèle, colonne filtrée, tri de la liste correspondante)
+FILTERED_COLUMNS = [
+    (Consultation, Consultation.organisme_acronyme, Consultation.date_publication),
+    (PVExtrait, PVExtrait.organisme_acronyme, PVExtrait.date_publication_pv),
+    (Attribution, Attribution.organisme_acronyme, Attribution.date_attribution),
+    (Attribution, Attribution.entreprise_nom, Attribution.date_attribution),
+]
+
+
+def typo(value: str) -> str:
+    """Inverse deux caractères au milieu de la valeur (faute de frappe)"""
+    if len(value) < 4:
+        return value
+    i = len(value) // 2
+    return value[:i - 1] + value[i] + value[i - 1] + value[i + 1:]
+
+
+def main():
+    args = sys.argv[1:]
+    repeat, limit = 5, 100
+    for flag in ('--repeat', '--limit'):
+        if flag in args:
+            i = args.index(flag)
+            value = int(args[i + 1])
+            del args[i:i + 2]
+            if flag == '--repeat':
+                repeat = value
+            else:
+                limit = value
+
+    with engine.connect() as conn:
+        session = Session(bind=conn)
+        for model, column, sort_column in FILTERED_COLUMNS:
+            sample = session.query(column).group_by(column).order_by(func.count().desc()).limit(1).scalar()
+            total = session.query(func.count()).select_from(model).scalar()
+            print(f"{model.__tablename__}.{column.key}: {total} lignes, valeur « {sample} »")
+            if not sample:
+                print("  (table vide)\n")
+                continue
+
+            base = session.query(model).order_by(sort_column.desc())
+            cases = [
+                ('exact', match_filter(session, column, sample, 'exact')),
+                ('prefix', match_filter(session, column, sample[:3], 'prefix')),
+                ('contains', match_filter(session, column, sample[1:-1] or sample, 'contains')),
+                ('fuzzy', match_filter(session, column, sample[1:-1] or sample, 'fuzzy')),
+                ('fuzzy~', match_filter(session, column, typo(sample), 'fuzzy')),
+            ]
+            for label, condition in cases:
+                benchmark(conn, label, base.filter(condition).limit(limit), repeat)
+            print()
+
+
+if __name__ == '__main__':
+    main()
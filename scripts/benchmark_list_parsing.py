@@ -0,0 +1,71 @@
+"""
+Benchmark du parsing des pages liste du scraper httpx
+
+Compare, sur une page liste sauvegardée, l'ancien chemin (trois arbres BeautifulSoup:
+liens détail, pagination, formulaire de taille de page) au modèle ListPage (un seul
+arbre lxml partagé). Vérifie aussi que les deux chemins donnent les mêmes résultats.
+
+Usage:
+    python scripts/benchmark_list_parsing.py [logs/consultations_list.html] [repetitions]
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+from pmmp_consultations_scraper import (
+    BASE_URL, ListPage, parse_consultation_links, find_next_page_url
+)
+
+
+def legacy_parse(html):
+    """Chemin d'origine: chaque étape reconstruit son propre arbre BeautifulSoup"""
+    links = parse_consultation_links(html, BASE_URL)
+    next_url = find_next_page_url(html, BASE_URL)
+    soup = BeautifulSoup(html, "lxml")  # ensure_page_size_500
+    form = soup.find("form")
+    return links, next_url, form
+
+
+def single_parse(html):
+    """Chemin ListPage: un seul arbre lxml"""
+    page = ListPage(html)
+    return page.detail_links, page.next_page_url, page.page_size_request("500")
+
+
+def bench(func, html, repetitions):
+    """Temps CPU moyen par page (ms)"""
+    start = time.process_time()
+    for _ in range(repetitions):
+        func(html)
+    return (time.process_time() - start) * 1000 / repetitions
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('logs', 'consultations_list.html')
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    if not os.path.exists(path):
+        print(f"Fichier introuvable: {path} (lancer d'abord scripts/pmmp_consultations_scraper.py)")
+        sys.exit(1)
+
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+
+    legacy_links, legacy_next, _ = legacy_parse(html)
+    page = ListPage(html)
+    if page.detail_links != legacy_links or page.next_page_url != legacy_next:
+        print("❌ Résultats différents entre BeautifulSoup et ListPage")
+        sys.exit(1)
+
+    print(f"Page: {path} ({len(html) / 1024:.0f} Ko, {len(legacy_links)} liens détail)")
+    legacy_ms = bench(legacy_parse, html, repetitions)
+    single_ms = bench(single_parse, html, repetitions)
+    print(f"  BeautifulSoup x3 : {legacy_ms:8.1f} ms CPU/page")
+    print(f"  ListPage (lxml)  : {single_ms:8.1f} ms CPU/page")
+    print(f"  Gain             : {legacy_ms - single_ms:8.1f} ms CPU/page (x{legacy_ms / max(single_ms, 1e-9):.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark du percolateur de recherches sauvegardées (database/percolator.py)
+
+Génère des recherches et des consultations synthétiques (vocabulaire à distribution
+de Zipf, comme les titres réels: quelques mots très fréquents, beaucoup de mots rares)
+et compare, pour chaque consultation, le percolateur à la vérification naïve de toutes
+les recherches une à une. Les deux doivent donner exactement les mêmes correspondances.
+
+Aucune base n'est nécessaire.
+
+Usage:
+    python scripts/benchmark_percolator.py [--searches N] [--docs N] [--seed N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import TypeMarche
+from database.percolator import Document, Percolator, SearchSpec
+
+COMMON_WORDS = [
+    'travaux', 'fourniture', 'entretien', 'construction', 'route', 'batiment', 'materiel',
+    'informatique', 'etude', 'assistance', 'technique', 'reseau', 'eau', 'assainissement',
+    'nettoyage', 'gardiennage', 'amenagement', 'rehabilitation', 'station', 'epuration',
+    'ecole', 'hopital', 'equipement', 'mobilier', 'bureau', 'vehicule', 'maintenance',
+    'electricite', 'eclairage', 'public', 'voirie', 'piste', 'rurale', 'commune', 'province',
+]
+TYPES = [t.value for t in TypeMarche]
+
+
+def vocabulary(size: int):
+    words = COMMON_WORDS + [f'mot{i}' for i in range(size - len(COMMON_WORDS))]
+    # Consultations: Zipf, le rang r est tiré avec une probabilité en 1/r.
+    # Recherches: distribution plus plate (les alertes visent des termes précis)
+    doc_weights = [1 / rank for rank in range(1, len(words) + 1)]
+    search_weights = [1 / rank ** 0.5 for rank in range(1, len(words) + 1)]
+    return words, doc_weights, search_weights
+
+
+def random_searches(rng, count, words, weights, organismes):
+    searches = []
+    for i in range(count):
+        keywords = rng.choices(words, weights, k=rng.choice([1, 1, 2, 2, 3]))
+        amount = rng.random() < 0.3
+        low = rng.choice([None, 100_000, 1_000_000, 5_000_000]) if amount else None
+        high = rng.choice([None, 2_000_000, 20_000_000]) if amount else None
+        if amount and low is None and high is None:
+            high = 1_000_000
+        searches.append(SearchSpec(
+            id=i,
+            keywords=frozenset(keywords) if rng.random() < 0.95 else frozenset(),
+            organisme=rng.choice(organismes) if rng.random() < 0.5 else None,
+            type_marche=rng.choice(TYPES) if rng.random() < 0.4 else None,
+            montant_min=float(low) if low is not None else None,
+            montant_max=float(high) if high is not None else None,
+        ))
+    return searches
+
+
+def random_documents(rng, count, words, weights, organismes):
+    return [
+        Document(
+            ref=f'DOC-{i}',
+            tokens=frozenset(rng.choices(words, weights, k=rng.randint(15, 35))),
+            organisme=rng.choice(organismes),
+            type_marche=rng.choice(TYPES),
+            montant=rng.lognormvariate(14, 1.5) if rng.random() < 0.8 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du percolateur de recherches sauvegardées")
+    parser.add_argument('--searches', type=int, default=10_000)
+    parser.add_argument('--docs', type=int, default=2_000)
+    parser.add_argument('--vocabulary', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words, doc_weights, search_weights = vocabulary(args.vocabulary)
+    organismes = [f'ORG{i}' for i in range(200)]
+    searches = random_searches(rng, args.searches, words, search_weights, organismes)
+    docs = random_documents(rng, args.docs, words, doc_weights, organismes)
+
+    start = time.perf_counter()
+    percolator = Percolator(searches)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    naive = [[s.id for s in searches if s.matches(doc)] for doc in docs]
+    naive_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [percolator.match(doc) for doc in docs]
+    indexed_s = time.perf_counter() - start
+
+    assert [sorted(ids) for ids in indexed] == [sorted(ids) for ids in naive], "résultats différents"
+    candidates = sum(percolator.candidates(doc).bit_count() for doc in docs) / len(docs)
+    matches = sum(len(ids) for ids in naive) / len(docs)
+
+    print(f"{args.searches} recherches, {args.docs} consultations, vocabulaire {args.vocabulary} mots")
+    print(f"  index construit en {build_ms:.0f} ms")
+    print(f"  naïf        {naive_s * 1e6 / len(docs):>9.1f} µs / consultation")
+    print(f"  percolateur {indexed_s * 1e6 / len(docs):>9.1f} µs / consultation"
+          f"  ({candidates:.1f} candidats, {matches:.1f} correspondances en moyenne)")
+    print(f"  gain x{naive_s / max(indexed_s, 1e-9):.1f}, résultats identiques")
+
+
+if __name__ == '__main__':
+    main()
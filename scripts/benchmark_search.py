@@ -0,0 +1,87 @@
+"""
+Benchmark des plans de recherche de consultations sur PostgreSQL
+
+Pour chaque terme, compare la recherche ILIKE '%terme%' (ancienne implémentation,
+ilike_search_query) et la recherche plein texte (fulltext_search_query: tsvector
+généré + GIN + ts_rank) avec EXPLAIN (ANALYZE, BUFFERS): nœuds du plan, index
+utilisés, temps d'exécution médian et nombre de résultats.
+
+Prérequis: base peuplée (scripts/ingest_jsonl.py) et migrations appliquées
+(python -m database.migrations).
+
+Usage:
+    python scripts/benchmark_search.py [terme ...] [--repeat N] [--limit N]
+"""
+import os
+import statistics
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import Session
+
+from api.crud import fulltext_search_query, ilike_search_query
+from database.connection import engine
+
+DEFAULT_TERMS = ['travaux', 'fourniture matériel informatique', 'route', 'station épuration', 'entretien']
+
+
+def plan_nodes(plan):
+    """Parcours du plan JSON: (type de nœud, index éventuel)"""
+    yield plan['Node Type'], plan.get('Index Name')
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(conn, query):
+    """EXPLAIN ANALYZE d'une requête ORM; retourne (plan racine, temps ms, lignes)"""
+    compiled = query.statement.compile(dialect=engine.dialect)
+    result = conn.exec_driver_sql(
+        'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + str(compiled), compiled.params
+    ).scalar()
+    root = result[0]
+    return root['Plan'], root['Execution Time'], root['Plan']['Actual Rows']
+
+
+def describe(plan):
+    nodes = list(plan_nodes(plan))
+    scans = [f"{kind}({index})" if index else kind for kind, index in nodes if 'Scan' in kind]
+    return ', '.join(scans) or nodes[0][0]
+
+
+def benchmark(conn, label, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        plan, ms, rows = explain(conn, query)
+        timings.append(ms)
+    print(f"  {label:<10} {statistics.median(timings):>9.2f} ms  {rows:>5} lignes  {describe(plan)}")
+    return statistics.median(timings)
+
+
+def main():
+    args = sys.argv[1:]
+    repeat, limit = 5, 100
+    for flag in ('--repeat', '--limit'):
+        if flag in args:
+            i = args.index(flag)
+            value = int(args[i + 1])
+            del args[i:i + 2]
+            if flag == '--repeat':
+                repeat = value
+            else:
+                limit = value
+    terms = args or DEFAULT_TERMS
+
+    with engine.connect() as conn:
+        total = conn.exec_driver_sql('SELECT count(*) FROM consultations').scalar()
+        print(f"consultations: {total} lignes, {repeat} exécutions par requête, limit {limit}\n")
+        session = Session(bind=conn)
+        for term in terms:
+            print(f"« {term} »")
+            ilike_ms = benchmark(conn, 'ILIKE', ilike_search_query(session, term).limit(limit), repeat)
+            fts_ms = benchmark(conn, 'FTS', fulltext_search_query(session, term).limit(limit), repeat)
+            print(f"  gain x{ilike_ms / max(fts_ms, 1e-6):.1f}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,9 @@
 """
 Script pour exporter les données vers différents formats
+
+Usage:
+    python scripts/export_data.py             # CSV consultations + JSON attributions
+    python scripts/export_data.py --parquet   # Parquet de toutes les tables
 """
 import sys
 import os
@@ -7,9 +11,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.connection import SessionLocal
 from database.models import Consultation, Attribution
+from api.export import COLUMNAR_TABLES, arrow_schema, iter_record_batches
 import csv
 import json
 from datetime import datetime
+from pathlib import Path
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -79,10 +85,51 @@ def export_attributions_to_json(output_file='attributions_export.json'):
         db.close()
 
 
+def export_table_to_parquet(table, output_dir, batch_size=50000, rows_per_file=1000000):
+    """
+    Exporte une table (consultations, lots, pv, attributions) en fichiers Parquet
+    output_dir/<table>/part-00000.parquet, ... (un row group par lot)
+    
+    Lecture par lots de colonnes (curseur serveur, sans objets ORM), types conservés:
+    décimaux, dates, dictionnaires pour organisme_acronyme / type_marche / statut.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = arrow_schema(table)
+    target = Path(output_dir) / table
+    target.mkdir(parents=True, exist_ok=True)
+    
+    db = SessionLocal()
+    writer, part, rows_in_file, total = None, 0, 0, 0
+    try:
+        for batch in iter_record_batches(db, table, batch_size):
+            if writer is None:
+                writer = pq.ParquetWriter(target / f'part-{part:05d}.parquet', schema, compression='zstd')
+            writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            rows_in_file += batch.num_rows
+            total += batch.num_rows
+            if rows_in_file >= rows_per_file:
+                writer.close()
+                writer, part, rows_in_file = None, part + 1, 0
+    finally:
+        if writer is not None:
+            writer.close()
+        db.close()
+    
+    logger.info(f"✅ Export Parquet {table}: {total} lignes -> {target}")
+    return total
+
+
 if __name__ == "__main__":
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
-    export_consultations_to_csv(f'data/exports/consultations_{timestamp}.csv')
-    export_attributions_to_json(f'data/exports/attributions_{timestamp}.json')
+    if '--parquet' in sys.argv:
+        # Export colonnaire de toutes les tables (nécessite pyarrow)
+        for table in COLUMNAR_TABLES:
+            export_table_to_parquet(table, f'data/exports/parquet_{timestamp}')
+    else:
+        export_consultations_to_csv(f'data/exports/consultations_{timestamp}.csv')
+        export_attributions_to_json(f'data/exports/attributions_{timestamp}.json')
     
     logger.info("🎉 Exports terminés!")
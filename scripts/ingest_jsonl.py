@@ -0,0 +1,259 @@
+"""
+Ingestion du JSONL du scraper httpx (consultations.jsonl) dans la table consultations
+
+Le fichier est lu par blocs (segments .gz compris, via JsonlStore), chaque bloc est
+normalisé en opérations vectorisées pandas/NumPy (montants "1 227 400,00", dates
+"14/10/2026 09:00") puis inséré en un seul INSERT ... ON CONFLICT (ref_consultation)
+DO UPDATE. Les lignes sans champ obligatoire sont rejetées et comptées par motif.
+
+Correspondance des champs:
+    ref -> ref_consultation, orgAcronyme -> organisme_acronyme, objet -> titre/objet,
+    categorie -> type_marche, entite_publique -> organisme_nom_complet,
+    estimation_ttc -> montant_estime, caution_provisoire -> cautionnement_provisoire,
+    date_limite -> date_limite (statut en_cours/cloture déduit), scraped_at -> date_extraction.
+Le JSONL ne porte pas la date de mise en ligne: date_publication vaut la date de collecte.
+
+Usage:
+    python scripts/ingest_jsonl.py [consultations.jsonl] [--chunk-size 5000] [--dry-run] [--rejects rejets.jsonl]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsonl_store import JsonlStore
+from database.data_version import bump_data_version
+from database.models import Consultation
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Catégorie PMMP -> TypeMarche
+TYPE_MARCHE_MAP = {
+    'travaux': 'travaux',
+    'fournitures': 'fournitures',
+    'services': 'services',
+    'etudes': 'etudes',
+    'études': 'etudes',
+}
+
+# Longueurs des colonnes String du modèle Consultation
+COLUMN_LENGTHS = {
+    'ref_consultation': 100,
+    'organisme_acronyme': 50,
+    'organisme_nom_complet': 255,
+    'url_detail': 500,
+}
+
+# Numeric(15, 2): valeur absolue strictement inférieure à 10^13
+MAX_AMOUNT = 1e13
+
+REQUIRED_COLUMNS = ('ref_consultation', 'organisme_acronyme', 'titre', 'type_marche', 'date_publication')
+
+CONSULTATION_COLUMNS = [
+    'ref_consultation', 'organisme_acronyme', 'titre', 'objet', 'type_marche',
+    'date_publication', 'date_limite', 'statut', 'montant_estime', 'cautionnement_provisoire',
+    'organisme_nom_complet', 'url_detail', 'date_extraction',
+]
+
+
+@dataclass
+class IngestStats:
+    read: int = 0
+    upserted: int = 0
+    duplicates: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    def reject(self, reason: str, count: int) -> None:
+        if count:
+            self.rejected[reason] = self.rejected.get(reason, 0) + count
+
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.read} lues, {self.upserted} upsertées, {self.duplicates} doublons, "
+            f"{sum(self.rejected.values())} rejetées{' ' + str(self.rejected) if self.rejected else ''} "
+            f"en {elapsed:.1f}s ({self.read / elapsed:.0f} lignes/s)"
+        )
+
+
+# -------- normalisation vectorisée --------
+
+def _text(series: pd.Series) -> pd.Series:
+    """Texte nettoyé (espaces normalisés), chaîne vide -> NA"""
+    s = series.astype('string').str.replace(r'\s+', ' ', regex=True).str.strip()
+    return s.mask(s == '')
+
+
+def normalize_amounts(series: pd.Series) -> pd.Series:
+    """
+    "1 227 400,00" / "20 000,00 MAD" / "1.227.400,00" -> float (NaN si illisible ou hors bornes).
+    Avec une virgule, elle est le séparateur décimal et les points sont des milliers.
+    """
+    s = series.astype('string')
+    has_comma = s.str.contains(',', regex=False).fillna(False).to_numpy(dtype=bool)
+    digits = s.str.replace(r'[^\d,.\-]', '', regex=True)
+    decimal_comma = digits.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    cleaned = pd.Series(np.where(has_comma, decimal_comma, digits), index=series.index)
+    values = pd.to_numeric(cleaned, errors='coerce')
+    return values.where(values.abs() < MAX_AMOUNT)
+
+
+def normalize_dates(series: pd.Series) -> pd.Series:
+    """ "14/10/2026 09:00" ou "14/10/2026" -> datetime64 (NaT si illisible)"""
+    s = _text(series)
+    parsed = pd.to_datetime(s, format='%d/%m/%Y %H:%M', errors='coerce')
+    return parsed.fillna(pd.to_datetime(s.str.slice(0, 10), format='%d/%m/%Y', errors='coerce'))
+
+
+def normalize_timestamps(series: pd.Series) -> pd.Series:
+    """Horodatage ISO (scraped_at) -> datetime64 UTC naïf, comme datetime.utcnow()"""
+    return pd.to_datetime(series, errors='coerce', utc=True).dt.tz_localize(None)
+
+
+def normalize_chunk(records: List[dict], now: datetime) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Transforme un bloc d'enregistrements JSONL en lignes de la table consultations.
+    Retourne (lignes valides, rejets avec colonne 'motif').
+    """
+    raw = pd.DataFrame.from_records(records)
+    for column in ('ref', 'orgAcronyme', 'objet', 'categorie', 'entite_publique', 'estimation_ttc',
+                   'caution_provisoire', 'date_limite', 'scraped_at', 'url_detail'):
+        if column not in raw:
+            raw[column] = None
+
+    df = pd.DataFrame(index=raw.index)
+    df['ref_consultation'] = _text(raw['ref'])
+    df['organisme_acronyme'] = _text(raw['orgAcronyme'])
+    df['objet'] = _text(raw['objet'])
+    df['titre'] = df['objet']
+    df['type_marche'] = _text(raw['categorie']).str.lower().map(TYPE_MARCHE_MAP)
+    df['organisme_nom_complet'] = _text(raw['entite_publique'])
+    df['url_detail'] = _text(raw['url_detail'])
+    df['montant_estime'] = normalize_amounts(raw['estimation_ttc'])
+    df['cautionnement_provisoire'] = normalize_amounts(raw['caution_provisoire'])
+    df['date_limite'] = normalize_dates(raw['date_limite'])
+    df['date_extraction'] = normalize_timestamps(raw['scraped_at']).fillna(pd.Timestamp(now))
+    df['date_publication'] = df['date_extraction']
+    df['statut'] = np.where(df['date_limite'] < pd.Timestamp(now), 'cloture', 'en_cours')
+
+    for column, length in COLUMN_LENGTHS.items():
+        df[column] = df[column].str.slice(0, length)
+
+    # Premier champ obligatoire manquant = motif de rejet
+    motif = pd.Series(pd.NA, index=df.index, dtype='string')
+    for column in reversed(REQUIRED_COLUMNS):
+        motif = motif.mask(df[column].isna(), f"{column}_manquant")
+    rejected = motif.notna()
+
+    rejects = raw.loc[rejected].assign(motif=motif[rejected])
+    return df.loc[~rejected, CONSULTATION_COLUMNS], rejects
+
+
+def to_rows(df: pd.DataFrame) -> List[dict]:
+    """DataFrame -> dicts pour executemany (NaN/NaT/NA -> None)"""
+    values = df.astype(object).where(df.notna(), None)
+    columns = [values[c].tolist() for c in values.columns]
+    return [dict(zip(values.columns, row)) for row in zip(*columns)]
+
+
+# -------- lecture / écriture --------
+
+def iter_chunks(store: JsonlStore, chunk_size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for record in store.iter_records():
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def upsert_chunk(conn, df: pd.DataFrame) -> int:
+    """INSERT ... ON CONFLICT (ref_consultation) DO UPDATE pour tout le bloc"""
+    if df.empty:
+        return 0
+    table = Consultation.__table__
+    stmt = insert(table)
+    # date_publication (date de première collecte) n'est pas écrasée par les collectes suivantes
+    updates = {
+        c: stmt.excluded[c] for c in CONSULTATION_COLUMNS
+        if c not in ('ref_consultation', 'date_publication')
+    }
+    updates['date_derniere_maj'] = func.now()
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.ref_consultation], set_=updates)
+    conn.execute(stmt, to_rows(df))
+    return len(df)
+
+
+def ingest(path='consultations.jsonl', chunk_size: int = DEFAULT_CHUNK_SIZE,
+           dry_run: bool = False, rejects_path=None) -> IngestStats:
+    """Charge le JSONL dans la table consultations, bloc par bloc (une transaction par bloc)"""
+    store = JsonlStore(path)
+    stats = IngestStats()
+    now = datetime.now()
+    engine = None
+    if not dry_run:
+        from database.connection import engine
+
+    rejects_file = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    try:
+        for records in iter_chunks(store, chunk_size):
+            stats.read += len(records)
+            rows, rejects = normalize_chunk(records, now)
+            for reason, count in rejects['motif'].value_counts().items():
+                stats.reject(reason, int(count))
+            if rejects_file is not None:
+                rejects_file.write(rejects.to_json(orient='records', lines=True, force_ascii=False))
+
+            # Une même ref ne peut être mise à jour deux fois dans un INSERT: garder la dernière
+            deduped = rows.drop_duplicates('ref_consultation', keep='last')
+            stats.duplicates += len(rows) - len(deduped)
+
+            if engine is not None:
+                with engine.begin() as conn:
+                    stats.upserted += upsert_chunk(conn, deduped)
+            else:
+                stats.upserted += len(deduped)
+            logger.info(stats.summary())
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+    if engine is not None and stats.upserted:
+        # Invalide le cache de réponses de l'API
+        with engine.connect() as conn:
+            bump_data_version(conn)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion de consultations.jsonl dans PostgreSQL")
+    parser.add_argument('path', nargs='?', default='consultations.jsonl')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help="normaliser sans écrire en base")
+    parser.add_argument('--rejects', help="fichier JSONL où écrire les lignes rejetées")
+    args = parser.parse_args()
+
+    stats = ingest(args.path, chunk_size=args.chunk_size, dry_run=args.dry_run, rejects_path=args.rejects)
+    print(f"✅ Ingestion terminée: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Stockage JSONL en ajout seul pour la sortie du scraper httpx
+
+Organisation sur disque (pour path = consultations.jsonl):
+- consultations.jsonl             segment actif, non compressé, ouvert en ajout
+- consultations.jsonl.00001.gz    segments scellés (gzip) une fois la taille seuil atteinte
+- consultations.jsonl.ids         index des IDs (un par ligne), mis à jour à chaque ajout
+
+Les données sont écrites avant l'index: après un arrêt brutal l'index peut manquer
+quelques IDs (au pire un doublon, éliminé par la compaction), jamais l'inverse.
+Les callbacks `on_sync` sont appelés une fois données et index sur disque: un état
+dérivé (index de collecte du scraper) n'est persisté qu'après les enregistrements.
+
+Usage (compaction: garde le dernier enregistrement de chaque id):
+    python scripts/jsonl_store.py compact [consultations.jsonl]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+
+class JsonlStore:
+    """Writer bufferisé + index d'IDs latéral + segments compressés roulants"""
+
+    def __init__(
+        self,
+        path,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        flush_every: int = 100,
+        flush_interval: float = 5.0,
+        fsync: bool = True,
+    ):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.ids')
+        self.segment_max_bytes = segment_max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._data = None
+        self._index = None
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.on_sync = []
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def segments(self) -> list:
+        """Segments scellés, du plus ancien au plus récent"""
+        prefix = len(self.path.name) + 1
+        return sorted(
+            p for p in self.path.parent.glob(self.path.name + '.*.gz')
+            if p.name[prefix:-3].isdigit()
+        )
+
+    def iter_records(self) -> Iterator[dict]:
+        """Parcourt tous les enregistrements (segments scellés puis segment actif)"""
+        for segment in self.segments():
+            with gzip.open(segment, 'rt', encoding='utf-8') as f:
+                yield from self._iter_lines(f)
+        if self.path.exists():
+            with self.path.open('r', encoding='utf-8') as f:
+                yield from self._iter_lines(f)
+
+    @staticmethod
+    def _iter_lines(f) -> Iterator[dict]:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # ignorer lignes corrompues (écriture interrompue)
+                continue
+
+    def load_ids(self) -> Set[str]:
+        """Charge les IDs depuis l'index (sans parser le JSON); reconstruit l'index s'il manque"""
+        if not self.index_path.exists():
+            self.rebuild_index()
+        with self.index_path.open('r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def rebuild_index(self) -> None:
+        ids = []
+        seen = set()
+        for record in self.iter_records():
+            _id = record.get('id')
+            if _id and _id not in seen:
+                seen.add(_id)
+                ids.append(_id)
+        self._write_index(ids)
+
+    def _write_index(self, ids) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            for _id in ids:
+                f.write(_id + '\n')
+        tmp.replace(self.index_path)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def open(self) -> 'JsonlStore':
+        if self._data is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.index_path.exists():
+                self.rebuild_index()
+            self._data = self.path.open('a', encoding='utf-8', buffering=1024 * 1024)
+            self._index = self.index_path.open('a', encoding='utf-8', buffering=64 * 1024)
+        return self
+
+    def append(self, record: dict) -> None:
+        self.open()
+        self._data.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if record.get('id'):
+            self._index.write(record['id'] + '\n')
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._data is None:
+            return
+        self._sync()
+        self._last_flush = time.monotonic()
+        if self.path.stat().st_size >= self.segment_max_bytes:
+            self.roll()
+
+    def roll(self) -> Optional[Path]:
+        """Scelle le segment actif dans un nouveau segment gzip et repart d'un fichier vide"""
+        was_open = self._data is not None
+        self.close()
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            if was_open:
+                self.open()
+            return None
+        segment = self._next_segment_path()
+        self._gzip_file(self.path, segment)
+        self.path.unlink()
+        if was_open:
+            self.open()
+        return segment
+
+    def _next_segment_path(self) -> Path:
+        segments = self.segments()
+        last = int(segments[-1].name[len(self.path.name) + 1:-3]) if segments else 0
+        return self.path.with_name(f"{self.path.name}.{last + 1:05d}.gz")
+
+    def _gzip_file(self, src: Path, dst: Path) -> None:
+        tmp = dst.with_name(dst.name + '.tmp')
+        with src.open('rb') as fin, gzip.open(tmp, 'wb') as fout:
+            while True:
+                chunk = fin.read(1024 * 1024)
+                if not chunk:
+                    break
+                fout.write(chunk)
+        if self.fsync:
+            with tmp.open('rb') as f:
+                os.fsync(f.fileno())
+        tmp.replace(dst)
+
+    def close(self) -> None:
+        if self._data is None:
+            return
+        self._sync()
+        self._data.close()
+        self._index.close()
+        self._data = None
+        self._index = None
+
+    def _sync(self) -> None:
+        # Données d'abord, index ensuite
+        for fh in (self._data, self._index):
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+        self._pending = 0
+        for callback in self.on_sync:
+            callback()
+
+    def clear(self) -> None:
+        """Supprime toutes les données du store (segment actif, segments scellés, index)"""
+        self.close()
+        for p in [self.path, self.index_path, *self.segments()]:
+            if p.exists():
+                p.unlink()
+
+    def __enter__(self) -> 'JsonlStore':
+        return self.open()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Réécrit les données en ne gardant que le dernier enregistrement de chaque id,
+        dans un unique segment scellé. Retourne (enregistrements lus, enregistrements gardés).
+
+        Le résultat est scellé sous un nouveau numéro, après tous les segments existants,
+        avant toute suppression: interrompue à n'importe quelle étape, la compaction laisse
+        un store lisible (au pire des doublons, dont la dernière occurrence est à jour).
+        """
+        self.close()
+        latest = {}
+        total = 0
+        for record in self.iter_records():
+            total += 1
+            key = record.get('id') or json.dumps(record, sort_keys=True)
+            # Réinsérer pour que l'ordre suive la dernière occurrence
+            latest.pop(key, None)
+            latest[key] = record
+
+        old_segments = self.segments()
+        staging = self.path.with_name(self.path.name + '.compact')
+        with staging.open('w', encoding='utf-8') as f:
+            for record in latest.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        # Écriture atomique (fichier temporaire puis rename) du segment compacté
+        self._gzip_file(staging, self._next_segment_path())
+        staging.unlink()
+
+        # Le segment actif est lu après les segments scellés: supprimé en premier, pour
+        # que la version compactée reste la dernière lue pendant les suppressions
+        if self.path.exists():
+            self.path.unlink()
+        for segment in old_segments:
+            segment.unlink()
+        self._write_index([r['id'] for r in latest.values() if r.get('id')])
+        return total, len(latest)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'compact':
+        print("Usage: python scripts/jsonl_store.py compact [consultations.jsonl]")
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else 'consultations.jsonl'
+    before, after = JsonlStore(target).compact()
+    print(f"Compaction terminée: {before} -> {after} enregistrements")
@@ -0,0 +1,127 @@
+"""
+Percolation des recherches sauvegardées hors du crawl
+
+Le crawl percole déjà ses consultations (AlertPipeline); ce script couvre les autres
+écrivains (scripts/ingest_jsonl.py, corrections manuelles) et les recherches créées
+après coup:
+
+- rattrapage: consultations publiées depuis --since (défaut: 7 jours);
+- --listen: écoute pmmp_consultations (migration 008) et percole chaque consultation
+  insérée ou modifiée au COMMIT; l'index des recherches est rechargé toutes les
+  --reload secondes.
+
+Une consultation déjà notifiée pour une recherche ne l'est pas une seconde fois.
+
+Usage:
+    python scripts/percolate_alerts.py [--since AAAA-MM-JJ] [--listen] [--reload N]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import SessionLocal, engine
+from database.listener import PostgresListener
+from database.models import Consultation
+from database.percolator import load_percolator, percolate
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def backfill(since: datetime) -> int:
+    db = SessionLocal()
+    try:
+        percolator = load_percolator(db)
+        if not len(percolator):
+            return 0
+        # Pagination par id: percolate() valide chaque lot (pas de curseur ouvert entre deux)
+        created, last_id = 0, 0
+        while True:
+            chunk = (
+                db.query(Consultation)
+                .filter(Consultation.date_publication >= since, Consultation.id_interne > last_id)
+                .order_by(Consultation.id_interne)
+                .limit(CHUNK_SIZE)
+                .all()
+            )
+            if not chunk:
+                return created
+            last_id = chunk[-1].id_interne
+            created += percolate(db, percolator, chunk)
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+class AlertListener(PostgresListener):
+    """Percole les consultations notifiées sur pmmp_consultations"""
+
+    def __init__(self, reload_interval: float, **kwargs):
+        super().__init__(engine, 'pmmp_consultations', **kwargs)
+        self.reload_interval = reload_interval
+        self.percolator = None
+        self.loaded_at = 0.0
+
+    def _reload(self, db):
+        self.percolator = load_percolator(db)
+        self.loaded_at = time.monotonic()
+
+    def on_listen(self, cursor):
+        db = SessionLocal()
+        try:
+            self._reload(db)
+        finally:
+            db.close()
+
+    def on_notify(self, payloads: List[str]):
+        ids = list({int(payload.partition(':')[2]) for payload in payloads})
+        db = SessionLocal()
+        try:
+            if time.monotonic() - self.loaded_at > self.reload_interval:
+                self._reload(db)
+            consultations = db.query(Consultation).filter(Consultation.id_interne.in_(ids)).all()
+            created = percolate(db, self.percolator, consultations)
+            if created:
+                logger.info(f"{created} notifications créées ({len(consultations)} consultations)")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erreur de percolation: {e}")
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percolation des recherches sauvegardées")
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        default=datetime.now() - timedelta(days=7),
+                        help="rattrapage des consultations publiées depuis cette date")
+    parser.add_argument('--listen', action='store_true', help="percoler en continu les nouvelles consultations")
+    parser.add_argument('--reload', type=float, default=300, help="intervalle de rechargement des recherches (s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    listener = None
+    if args.listen:
+        # Écoute avant le rattrapage: aucune insertion entre les deux n'est manquée
+        listener = AlertListener(args.reload)
+        listener.start()
+    logger.info(f"Rattrapage depuis {args.since:%Y-%m-%d}: {backfill(args.since)} notifications créées")
+    if listener is None:
+        return
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        listener.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,19 +11,32 @@ Usage (PowerShell):
 	python scripts/pmmp_consultations_scraper.py 27/04/2025
 
 Sortie:
-- Fichier consultations.jsonl à la racine du projet
+- Fichier consultations.jsonl à la racine du projet (+ index .ids et segments .gz, voir jsonl_store.py)
 - Logs HTML dans logs/ pour debug (page liste)
 """
 
 import asyncio
+import contextlib
 import hashlib
-import json
-from datetime import datetime
+import importlib.util
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Optional, Tuple, Set, Dict
 
 import httpx
+import lxml.html
 from bs4 import BeautifulSoup
+from lxml import etree
+from jsonl_store import JsonlStore
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.parse_executor import ParseExecutor
 from urllib.parse import parse_qs, urlencode, urljoin, urlparse
 
 
@@ -38,25 +51,139 @@ SUBMIT_FIELD_NAME = "ctl0$CONTENU_PAGE$AdvancedSearch$lancerRecherche"
 SUBMIT_FIELD_VALUE = "Lancer la recherche"
 
 OUTPUT_FILE = Path("consultations.jsonl")
+# Index (refConsultation, orgAcronyme) -> dernière collecte, consulté AVANT de télécharger un détail
+KEY_INDEX_FILE = Path("consultations.keys.tsv")
+# Un détail collecté il y a moins de KEY_INDEX_TTL secondes n'est pas retéléchargé
+KEY_INDEX_TTL = 7 * 24 * 3600
+
+# Budgets de politesse: intervalle minimal (s) entre deux requêtes de chaque type,
+# partagé par toutes les tâches concurrentes
+LIST_REQUEST_INTERVAL = 1.0
+DETAIL_REQUEST_INTERVAL = 0.3
+# Nombre maximal de pages détail téléchargées simultanément
+DETAIL_CONCURRENCY = 4
+# Pool de connexions du client (keep-alive réutilisé entre requêtes)
+HTTP_LIMITS = httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=30.0)
+# Workers du pool de parsing des pages détail (0 = parsing en ligne dans la boucle asyncio)
+PARSE_WORKERS = int(os.getenv("PARSE_EXECUTOR_WORKERS", "0"))
 
 
 # -------- utilitaires bas niveau --------
 
-async def polite_get(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
-	"""GET avec un petit délai pour rester policé."""
-	await asyncio.sleep(1.0)
+class RateLimiter:
+	"""
+	Limiteur de débit partagé: garantit au moins `interval` secondes entre deux
+	départs de requête, quel que soit le nombre de tâches qui l'utilisent.
+	"""
+
+	def __init__(self, interval: float) -> None:
+		self.interval = interval
+		self._lock = asyncio.Lock()
+		self._next_slot = 0.0
+
+	async def wait(self) -> None:
+		async with self._lock:
+			now = time.monotonic()
+			delay = self._next_slot - now
+			self._next_slot = max(now, self._next_slot) + self.interval
+		if delay > 0:
+			await asyncio.sleep(delay)
+
+
+@dataclass
+class FetchStats:
+	"""Compteurs de débit pour le résumé de fin de run."""
+	requests: int = 0
+	errors: int = 0
+	bytes: int = 0
+	started: float = field(default_factory=time.monotonic)
+
+	def summary(self, label: str) -> str:
+		elapsed = max(time.monotonic() - self.started, 1e-6)
+		return (
+			f"[STATS] {label}: {self.requests} requêtes en {elapsed:.1f}s "
+			f"({self.requests / elapsed:.2f} req/s, {self.bytes / 1_048_576:.1f} Mo, {self.errors} erreurs)"
+		)
+
+
+async def polite_get(client: httpx.AsyncClient, url: str, limiter: Optional[RateLimiter] = None, **kwargs) -> httpx.Response:
+	"""GET avec un petit délai (ou le budget du limiteur fourni) pour rester policé."""
+	if limiter is not None:
+		await limiter.wait()
+	else:
+		await asyncio.sleep(1.0)
 	resp = await client.get(url, **kwargs)
 	resp.raise_for_status()
 	return resp
 
 
-async def polite_post(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
-	await asyncio.sleep(1.0)
+async def polite_post(client: httpx.AsyncClient, url: str, limiter: Optional[RateLimiter] = None, **kwargs) -> httpx.Response:
+	if limiter is not None:
+		await limiter.wait()
+	else:
+		await asyncio.sleep(1.0)
 	resp = await client.post(url, **kwargs)
 	resp.raise_for_status()
 	return resp
 
 
+def build_client() -> httpx.AsyncClient:
+	"""Client HTTP partagé: HTTP/2 si `h2` est installé, pool de connexions borné."""
+	return httpx.AsyncClient(
+		base_url=BASE_URL,
+		follow_redirects=True,
+		http2=importlib.util.find_spec("h2") is not None,
+		limits=HTTP_LIMITS,
+		headers={
+			# User-Agent propre pour rester poli et traçable
+			"User-Agent": "PMMP-scraper-research/0.1 (+contact:your-email@example.com)",
+			"Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+			"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+		},
+		timeout=30.0,
+	)
+
+
+def fetch_details(
+	client: httpx.AsyncClient,
+	urls: list[str],
+	limiter: RateLimiter,
+	stats: FetchStats,
+	concurrency: int = DETAIL_CONCURRENCY,
+	semaphore: Optional[asyncio.Semaphore] = None,
+) -> list["asyncio.Task[Optional[str]]"]:
+	"""
+	Lance le téléchargement concurrent des pages détail (au plus `concurrency` à la fois,
+	ou selon `semaphore` s'il est partagé entre plusieurs appels, cadencé par `limiter`).
+	Retourne les tâches dans l'ordre des URLs: les attendre dans cet ordre garantit
+	une écriture déterministe. Une erreur HTTP donne None. L'appelant annule les tâches
+	non consommées avec cancel_tasks (voir scrape_details).
+	"""
+	if semaphore is None:
+		semaphore = asyncio.Semaphore(concurrency)
+
+	async def fetch_one(url: str) -> Optional[str]:
+		async with semaphore:
+			stats.requests += 1
+			try:
+				resp = await polite_get(client, url, limiter=limiter)
+			except httpx.HTTPError as e:
+				stats.errors += 1
+				print(f"[ERR] {url}: {e}")
+				return None
+			stats.bytes += len(resp.content)
+			return resp.text
+
+	return [asyncio.create_task(fetch_one(u)) for u in urls]
+
+
+async def cancel_tasks(tasks: list["asyncio.Task"]) -> None:
+	"""Annule les tâches encore en cours et attend leur fin (aucune tâche orpheline)."""
+	for task in tasks:
+		task.cancel()
+	await asyncio.gather(*tasks, return_exceptions=True)
+
+
 def extract_hidden_fields(form_soup: BeautifulSoup) -> dict:
 	"""
 	Récupère tous les <input> du formulaire (hidden, text...) pour reconstruire le POST.
@@ -77,6 +204,7 @@ def parse_consultation_links(list_html: str, base_url: str) -> list[str]:
 	IMPORTANT: Ici on ne regarde PAS le texte du lien. On regarde juste le href.
 	On veut tous les <a href="...EntrepriseDetailConsultation&refConsultation=...">
 	même si l'intérieur du <a> est juste <img>.
+	Version BeautifulSoup de référence; le pipeline utilise ListPage.detail_links.
 	"""
 	soup = BeautifulSoup(list_html, "lxml")
 	urls: list[str] = []
@@ -113,7 +241,10 @@ def parse_consultation_links(list_html: str, base_url: str) -> list[str]:
 
 
 def find_next_page_url(list_html: str, base_url: str) -> Optional[str]:
-	"""Trouve l'URL de pagination (rel=next, texte 'Suivant'/'Next') si présente."""
+	"""
+	Trouve l'URL de pagination (rel=next, texte 'Suivant'/'Next') si présente.
+	Version BeautifulSoup de référence; le pipeline utilise ListPage.next_page_url.
+	"""
 	soup = BeautifulSoup(list_html, "lxml")
 	# rel="next"
 	a = soup.find("a", attrs={"rel": "next"})
@@ -131,6 +262,126 @@ def find_next_page_url(list_html: str, base_url: str) -> Optional[str]:
 	return None
 
 
+# XPath pré-compilés pour ListPage
+_XP_DETAIL_HREFS = etree.XPath(
+	"//a[contains(@href, 'EntrepriseDetailsConsultation') or contains(@href, 'EntrepriseDetailConsultation')]/@href"
+)
+_XP_REL_NEXT = etree.XPath("//a[contains(concat(' ', normalize-space(@rel), ' '), ' next ')]")
+_XP_LINKS = etree.XPath("//a[@href]")
+_XP_FIRST_FORM = etree.XPath("(//form)[1]")
+
+
+class ListPage:
+	"""
+	Page de résultats parsée une seule fois (lxml, sans BeautifulSoup) et partagée par
+	toutes les étapes: liens détail, URL de page suivante, payload du formulaire et
+	select de taille de page. Résultats identiques à parse_consultation_links /
+	find_next_page_url (versions BeautifulSoup gardées comme référence, cf.
+	scripts/benchmark_list_parsing.py).
+	"""
+
+	def __init__(self, html: str, base_url: str = BASE_URL) -> None:
+		self.html = html
+		self.base_url = base_url
+		try:
+			parser = lxml.html.HTMLParser(encoding="utf-8")
+			self.tree = lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+		except (etree.ParserError, ValueError):
+			self.tree = None
+
+	@cached_property
+	def detail_links(self) -> list[str]:
+		"""Liens détail canonicalisés (refConsultation & orgAcronyme), dédupliqués dans l'ordre."""
+		if self.tree is None:
+			return []
+		seen: set[str] = set()
+		links: list[str] = []
+		for href in _XP_DETAIL_HREFS(self.tree):
+			abs_url = urljoin(self.base_url, href)
+			key = detail_key(abs_url)
+			if key:
+				abs_url = urljoin(self.base_url, f"/index.php?page=entreprise.EntrepriseDetailsConsultation&refConsultation={key[0]}&orgAcronyme={key[1]}")
+			dedup_key = abs_url.split("#")[0]
+			if dedup_key not in seen:
+				seen.add(dedup_key)
+				links.append(abs_url)
+		return links
+
+	@cached_property
+	def next_page_url(self) -> Optional[str]:
+		"""URL de pagination (rel=next, texte 'Suivant'/'Next', ou href avec currentPage)."""
+		if self.tree is None:
+			return None
+		rel_next = _XP_REL_NEXT(self.tree)
+		if rel_next and rel_next[0].get("href"):
+			return urljoin(self.base_url, rel_next[0].get("href"))
+		for a in _XP_LINKS(self.tree):
+			href = a.get("href") or ""
+			txt = " ".join(t.strip() for t in a.itertext() if t.strip()).lower()
+			if "suivant" in txt or "next" in txt:
+				return urljoin(self.base_url, href)
+			if "currentPage=" in href:
+				return urljoin(self.base_url, href)
+		return None
+
+	@cached_property
+	def form(self):
+		if self.tree is None:
+			return None
+		forms = _XP_FIRST_FORM(self.tree)
+		return forms[0] if forms else None
+
+	@cached_property
+	def form_payload(self) -> Dict[str, str]:
+		"""Tous les champs du premier formulaire, tels que le navigateur les posterait."""
+		payload: Dict[str, str] = {}
+		if self.form is None:
+			return payload
+		for el in self.form.iter("input", "select", "textarea"):
+			name = el.get("name")
+			if not name:
+				continue
+			if el.tag == "select":
+				opt = el.find(".//option[@selected]")
+				if opt is None:
+					opt = el.find(".//option")
+				val = opt.get("value") if opt is not None else el.get("value", "")
+			elif el.tag == "textarea":
+				val = el.text_content() or ""
+			else:
+				input_type = (el.get("type") or "").lower()
+				if input_type in ("checkbox", "radio") and el.get("checked") is None:
+					continue
+				val = el.get("value", "")
+			payload[name] = val
+		return payload
+
+	@cached_property
+	def page_size_select(self):
+		"""Le <select> de taille de page du formulaire, s'il existe."""
+		if self.form is None:
+			return None
+		for sel in self.form.iter("select"):
+			name = sel.get("name", "")
+			id_ = sel.get("id", "")
+			if "listePageSize" in name or "listePageSize" in id_ or "PageSize" in name:
+				return sel
+		return None
+
+	def page_size_request(self, size: str = "500") -> Optional[Tuple[Dict[str, str], Optional[str]]]:
+		"""(payload, action) pour passer la taille de page à `size`, ou None si inutile/impossible."""
+		sel = self.page_size_select
+		if sel is None:
+			return None
+		selected = sel.find(".//option[@selected]")
+		current_val = sel.get("value") or (selected.get("value") if selected is not None else None)
+		if current_val == size:
+			return None
+		payload = dict(self.form_payload)
+		payload[sel.get("name")] = size
+		return payload, self.form.get("action")
+
+
 def try_set_page_size_500(client: httpx.AsyncClient, list_html: str, list_action_url: str) -> Optional[str]:
 	"""
 	Si la page de résultats contient un <select> de taille de page, tenter de le fixer à 500 en POSTant le formulaire.
@@ -191,51 +442,20 @@ def try_set_page_size_500(client: httpx.AsyncClient, list_html: str, list_action
 	return None  # Cette voie sync n'est pas utilisable avec AsyncClient; traitée dans la version async ci-dessous
 
 
-async def ensure_page_size_500(client: httpx.AsyncClient, list_html: str, list_action_url: str) -> str:
-	"""Version asynchrone: si possible, renvoyer la page avec taille=500, sinon l'HTML original."""
-	soup = BeautifulSoup(list_html, "lxml")
-	form = soup.find("form")
-	if not form:
-		return list_html
-	page_size_select = None
-	for sel in form.find_all("select"):
-		name = sel.get("name", "")
-		id_ = sel.get("id", "")
-		if "listePageSize" in name or "listePageSize" in id_ or "PageSize" in name:
-			page_size_select = sel
-			break
-	if not page_size_select:
-		return list_html
-	selected_opt = page_size_select.find("option", selected=True)
-	current_val = page_size_select.get("value") or (selected_opt.get("value") if selected_opt else None)
-	if current_val == "500":
-		return list_html
-	# Construire payload depuis tous les inputs/selects présents
-	payload: Dict[str, str] = {}
-	for inp in form.find_all(["input", "select", "textarea"]):
-		name = inp.get("name")
-		if not name:
-			continue
-		if inp.name == "select":
-			sel_opt = inp.find("option", selected=True) or inp.find("option")
-			val = sel_opt.get("value") if sel_opt else inp.get("value", "")
-		elif inp.name == "textarea":
-			val = inp.text or ""
-		else:
-			input_type = (inp.get("type") or "").lower()
-			if input_type in ("checkbox", "radio") and not inp.has_attr("checked"):
-				continue
-			val = inp.get("value", "")
-		payload[name] = val
-	payload[page_size_select.get("name")] = "500"
-	action = form.get("action") or list_action_url
+async def ensure_page_size_500(client: httpx.AsyncClient, page: ListPage, list_action_url: str, limiter: Optional[RateLimiter] = None) -> ListPage:
+	"""Version asynchrone: si possible, renvoyer la page avec taille=500, sinon la page d'origine."""
+	request = page.page_size_request("500")
+	if request is None:
+		return page
+	payload, action = request
+	action = action or list_action_url
 	if action.startswith("/mobile/"):
 		action = action.replace("/mobile/", "/")
 	try:
-		new_resp = await polite_post(client, action, data=payload, headers={"Referer": urljoin(BASE_URL, action)})
-		return new_resp.text
+		new_resp = await polite_post(client, action, limiter=limiter, data=payload, headers={"Referer": urljoin(BASE_URL, action)})
+		return ListPage(new_resp.text)
 	except Exception:
-		return list_html
+		return page
 
 
 def text_or_none(scope_soup: BeautifulSoup, css_selector: str) -> Optional[str]:
@@ -250,6 +470,7 @@ def parse_consultation_detail(detail_html: str) -> dict:
 	"""
 	Extrait les infos essentielles depuis #recap-consultation.
 	On mappe directement vers les champs métier importants.
+	Version BeautifulSoup de référence; le pipeline utilise parse_consultation_detail_fast.
 	"""
 	soup = BeautifulSoup(detail_html, "lxml")
 	bloc = soup.select_one("#recap-consultation")
@@ -331,89 +552,259 @@ def parse_consultation_detail(detail_html: str) -> dict:
 	return data
 
 
+# -------- parseur détail rapide (lxml, bloc #recap-consultation seul) --------
+
+_RECAP_ID = "recap-consultation"
+_SUMMARY = "ctl0_CONTENU_PAGE_idEntrepriseConsultationSummary_"
+# Champs simples: clé de sortie -> id de l'élément dans #recap-consultation
+_RECAP_FIELDS = {
+	"date_limite": _SUMMARY + "dateHeureLimiteRemisePlis",
+	"ref": _SUMMARY + "reference",
+	"objet": _SUMMARY + "objet",
+	"entite_publique": _SUMMARY + "entiteAchat",
+	"type_procedure": None,  # composé: typeProcedure + modePassation
+	"categorie": _SUMMARY + "categoriePrincipale",
+	"lieu_execution": _SUMMARY + "lieuxExecutions",
+	"estimation_ttc": _SUMMARY + "idReferentielZoneText_RepeaterReferentielZoneText_ctl0_labelReferentielZoneText",
+	"caution_provisoire": _SUMMARY + "cautionProvisoire",
+	"lieu_ouverture_plis": _SUMMARY + "lieuOuverturePlis",
+	"adresse_retrait_dossiers": _SUMMARY + "adresseRetraitDossiers",
+	"adresse_depot_offres": _SUMMARY + "adresseDepotOffres",
+	"variante_autorisee": _SUMMARY + "varianteValeur",
+}
+_PROC_ID = _SUMMARY + "typeProcedure"
+_MODE_ID = _SUMMARY + "modePassation"
+_VISITES_ID = _SUMMARY + "panelRepeaterVisitesLieux"
+_WANTED_IDS = {i for i in _RECAP_FIELDS.values() if i} | {_PROC_ID, _MODE_ID, _VISITES_ID}
+
+_XP_RECAP = etree.XPath("//*[@id=$id]")
+_XP_WANTED = etree.XPath("descendant::*[@id]")
+# Texte ignoré par BeautifulSoup.get_text (chaînes Script/Stylesheet/Template)
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+_RE_RECAP_START = re.compile(r"""<([a-zA-Z][a-zA-Z0-9]*)\b[^>]*\bid\s*=\s*["']?recap-consultation["'\s>]""")
+
+
+def _element_strings(el):
+	"""Chaînes de texte d'un sous-arbre, dans l'ordre, comme BeautifulSoup (sans commentaires ni scripts)."""
+	if el.tag in _SKIPPED_TEXT_TAGS:
+		return
+	if el.text:
+		yield el.text
+	for child in el:
+		if isinstance(child.tag, str):
+			yield from _element_strings(child)
+		if child.tail:
+			yield child.tail
+
+
+def _cut_recap_block(detail_html: str) -> Optional[str]:
+	"""
+	Découpe le HTML brut du bloc #recap-consultation (balise ouvrante -> fermante appariée)
+	sans parser la page entière. None si le découpage n'est pas sûr (commentaire/script
+	dans le bloc, balises non appariées): l'appelant parse alors toute la page.
+	"""
+	m = _RE_RECAP_START.search(detail_html)
+	if not m:
+		return None
+	tag = m.group(1).lower()
+	tag_re = re.compile(rf"<(/?){tag}\b[^>]*>", re.IGNORECASE)
+	depth = 0
+	for t in tag_re.finditer(detail_html, m.start()):
+		depth += -1 if t.group(1) else 1
+		if depth == 0:
+			block = detail_html[m.start():t.end()]
+			if "<!--" in block or "<script" in block.lower():
+				return None
+			return block
+	return None
+
+
+def _find_recap(detail_html: str):
+	block = _cut_recap_block(detail_html)
+	if block is not None:
+		tree = lxml.html.document_fromstring(f"<html><body>{block}</body></html>")
+		found = _XP_RECAP(tree, id=_RECAP_ID)
+		if found:
+			return found[0]
+	try:
+		tree = lxml.html.document_fromstring(detail_html)
+	except (etree.ParserError, ValueError):
+		return None
+	found = _XP_RECAP(tree, id=_RECAP_ID)
+	return found[0] if found else None
+
+
+def parse_consultation_detail_fast(detail_html: str) -> dict:
+	"""
+	Même sortie que parse_consultation_detail, mais sans arbre BeautifulSoup de la page:
+	seul le bloc #recap-consultation est découpé puis parsé avec lxml, et les éléments
+	utiles sont indexés par id en un seul parcours.
+	"""
+	bloc = _find_recap(detail_html)
+	if bloc is None:
+		return {}
+
+	# Premier élément portant chaque id voulu (ordre document, comme select_one)
+	by_id: dict = {}
+	for el in _XP_WANTED(bloc):
+		el_id = el.get("id")
+		if el_id in _WANTED_IDS and el_id not in by_id:
+			by_id[el_id] = el
+
+	def text_of(el_id: str) -> Optional[str]:
+		el = by_id.get(el_id)
+		if el is None:
+			return None
+		return " ".join("".join(t.strip() for t in _element_strings(el)).split())
+
+	data: dict[str, Optional[str]] = {}
+	for key, el_id in _RECAP_FIELDS.items():
+		if el_id is None:
+			proc = text_of(_PROC_ID)
+			mode = text_of(_MODE_ID)
+			data[key] = (proc or "") + ((" " + mode) if mode else "")
+		else:
+			data[key] = text_of(el_id)
+
+	visites = by_id.get(_VISITES_ID)
+	if visites is not None:
+		data["visites_lieux"] = " ".join(" ".join(t.strip() for t in _element_strings(visites) if t.strip()).split())
+	else:
+		data["visites_lieux"] = None
+	return data
+
+
 def compute_uid(entite: Optional[str], ref: Optional[str], date_limite: Optional[str]) -> str:
 	"""ID unique stable = sha256(entité|ref|date_limite)."""
 	base = f"{entite or ''}|{ref or ''}|{date_limite or ''}"
 	return hashlib.sha256(base.encode("utf-8")).hexdigest()
 
 
-def append_jsonl(path: Path, record: dict) -> None:
-	path.parent.mkdir(parents=True, exist_ok=True)
-	with path.open("a", encoding="utf-8") as f:
-		f.write(json.dumps(record, ensure_ascii=False) + "\n")
+def detail_key(url: str) -> Optional[Tuple[str, str]]:
+	"""Clé canonique (refConsultation, orgAcronyme) d'une URL de détail, connue avant tout fetch."""
+	qs = parse_qs(urlparse(url).query)
+	ref = qs.get("refConsultation", [None])[0]
+	org = qs.get("orgAcronyme", [None])[0]
+	if ref and org:
+		return ref, org
+	return None
 
 
-def load_existing_ids(path: Path) -> Set[str]:
-	"""Charge les IDs déjà présents dans le JSONL pour éviter les doublons inter-runs."""
-	ids: Set[str] = set()
-	if not path.exists():
-		return ids
-	try:
-		with path.open("r", encoding="utf-8") as f:
-			for line in f:
-				line = line.strip()
-				if not line:
-					continue
-				try:
-					obj = json.loads(line)
-					_id = obj.get("id")
-					if _id:
-						ids.add(_id)
-				except Exception:
-					# ignorer lignes corrompues
-					continue
-	except Exception:
-		pass
-	return ids
+class KeyIndex:
+	"""
+	Index persistant des détails déjà collectés: (refConsultation, orgAcronyme) -> epoch de
+	dernière collecte. Fichier TSV en ajout seul (la dernière ligne d'une clé gagne), réécrit
+	au chargement quand il contient trop de lignes obsolètes. S'il n'existe pas encore, il est
+	reconstruit depuis le store de sortie (champs refConsultation/orgAcronyme/scraped_at).
+
+	Une clé marquée n'est écrite qu'au flush suivant du store (attach): l'index ne peut pas
+	déclarer fraîche une consultation dont l'enregistrement n'a jamais atteint le disque.
+	"""
+
+	def __init__(self, path: Path = KEY_INDEX_FILE, ttl: float = KEY_INDEX_TTL, fsync: bool = True) -> None:
+		self.path = path
+		self.ttl = ttl
+		self.fsync = fsync
+		self.last_seen: Dict[Tuple[str, str], float] = {}
+		self._unsynced: list[str] = []
+		self._fh = None
+
+	def load(self, store: Optional[JsonlStore] = None) -> "KeyIndex":
+		lines = 0
+		if self.path.exists():
+			with self.path.open("r", encoding="utf-8") as f:
+				for line in f:
+					parts = line.rstrip("\n").split("\t")
+					if len(parts) != 3:
+						continue
+					try:
+						self.last_seen[(parts[0], parts[1])] = float(parts[2])
+					except ValueError:
+						continue
+					lines += 1
+			if lines > 2 * len(self.last_seen) + 1000:
+				self._rewrite()
+		elif store is not None:
+			self._rebuild_from_store(store)
+			self._rewrite()
+		return self
+
+	def _rebuild_from_store(self, store: JsonlStore) -> None:
+		for obj in store.iter_records():
+			try:
+				key = (obj["refConsultation"], obj["orgAcronyme"])
+				ts = datetime.fromisoformat(obj["scraped_at"].replace("Z", "+00:00")).timestamp()
+			except Exception:
+				continue
+			if key[0] and key[1]:
+				self.last_seen[key] = max(ts, self.last_seen.get(key, 0.0))
+
+	def _rewrite(self) -> None:
+		tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+		with tmp.open("w", encoding="utf-8") as f:
+			for (ref, org), ts in self.last_seen.items():
+				f.write(f"{ref}\t{org}\t{ts:.0f}\n")
+		tmp.replace(self.path)
+
+	def is_fresh(self, key: Optional[Tuple[str, str]], now: Optional[float] = None) -> bool:
+		if key is None or key not in self.last_seen:
+			return False
+		return (now or time.time()) - self.last_seen[key] < self.ttl
+
+	def attach(self, store: JsonlStore) -> "KeyIndex":
+		"""Persiste les clés marquées à chaque synchronisation du store de sortie."""
+		store.on_sync.append(self.flush)
+		return self
+
+	def mark(self, key: Optional[Tuple[str, str]], ts: Optional[float] = None) -> None:
+		"""Marque une clé collectée; à appeler après l'ajout de l'enregistrement au store."""
+		if key is None:
+			return
+		ts = ts or time.time()
+		self.last_seen[key] = ts
+		self._unsynced.append(f"{key[0]}\t{key[1]}\t{ts:.0f}\n")
+
+	def flush(self) -> None:
+		if not self._unsynced:
+			return
+		if self._fh is None:
+			self.path.parent.mkdir(parents=True, exist_ok=True)
+			self._fh = self.path.open("a", encoding="utf-8")
+		self._fh.writelines(self._unsynced)
+		self._fh.flush()
+		if self.fsync:
+			os.fsync(self._fh.fileno())
+		self._unsynced = []
+
+	def filter_stale(self, urls: list[str]) -> list[str]:
+		"""Ne garde que les URLs jamais collectées ou dont la collecte a expiré."""
+		now = time.time()
+		return [u for u in urls if not self.is_fresh(detail_key(u), now=now)]
+
+	def close(self) -> None:
+		"""À appeler après la fermeture du store: les clés non synchronisées sont abandonnées."""
+		if self._fh is not None:
+			self._fh.close()
+			self._fh = None
 
 
 # -------- pipeline principal --------
 
 
-async def run_scraper(date_start: str = "27/04/2025", date_end: Optional[str] = None, clear_output: bool = False) -> None:
+@dataclass
+class SearchForm:
 	"""
-	1. GET la page de recherche
-	2. Remplit la date
-	3. POST 'Lancer la recherche'
-	4. Récupère les liens détail de TOUTES les consultations (icônes <img>)
-	5. Va sur chaque détail, extrait les données, calcule un ID, écrit en JSONL
+	Gabarit du formulaire de recherche avancée, parsé une seule fois par session.
+	`payload` contient tous les champs du formulaire; `for_window` y injecte les dates.
 	"""
-
-	async with httpx.AsyncClient(
-		base_url=BASE_URL,
-		follow_redirects=True,
-		headers={
-			# User-Agent propre pour rester poli et traçable
-			"User-Agent": "PMMP-scraper-research/0.1 (+contact:your-email@example.com)",
-			"Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-			"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-		},
-		timeout=30.0,
-	) as client:
-		# 1. Page de recherche (forcer la version desktop)
-		search_resp = await polite_get(client, SEARCH_PATH)
-		soup = BeautifulSoup(search_resp.text, "lxml")
-		form = soup.find("form")
-		if form is None:
-			raise RuntimeError("Formulaire introuvable sur la page de recherche.")
-
-		action = form.get("action") or SEARCH_PATH
-		# Si on est redirigé vers la version mobile, revenir à la version complète
-		if action.startswith("/mobile/"):
-			action = action.replace("/mobile/", "/")
-			if "mobile=out" not in action:
-				sep = "&" if "?" in action else "?"
-				action = f"{action}{sep}mobile=out"
-		method = (form.get("method") or "post").lower()
-
-		# 2. On récupère TOUS les champs (<input>) du form
-		payload = extract_hidden_fields(form)
-
-		# 3. On force nos dates (début et fin)
-		ds = date_start
-		de = date_end or date_start
-		payload[DATE_START_FIELD_NAME] = ds
-		payload[DATE_END_FIELD_NAME] = de
+	action: str
+	method: str
+	payload: Dict[str, str]
+
+	def for_window(self, date_start: str, date_end: str) -> Dict[str, str]:
+		payload = dict(self.payload)
+		payload[DATE_START_FIELD_NAME] = date_start
+		payload[DATE_END_FIELD_NAME] = date_end
 		# Autres variantes possibles rencontrées
 		for key in list(payload.keys()):
 			lk = key.lower()
@@ -422,123 +813,254 @@ async def run_scraper(date_start: str = "27/04/2025", date_end: Optional[str] =
 				and ("datemiseenligne" in lk or "datepublication" in lk)
 				and ("start" in lk or "debut" in lk or "du" in lk)
 			):
-				payload[key] = ds
+				payload[key] = date_start
 			if (
 				"advancedsearch" in lk
 				and ("datemiseenligne" in lk or "datepublication" in lk)
 				and ("end" in lk or "fin" in lk or "au" in lk)
 			):
-				payload[key] = de
-
-		# 4. Simuler le clic sur 'Lancer la recherche'
+				payload[key] = date_end
+		# Simuler le clic sur 'Lancer la recherche'
 		payload[SUBMIT_FIELD_NAME] = SUBMIT_FIELD_VALUE
+		return payload
 
-		# 5. Soumission du formulaire -> liste résultats
-		if method == "post":
-			# Ajouter un Referer pour ressembler à un vrai post
-			headers = {"Referer": urljoin(BASE_URL, SEARCH_PATH)}
-			list_resp = await polite_post(client, action, data=payload, headers=headers)
-		else:
-			list_resp = await polite_get(client, action, params=payload)
 
-		list_html = list_resp.text
-		# Debug: sauvegarder la page liste
+async def load_search_form(client: httpx.AsyncClient, limiter: Optional[RateLimiter] = None) -> SearchForm:
+	"""GET la page de recherche (version desktop) et en extrait le gabarit du formulaire."""
+	search_resp = await polite_get(client, SEARCH_PATH, limiter=limiter)
+	soup = BeautifulSoup(search_resp.text, "lxml")
+	form = soup.find("form")
+	if form is None:
+		raise RuntimeError("Formulaire introuvable sur la page de recherche.")
+
+	action = form.get("action") or SEARCH_PATH
+	# Si on est redirigé vers la version mobile, revenir à la version complète
+	if action.startswith("/mobile/"):
+		action = action.replace("/mobile/", "/")
+		if "mobile=out" not in action:
+			sep = "&" if "?" in action else "?"
+			action = f"{action}{sep}mobile=out"
+	method = (form.get("method") or "post").lower()
+	# On récupère TOUS les champs (<input>) du form
+	return SearchForm(action=action, method=method, payload=extract_hidden_fields(form))
+
+
+def canonicalize_detail_urls(detail_urls: list[str]) -> list[str]:
+	"""Canonicalisation et dédup forte des liens par (refConsultation, orgAcronyme)."""
+	canonical_map: Dict[Tuple[str, str], str] = {}
+	for u in detail_urls:
+		p = urlparse(u)
+		qs = parse_qs(p.query)
+		ref = qs.get("refConsultation", [None])[0]
+		org = qs.get("orgAcronyme", [None])[0]
+		if ref and org:
+			canonical_map[(ref, org)] = urljoin(BASE_URL, f"/index.php?page=entreprise.EntrepriseDetailsConsultation&refConsultation={ref}&orgAcronyme={org}")
+	return list(canonical_map.values()) if canonical_map else detail_urls
+
+
+def _dump_debug_html(filename: str, html: str) -> None:
+	try:
+		logs = Path("logs"); logs.mkdir(exist_ok=True)
+		(logs / filename).write_text(html, encoding="utf-8")
+	except Exception:
+		pass
+
+
+async def collect_detail_urls(
+	client: httpx.AsyncClient,
+	form: SearchForm,
+	date_start: str,
+	date_end: str,
+	limiter: Optional[RateLimiter] = None,
+	follow_pagination: bool = True,
+	fallback_en_cours: bool = False,
+	debug_dump: bool = False,
+) -> Tuple[list[str], bool]:
+	"""
+	Soumet la recherche pour la fenêtre [date_start, date_end] et collecte les liens détail.
+	Retourne (liens uniques canonicalisés, tronqué) où `tronqué` indique qu'une page
+	suivante existait mais n'a pas été suivie (follow_pagination=False).
+	"""
+	payload = form.for_window(date_start, date_end)
+
+	# Soumission du formulaire -> liste résultats
+	if form.method == "post":
+		# Ajouter un Referer pour ressembler à un vrai post
+		headers = {"Referer": urljoin(BASE_URL, SEARCH_PATH)}
+		list_resp = await polite_post(client, form.action, limiter=limiter, data=payload, headers=headers)
+	else:
+		list_resp = await polite_get(client, form.action, limiter=limiter, params=payload)
+
+	list_html = list_resp.text
+	if debug_dump:
+		_dump_debug_html("consultations_list.html", list_html)
+
+	# Fixer la taille de page à 500 si le select est présent (chaque page n'est parsée qu'une fois)
+	page = await ensure_page_size_500(client, ListPage(list_html), form.action, limiter=limiter)
+
+	# Si aucune entrée, fallback optionnel vers 'En cours'.
+	if fallback_en_cours and not page.detail_links:
+		fallback_path = "/index.php?page=entreprise.EntrepriseAdvancedSearch&AllCons&EnCours&searchAnnCons&mobile=out"
+		print("[INFO] Aucun lien après POST. Fallback vers la liste 'En cours'...")
+		fb_resp = await polite_get(client, fallback_path, limiter=limiter)
+		page = await ensure_page_size_500(client, ListPage(fb_resp.text), fallback_path, limiter=limiter)
+		if debug_dump:
+			_dump_debug_html("consultations_list_fallback.html", page.html)
+
+	detail_urls: list[str] = []
+	truncated = False
+	while True:
+		detail_urls.extend(page.detail_links)
+		next_url = page.next_page_url
+		if not next_url:
+			break
+		if not follow_pagination:
+			truncated = True
+			break
 		try:
-			logs = Path("logs"); logs.mkdir(exist_ok=True)
-			(logs / "consultations_list.html").write_text(list_html, encoding="utf-8")
+			resp = await polite_get(client, next_url, limiter=limiter)
+			page = ListPage(resp.text)
 		except Exception:
-			pass
-
-		# 6. Fixer la taille de page à 500 si le select est présent
-		list_html = await ensure_page_size_500(client, list_html, action)
-
-		# Extraire tous les liens détail consultation à partir des <a><img></a>
-		# et gérer la pagination. Si aucune entrée, fallback vers 'En cours'.
-		page_html = list_html
-		first_links = parse_consultation_links(page_html, BASE_URL)
-		if not first_links:
-			fallback_path = "/index.php?page=entreprise.EntrepriseAdvancedSearch&AllCons&EnCours&searchAnnCons&mobile=out"
-			print("[INFO] Aucun lien après POST. Fallback vers la liste 'En cours'...")
-			fb_resp = await polite_get(client, fallback_path)
-			page_html = await ensure_page_size_500(client, fb_resp.text, fallback_path)
-			try:
-				logs = Path("logs"); logs.mkdir(exist_ok=True)
-				(logs / "consultations_list_fallback.html").write_text(page_html, encoding="utf-8")
-			except Exception:
-				pass
+			break
 
-		detail_urls: list[str] = []
-		while True:
-			page_links = parse_consultation_links(page_html, BASE_URL)
-			detail_urls.extend(page_links)
-			next_url = find_next_page_url(page_html, BASE_URL)
-			if not next_url:
-				break
-			try:
-				resp = await polite_get(client, next_url)
-				page_html = resp.text
-			except Exception:
-				break
+	return canonicalize_detail_urls(detail_urls), truncated
 
-		print(f"[INFO] Liens détail collectés (avec pagination): {len(detail_urls)}")
 
-		# Sortie: créer le fichier si nécessaire, suppression uniquement si demandé
-		if clear_output and OUTPUT_FILE.exists():
-			OUTPUT_FILE.unlink()
-		if not OUTPUT_FILE.exists():
-			OUTPUT_FILE.touch()
-		# Charger les IDs existants pour dédup inter-runs
-		seen_ids: Set[str] = load_existing_ids(OUTPUT_FILE)
-
-		# 7. Canonicalisation et dédup forte des liens par (refConsultation, orgAcronyme)
-		canonical_map: Dict[Tuple[str, str], str] = {}
-		for u in detail_urls:
-			p = urlparse(u)
-			qs = parse_qs(p.query)
-			ref = qs.get("refConsultation", [None])[0]
-			org = qs.get("orgAcronyme", [None])[0]
-			if ref and org:
-				canonical_map[(ref, org)] = urljoin(BASE_URL, f"/index.php?page=entreprise.EntrepriseDetailsConsultation&refConsultation={ref}&orgAcronyme={org}")
-		unique_detail_urls = list(canonical_map.values()) if canonical_map else detail_urls
-		print(f"[INFO] Liens détail uniques (après canon/dedup): {len(unique_detail_urls)}")
+async def scrape_details(
+	client: httpx.AsyncClient,
+	detail_urls: list[str],
+	limiter: RateLimiter,
+	stats: FetchStats,
+	concurrency: int = DETAIL_CONCURRENCY,
+	semaphore: Optional[asyncio.Semaphore] = None,
+	parser: Optional[ParseExecutor] = None,
+):
+	"""
+	Télécharge les détails en parallèle et produit les enregistrements dans l'ordre des liens.
+	Avec un `parser` à pool de processus, le parsing ne bloque pas les téléchargements en cours.
+	À consommer sous contextlib.aclosing: si le consommateur s'arrête ou lève une exception,
+	les téléchargements restants sont annulés à la fermeture du générateur.
+	"""
+	parser = parser or ParseExecutor(name="httpx")
+	tasks = fetch_details(client, detail_urls, limiter, stats, concurrency=concurrency, semaphore=semaphore)
+	try:
+		for detail_url, task in zip(detail_urls, tasks):
+			detail_html = await task
+			if detail_html is None:
+				continue
+			yield await _detail_record(parser, detail_url, detail_html)
+	finally:
+		await cancel_tasks(tasks)
 
-		# 8. Pour chaque consultation trouvée (dédup sortie par id)
-		for detail_url in unique_detail_urls:
-			detail_resp = await polite_get(client, detail_url)
-			data = parse_consultation_detail(detail_resp.text)
-
-			# Ajouter les paramètres refConsultation / orgAcronyme (utile pour debug)
-			parsed = urlparse(detail_url)
-			qs = parse_qs(parsed.query)
-			data["refConsultation"] = qs.get("refConsultation", [None])[0]
-			data["orgAcronyme"] = qs.get("orgAcronyme", [None])[0]
-
-			# ID unique stable
-			data["id"] = compute_uid(
-				data.get("entite_publique"),
-				data.get("ref"),
-				data.get("date_limite"),
-			)
-
-			# horodatage de collecte (ISO, UTC)
-			try:
-				from datetime import UTC
-				data["scraped_at"] = datetime.now(UTC).isoformat(timespec="seconds")
-			except Exception:
-				# Fallback pour versions Python anciennes
-				data["scraped_at"] = datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
+async def _detail_record(parser: ParseExecutor, detail_url: str, detail_html: str) -> dict:
+	"""Parse une page détail et ajoute clé de collecte, ID stable, horodatage et URL."""
+	data = await parser.run(parse_consultation_detail_fast, detail_html)
 
-			# Attacher l'URL de détail canonique
-			data["url_detail"] = detail_url
+	# Ajouter les paramètres refConsultation / orgAcronyme (clé de l'index de collecte)
+	key = detail_key(detail_url)
+	data["refConsultation"], data["orgAcronyme"] = key if key else (None, None)
 
-			# Sauvegarde JSONL (une ligne par consultation) – éviter doublons
-			if data["id"] not in seen_ids:
-				append_jsonl(OUTPUT_FILE, data)
-				seen_ids.add(data["id"])
-				print(f"[OK] {data.get('ref')} ({data.get('id')})")
-			else:
-				print(f"[SKIP DUP] {data.get('ref')} ({data.get('id')})")
+	# ID unique stable
+	data["id"] = compute_uid(
+		data.get("entite_publique"),
+		data.get("ref"),
+		data.get("date_limite"),
+	)
+
+	# horodatage de collecte (ISO, UTC)
+	try:
+		from datetime import UTC
+		data["scraped_at"] = datetime.now(UTC).isoformat(timespec="seconds")
+	except Exception:
+		# Fallback pour versions Python anciennes
+		data["scraped_at"] = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+	# Attacher l'URL de détail canonique
+	data["url_detail"] = detail_url
+	return data
+
+
+def write_record(data: dict, store: JsonlStore, seen_ids: Set[str], key_index: Optional[KeyIndex] = None) -> bool:
+	"""
+	Sauvegarde JSONL (une ligne par consultation) en évitant les doublons.
+	La clé de collecte est marquée après l'ajout: elle n'est persistée qu'avec lui (KeyIndex.attach).
+	"""
+	written = data["id"] not in seen_ids
+	if written:
+		store.append(data)
+		seen_ids.add(data["id"])
+		print(f"[OK] {data.get('ref')} ({data.get('id')})")
+	else:
+		print(f"[SKIP DUP] {data.get('ref')} ({data.get('id')})")
+	if key_index is not None and data.get("refConsultation") and data.get("orgAcronyme"):
+		key_index.mark((data["refConsultation"], data["orgAcronyme"]))
+	return written
+
+
+def prepare_output(clear_output: bool) -> Tuple[JsonlStore, Set[str]]:
+	"""Ouvre le store de sortie (vidé uniquement si demandé) et charge les IDs existants depuis son index."""
+	store = JsonlStore(OUTPUT_FILE)
+	if clear_output:
+		store.clear()
+		if KEY_INDEX_FILE.exists():
+			KEY_INDEX_FILE.unlink()
+	return store.open(), store.load_ids()
+
+
+async def run_scraper(
+	date_start: str = "27/04/2025",
+	date_end: Optional[str] = None,
+	clear_output: bool = False,
+	concurrency: int = DETAIL_CONCURRENCY,
+	ttl: float = KEY_INDEX_TTL,
+	parse_workers: int = PARSE_WORKERS,
+) -> None:
+	"""
+	1. GET la page de recherche
+	2. Remplit la date
+	3. POST 'Lancer la recherche'
+	4. Récupère les liens détail de TOUTES les consultations (icônes <img>)
+	5. Télécharge les détails en parallèle (borné), extrait les données, calcule un ID, écrit en JSONL
+	"""
+	list_limiter = RateLimiter(LIST_REQUEST_INTERVAL)
+	detail_limiter = RateLimiter(DETAIL_REQUEST_INTERVAL)
+
+	async with build_client() as client:
+		form = await load_search_form(client, limiter=list_limiter)
+		unique_detail_urls, _ = await collect_detail_urls(
+			client,
+			form,
+			date_start,
+			date_end or date_start,
+			limiter=list_limiter,
+			fallback_en_cours=True,
+			debug_dump=True,
+		)
+		print(f"[INFO] Liens détail uniques (après canon/dedup): {len(unique_detail_urls)}")
+
+		# Charger les IDs existants pour dédup inter-runs
+		store, seen_ids = prepare_output(clear_output)
+		# Ne pas retélécharger les détails collectés récemment
+		key_index = KeyIndex(ttl=ttl).load(store).attach(store)
+		to_fetch = key_index.filter_stale(unique_detail_urls)
+		print(f"[INFO] Détails déjà collectés (< TTL), ignorés: {len(unique_detail_urls) - len(to_fetch)}")
+
+		stats = FetchStats()
+		parser = ParseExecutor(parse_workers, name="httpx").start()
+		try:
+			async with contextlib.aclosing(
+				scrape_details(client, to_fetch, detail_limiter, stats, concurrency=concurrency, parser=parser)
+			) as details:
+				async for data in details:
+					write_record(data, store, seen_ids, key_index)
+		finally:
+			parser.shutdown()
+			store.close()
+			key_index.close()
+
+		print(stats.summary("détails"))
+		print(parser.summary())
 
 
 def _parse_cli_args() -> Tuple[Optional[str], Optional[str], Optional[int]]:
@@ -566,23 +1088,121 @@ def _parse_cli_args() -> Tuple[Optional[str], Optional[str], Optional[int]]:
 	return ds, de, year if year else None, overwrite
 
 
-async def run_year(year: int, overwrite: bool = False) -> None:
-	"""Scrape l'année complète jour par jour (plus fin pour limiter la pagination), sans doublons."""
-	from datetime import date, timedelta
-	# Préparer sortie une fois
-	if overwrite and OUTPUT_FILE.exists():
-		OUTPUT_FILE.unlink()
-	if not OUTPUT_FILE.exists():
-		OUTPUT_FILE.touch()
-	start = date(year, 1, 1)
-	end = date(year, 12, 31)
+# Fenêtrage adaptatif du mode plage: taille initiale des fenêtres (jours fusionnés)
+# et nombre de fenêtres traitées simultanément sous le même budget de politesse
+RANGE_WINDOW_DAYS = 7
+RANGE_WINDOW_CONCURRENCY = 3
+# Enregistrements en attente du writer (contre-pression sur les téléchargements)
+RANGE_RECORDS_BUFFER = 1000
+
+
+async def run_range(
+	start: date,
+	end: date,
+	overwrite: bool = False,
+	window_days: int = RANGE_WINDOW_DAYS,
+	window_concurrency: int = RANGE_WINDOW_CONCURRENCY,
+	concurrency: int = DETAIL_CONCURRENCY,
+	ttl: float = KEY_INDEX_TTL,
+	parse_workers: int = PARSE_WORKERS,
+) -> None:
+	"""
+	Scrape une plage de dates avec une seule session HTTP et un seul gabarit de formulaire.
+	Les jours sont regroupés en fenêtres de `window_days` (les jours vides ne coûtent pas
+	de requête propre); une fenêtre dont les résultats dépassent une page est coupée en deux,
+	et un jour seul qui déborde suit la pagination. Plusieurs fenêtres tournent en parallèle
+	sous les mêmes limiteurs; un unique writer écrit le JSONL.
+	"""
+	list_limiter = RateLimiter(LIST_REQUEST_INTERVAL)
+	detail_limiter = RateLimiter(DETAIL_REQUEST_INTERVAL)
+	detail_semaphore = asyncio.Semaphore(concurrency)
+	stats = FetchStats()
+	parser = ParseExecutor(parse_workers, name="httpx")
+	seen_urls: Set[str] = set()
+
+	windows: "asyncio.Queue[Tuple[date, date]]" = asyncio.Queue()
+	records: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(maxsize=RANGE_RECORDS_BUFFER)
+
 	cur = start
 	while cur <= end:
-		ds = cur.strftime("%d/%m/%Y")
-		de = ds
-		print(f"\n[DAY] {ds}")
-		await run_scraper(ds, de, clear_output=False)
-		cur += timedelta(days=1)
+		window_end = min(cur + timedelta(days=window_days - 1), end)
+		windows.put_nowait((cur, window_end))
+		cur = window_end + timedelta(days=1)
+
+	store, seen_ids = prepare_output(overwrite)
+	key_index = KeyIndex(ttl=ttl).load(store).attach(store)
+
+	async def writer() -> None:
+		written = 0
+		while True:
+			data = await records.get()
+			if data is None:
+				break
+			if write_record(data, store, seen_ids, key_index):
+				written += 1
+		print(f"[INFO] Enregistrements écrits: {written}")
+
+	async def process_window(client: httpx.AsyncClient, form: SearchForm, ws: date, we: date) -> None:
+		ds = ws.strftime("%d/%m/%Y")
+		de = we.strftime("%d/%m/%Y")
+		single_day = ws == we
+		urls, truncated = await collect_detail_urls(
+			client, form, ds, de, limiter=list_limiter, follow_pagination=single_day,
+		)
+		if truncated:
+			# Plus d'une page de résultats: couper la fenêtre en deux
+			mid = ws + timedelta(days=(we - ws).days // 2)
+			print(f"[SPLIT] {ds} -> {de}")
+			windows.put_nowait((ws, mid))
+			windows.put_nowait((mid + timedelta(days=1), we))
+			return
+		new_urls = [u for u in urls if u not in seen_urls]
+		seen_urls.update(new_urls)
+		stale_urls = key_index.filter_stale(new_urls)
+		print(f"[WINDOW] {ds} -> {de}: {len(new_urls)} liens, {len(stale_urls)} à télécharger")
+		async with contextlib.aclosing(
+			scrape_details(client, stale_urls, detail_limiter, stats, semaphore=detail_semaphore, parser=parser)
+		) as details:
+			async for data in details:
+				await records.put(data)
+
+	async def worker(client: httpx.AsyncClient, form: SearchForm) -> None:
+		while True:
+			ws, we = await windows.get()
+			try:
+				await process_window(client, form, ws, we)
+			except Exception as e:
+				print(f"[ERR] fenêtre {ws} -> {we}: {e}")
+			finally:
+				windows.task_done()
+
+	parser.start()
+	try:
+		async with build_client() as client:
+			form = await load_search_form(client, limiter=list_limiter)
+			writer_task = asyncio.create_task(writer())
+			workers = [asyncio.create_task(worker(client, form)) for _ in range(window_concurrency)]
+			all_windows_done = asyncio.create_task(windows.join())
+			# Un writer en échec ne vide plus la file d'enregistrements: les workers s'y
+			# bloqueraient indéfiniment, on s'arrête donc aussi sur sa fin
+			await asyncio.wait([all_windows_done, writer_task], return_when=asyncio.FIRST_COMPLETED)
+			await cancel_tasks(workers + [all_windows_done])
+			if writer_task.done():
+				writer_task.result()  # relève l'erreur du writer
+			await records.put(None)
+			await writer_task
+	finally:
+		parser.shutdown()
+		store.close()
+		key_index.close()
+
+	print(stats.summary("détails"))
+	print(parser.summary())
+
+
+async def run_year(year: int, overwrite: bool = False) -> None:
+	"""Scrape l'année complète (fenêtres adaptatives, session unique), sans doublons."""
+	await run_range(date(year, 1, 1), date(year, 12, 31), overwrite=overwrite)
 
 
 if __name__ == "__main__":
@@ -599,4 +1219,3 @@ if __name__ == "__main__":
 		if not ds:
 			ds = "27/04/2025"
 		asyncio.run(run_scraper(ds, de, clear_output=bool(overwrite) if overwrite is not None else False))
-
@@ -0,0 +1,56 @@
+"""
+Fixtures partagées: base SQLite en mémoire et client API branché dessus
+"""
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base, Consultation
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    day = datetime(2025, 10, 1)
+    # Plusieurs consultations partagent la même date: le tri doit départager par id
+    for i in range(25):
+        session.add(Consultation(
+            ref_consultation=f'AO-{i:02d}',
+            organisme_acronyme='ORG',
+            titre=f'Consultation {i}',
+            type_marche='travaux',
+            statut='en_cours',
+            date_publication=day - timedelta(days=i // 4),
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    from api.main import app
+    from database.connection import get_db
+
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statements(db):
+    """Requêtes SQL émises pendant le test (comptage des allers-retours)"""
+    captured = []
+    engine = db.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(engine, 'before_cursor_execute', capture)
@@ -0,0 +1,57 @@
+"""
+Tests de la recherche groupée POST /api/v1/consultations/batch
+"""
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from api.schemas import BATCH_MAX_REFS
+from api.serialization import STREAM_CHUNK
+from database.models import Consultation
+
+
+def test_batch_order_and_not_found(client, statements):
+    refs = ['AO-03', 'INCONNUE', 'AO-00', 'AO-03']
+    response = client.post('/api/v1/consultations/batch', json={'refs': refs})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item['ref_consultation'] for item in body] == refs
+    assert [item['found'] for item in body] == [True, False, True, True]
+    assert body[1]['consultation'] is None
+    # Une seule requête pour toutes les références
+    assert len(statements) == 1
+
+    listed = {c['ref_consultation']: c for c in client.get('/api/v1/consultations').json()}
+    assert body[0]['consultation'] == body[3]['consultation'] == listed['AO-03']
+    assert body[2]['consultation'] == listed['AO-00']
+
+
+def test_batch_fields(client):
+    body = client.post('/api/v1/consultations/batch?fields=statut', json={'refs': ['AO-01']}).json()
+    assert body == [{'ref_consultation': 'AO-01', 'found': True, 'consultation': {'statut': 'en_cours'}}]
+
+
+def test_batch_limits(client):
+    assert client.post('/api/v1/consultations/batch', json={'refs': []}).status_code == 422
+    too_many = [f'R-{i}' for i in range(BATCH_MAX_REFS + 1)]
+    assert client.post('/api/v1/consultations/batch', json={'refs': too_many}).status_code == 422
+
+
+def test_batch_streamed(client, db):
+    db.execute(insert(Consultation), [
+        {
+            'ref_consultation': f'BT-{i:05d}', 'organisme_acronyme': 'BAT', 'titre': f'Lot {i}',
+            'type_marche': 'services', 'statut': 'en_cours', 'date_publication': datetime(2025, 1, 1),
+        }
+        for i in range(2 * STREAM_CHUNK)
+    ])
+    db.commit()
+    refs = [f'BT-{i:05d}' for i in reversed(range(2 * STREAM_CHUNK + 10))]
+    response = client.post('/api/v1/consultations/batch', json={'refs': refs})
+    assert 'content-length' not in response.headers
+    body = response.json()
+    assert [item['ref_consultation'] for item in body] == refs
+    assert sum(item['found'] for item in body) == 2 * STREAM_CHUNK
+
+    ndjson = client.post('/api/v1/consultations/batch', json={'refs': refs}, headers={'Accept': 'application/x-ndjson'})
+    assert len(ndjson.text.splitlines()) == len(refs)
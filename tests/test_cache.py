@@ -0,0 +1,93 @@
+"""
+Tests du cache des réponses de l'API (ETag, précompression, invalidation par version)
+"""
+import pytest
+
+from database.data_version import LocalDataVersion
+
+
+@pytest.fixture
+def cache():
+    from api.main import response_cache
+
+    response_cache.version_source = LocalDataVersion()
+    response_cache.clear()
+    yield response_cache
+    response_cache.version_source = None
+    response_cache.clear()
+
+
+def test_hit_and_revalidation(client, cache):
+    first = client.get('/api/v1/consultations?limit=5&offset=0')
+    assert first.headers['X-Cache'] == 'MISS'
+    # Paramètres normalisés: ordre et valeurs vides sans effet sur la clé
+    second = client.get('/api/v1/consultations?organisme=&offset=0&limit=5')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.json() == first.json()
+    assert second.headers['X-Next-Cursor'] == first.headers['X-Next-Cursor']
+
+    etag = second.headers['ETag']
+    not_modified = client.get('/api/v1/consultations?limit=5&offset=0', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+
+
+def test_precompressed_gzip(client, cache):
+    plain = client.get('/api/v1/consultations?limit=20', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/api/v1/consultations?limit=20', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.json() == plain.json()
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+
+def test_version_bump_invalidates(client, cache, db):
+    from database.models import Consultation
+
+    before = client.get('/api/v1/stats').json()
+    assert client.get('/api/v1/stats').headers['X-Cache'] == 'HIT'
+    db.delete(db.query(Consultation).first())
+    db.commit()
+    # Sans nouvelle version la réponse en cache est servie
+    assert client.get('/api/v1/stats').json() == before
+    cache.version_source.bump()
+    after = client.get('/api/v1/stats')
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.json()['total_consultations'] == before['total_consultations'] - 1
+
+
+def test_no_cache_without_version(client):
+    response = client.get('/api/v1/stats')
+    assert 'X-Cache' not in response.headers
+    assert 'ETag' not in response.headers
+
+
+def test_byte_budget_evicts_lru():
+    """Au-delà de max_bytes, les entrées les moins récemment lues sont évincées"""
+    from api.cache import ResponseCache, build_entry
+
+    def entry(size):
+        return build_entry(1, 200, {'content-type': 'application/octet-stream'}, b'x' * size)
+
+    a, b, c = entry(100), entry(100), entry(300)
+    cache = ResponseCache(max_bytes=a.size + c.size)
+    cache.put('a', a)
+    cache.put('b', b)
+    assert cache.get('a', 1) is a
+    cache.put('c', c)
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is a and cache.get('c', 1) is c
+    assert cache.size == a.size + c.size
+
+    # Remplacement: l'ancienne taille est décomptée; trop gros pour le budget: non conservé
+    smaller = entry(50)
+    cache.put('a', smaller)
+    cache.put('d', entry(5000))
+    assert cache.get('d', 1) is None
+    assert cache.size == smaller.size + c.size
+
+def test_export_not_cached(client, cache):
+    """Les exports restent en flux: ni mis en mémoire ni marqués par le cache"""
+    response = client.get('/api/v1/export/csv')
+    assert response.status_code == 200
+    assert 'X-Cache' not in response.headers
+    assert cache.size == 0
@@ -0,0 +1,81 @@
+"""
+Tests du flux de modifications GET /api/v1/changes
+
+Sous PostgreSQL, change_log est écrit par les triggers de la migration 007; ici les
+entrées sont insérées comme le feraient les triggers.
+"""
+import json
+from datetime import date, datetime
+
+import pytest
+
+from database.models import Attribution, ChangeLog, Consultation
+
+
+def log(db, txid, table, operation, row_id, ref=None):
+    db.add(ChangeLog(
+        txid=txid, table_name=table, operation=operation, row_id=row_id,
+        ref_consultation=ref, date_changement=datetime(2025, 11, 1),
+    ))
+    db.commit()
+
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.fixture
+def changes(db):
+    consultation = db.query(Consultation).filter_by(ref_consultation='AO-01').one()
+    attribution = Attribution(
+        ref_consultation='AO-01', organisme_acronyme='ORG', entreprise_nom='Entreprise',
+        date_attribution=date(2025, 11, 2),
+    )
+    db.add(attribution)
+    db.commit()
+    # Transaction 10: insertion puis mise à jour de AO-01; 11: attribution; 12: suppression
+    log(db, 10, 'consultations', 'insert', consultation.id_interne, 'AO-01')
+    log(db, 10, 'consultations', 'update', consultation.id_interne, 'AO-01')
+    log(db, 11, 'attributions', 'insert', attribution.id_attribution, 'AO-01')
+    log(db, 12, 'consultations', 'delete', 999, 'AO-99')
+    return consultation, attribution
+
+
+def test_changes_feed(client, changes):
+    consultation, attribution = changes
+    response = client.get('/api/v1/changes')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    feed = lines(response)
+    # Deux modifications de AO-01 dans la page: une seule ligne, la dernière
+    assert [(c['table'], c['operation'], c['id']) for c in feed] == [
+        ('consultations', 'update', consultation.id_interne),
+        ('attributions', 'insert', attribution.id_attribution),
+        ('consultations', 'delete', 999),
+    ]
+    assert feed[0]['data']['ref_consultation'] == 'AO-01'
+    assert feed[0]['data']['statut'] == 'en_cours'
+    assert feed[1]['data']['entreprise_nom'] == 'Entreprise'
+    assert feed[2]['data'] is None
+    assert response.headers['x-next-cursor'] == feed[-1]['cursor']
+
+
+def test_changes_resume(client, db, changes):
+    first = client.get('/api/v1/changes?limit=2')
+    assert len(lines(first)) == 1
+    rest = client.get(f"/api/v1/changes?since={first.headers['x-next-cursor']}")
+    assert [c['operation'] for c in lines(rest)] == ['insert', 'delete']
+
+    # Rien de nouveau: page vide, le curseur est conservé
+    cursor = rest.headers['x-next-cursor']
+    empty = client.get(f'/api/v1/changes?since={cursor}')
+    assert empty.text == '' and empty.headers['x-next-cursor'] == cursor
+
+    log(db, 13, 'consultations', 'update', 1, 'AO-00')
+    assert [c['ref_consultation'] for c in lines(client.get(f'/api/v1/changes?since={cursor}'))] == ['AO-00']
+
+
+def test_changes_head_and_invalid(client, changes):
+    head = client.get('/api/v1/changes/head').json()['cursor']
+    assert client.get(f'/api/v1/changes?since={head}').text == ''
+    assert client.get('/api/v1/changes?since=invalide').status_code == 400
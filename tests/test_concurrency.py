@@ -0,0 +1,32 @@
+"""
+Tests de l'exécution des endpoints: accès base hors de la boucle asyncio
+"""
+import inspect
+
+import anyio
+from fastapi.routing import APIRoute
+
+from database.connection import DB_MAX_OVERFLOW, DB_POOL_SIZE, get_db
+
+
+def test_db_endpoints_are_sync():
+    """Un endpoint async qui appelle la session synchrone bloquerait la boucle"""
+    from api.main import app
+
+    routes = [
+        route for route in app.routes
+        if isinstance(route, APIRoute) and any(dep.call is get_db for dep in route.dependant.dependencies)
+    ]
+    assert routes
+    for route in routes:
+        assert not inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_threadpool_matches_connection_pool():
+    from api.main import configure_threadpool
+
+    async def tokens():
+        configure_threadpool()
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert anyio.run(tokens) == DB_POOL_SIZE + DB_MAX_OVERFLOW
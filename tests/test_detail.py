@@ -0,0 +1,72 @@
+"""
+Tests du détail d'une consultation (cycle de vie complet, nombre de requêtes)
+"""
+from datetime import date, datetime
+
+import pytest
+
+from database.models import Achevement, Attribution, Lot, PVExtrait
+
+
+@pytest.fixture
+def lifecycle(db):
+    for i in range(3):
+        db.add(Lot(ref_consultation='AO-00', numero_lot=str(i + 1), designation=f'Lot {i + 1}'))
+        db.add(Attribution(
+            ref_consultation='AO-00', organisme_acronyme='ORG', entreprise_nom=f'Entreprise {i}',
+            date_attribution=date(2025, 11, 1 + i), numero_lot=str(i + 1),
+        ))
+    db.add(PVExtrait(
+        ref_consultation='AO-00', organisme_acronyme='ORG', type_pv='Ouverture des plis',
+        date_publication_pv=datetime(2025, 10, 20), nombre_soumissionnaires=4,
+    ))
+    db.add(Achevement(
+        ref_consultation='AO-00', organisme_acronyme='ORG', date_achevement=date(2026, 3, 1),
+        entreprise_nom='Entreprise 0',
+    ))
+    db.commit()
+
+
+def selects(statements):
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+def test_detail_full_lifecycle(client, lifecycle, statements):
+    response = client.get('/api/v1/consultations/AO-00')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['titre'] == 'Consultation 0'
+    assert [lot['numero_lot'] for lot in body['lots']] == ['1', '2', '3']
+    assert body['pv_extraits'][0]['nombre_soumissionnaires'] == 4
+    assert [a['date_attribution'] for a in body['attributions']] == ['2025-11-01', '2025-11-02', '2025-11-03']
+    assert body['achevements'] == [{
+        'date_achevement': '2026-03-01', 'date_publication': None, 'entreprise_nom': 'Entreprise 0',
+        'montant_definitif': None, 'observations': None, 'url_rapport': None,
+    }]
+    # Consultation + une requête par relation, indépendamment du nombre de lignes
+    assert len(selects(statements)) == 5
+
+
+def test_detail_include(client, lifecycle, statements):
+    body = client.get('/api/v1/consultations/AO-00?include=attributions').json()
+    assert 'attributions' in body and 'lots' not in body and 'pv_extraits' not in body
+    assert len(selects(statements)) == 2
+
+    statements.clear()
+    body = client.get('/api/v1/consultations/AO-00?include=').json()
+    assert body['ref_consultation'] == 'AO-00' and 'lots' not in body
+    assert len(selects(statements)) == 1
+
+    assert client.get('/api/v1/consultations/AO-00?include=documents').status_code == 400
+
+
+def test_detail_fields_and_include(client, lifecycle, statements):
+    body = client.get('/api/v1/consultations/AO-00?fields=titre&include=lots,achevements').json()
+    assert list(body) == ['titre', 'lots', 'achevements']
+    assert len(selects(statements)) == 3
+    assert 'objet' not in selects(statements)[0].split(' FROM ')[0]
+
+
+def test_detail_not_found(client, statements):
+    assert client.get('/api/v1/consultations/INCONNUE').status_code == 404
+    assert len(selects(statements)) == 1
@@ -0,0 +1,81 @@
+"""
+Tests différentiels du parseur détail rapide du scraper httpx
+"""
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from pmmp_consultations_scraper import parse_consultation_detail, parse_consultation_detail_fast
+
+
+P = "ctl0_CONTENU_PAGE_idEntrepriseConsultationSummary_"
+
+RECAP = f"""
+<div id="recap-consultation" class="recap">
+  <div class="line"><div class="intitule">Date limite</div>
+    <div class="content-bloc"><span id="{P}dateHeureLimiteRemisePlis">14/10/2026 09:00</span></div></div>
+  <div class="line"><span id="{P}reference">  AO N°12/2026  </span></div>
+  <div class="line"><span id="{P}objet">Travaux de <b>construction</b><br>d'une école&nbsp;primaire</span></div>
+  <div class="line"><span id="{P}entiteAchat">Commune   de   Rabat</span></div>
+  <div class="line"><span id="{P}typeProcedure">Appel d'offres ouvert</span>
+    <span id="{P}modePassation">sur offres de prix</span></div>
+  <div class="line"><span id="{P}categoriePrincipale">Travaux</span></div>
+  <div class="line"><span id="{P}lieuxExecutions">RABAT<script>var x = 1;</script></span></div>
+  <div class="line"><span id="{P}idReferentielZoneText_RepeaterReferentielZoneText_ctl0_labelReferentielZoneText">1 227 400,00</span></div>
+  <div class="line"><span id="{P}cautionProvisoire">12 000,00 DH</span></div>
+  <div class="line"><span id="{P}lieuOuverturePlis">Salle de réunion</span></div>
+  <div class="line"><span id="{P}adresseRetraitDossiers">Service des marchés</span></div>
+  <div class="line"><span id="{P}adresseDepotOffres">Bureau d'ordre</span></div>
+  <div class="line"><span id="{P}varianteValeur">Non</span></div>
+  <div id="{P}panelRepeaterVisitesLieux">
+    <ul><li>Lieu : Site A</li><li>Date : 01/10/2026 10:00</li></ul>
+  </div>
+</div>
+"""
+
+
+def page(recap=RECAP, before='', after=''):
+    return f"""<!DOCTYPE html>
+<html><head><title>Détail</title><script>var recap = '<div id="other">';</script></head>
+<body><div id="header"><!-- menu --><div class="menu">Menu</div></div>
+{before}{recap}{after}
+<div id="footer">Pied de page</div></body></html>"""
+
+
+CASES = {
+    'complet': page(),
+    'sans_mode': page(RECAP.replace(f'<span id="{P}modePassation">sur offres de prix</span>', '')),
+    'sans_visites': page(RECAP.replace(f'id="{P}panelRepeaterVisitesLieux"', 'id="autre"')),
+    'commentaire_dans_bloc': page(RECAP.replace('<div class="line">', '<!-- x --><div class="line">', 1)),
+    'id_en_double': page(RECAP, after=f'<span id="{P}reference">hors bloc</span>'),
+    'sans_bloc': page(''),
+    'vide': '',
+    'quotes_simples': page(RECAP.replace('id="recap-consultation"', "id='recap-consultation'")),
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_fast_parser_matches_reference(name):
+    html = CASES[name]
+    assert parse_consultation_detail_fast(html) == parse_consultation_detail(html)
+
+
+def test_fast_parser_values():
+    data = parse_consultation_detail_fast(CASES['complet'])
+    assert data['ref'] == 'AO N°12/2026'
+    assert data['type_procedure'] == "Appel d'offres ouvert sur offres de prix"
+    assert data['lieu_execution'] == 'RABAT'
+    assert data['visites_lieux'] == 'Lieu : Site A Date : 01/10/2026 10:00'
+
+
+ARCHIVED_PAGES = sorted((ROOT / 'data' / 'archives').rglob('*.html'))
+
+
+@pytest.mark.skipif(not ARCHIVED_PAGES, reason="Aucune page détail archivée")
+@pytest.mark.parametrize('path', ARCHIVED_PAGES, ids=lambda p: p.name)
+def test_fast_parser_matches_reference_on_archives(path):
+    html = path.read_text(encoding='utf-8', errors='replace')
+    assert parse_consultation_detail_fast(html) == parse_consultation_detail(html)
@@ -0,0 +1,118 @@
+"""
+Tests de la diffusion SSE des consultations (api/events.py)
+
+Sans PostgreSQL, les notifications sont simulées par dispatch() / publish().
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from api.events import ConsultationBroadcaster, event_stream
+from database.models import Consultation
+
+
+def broadcaster_for(db):
+    return ConsultationBroadcaster(None, sessionmaker(bind=db.get_bind()))
+
+
+def event(ref, organisme='ORG', type_marche='travaux'):
+    return {'operation': 'insert', 'consultation': {
+        'ref_consultation': ref, 'organisme_acronyme': organisme, 'type_marche': type_marche,
+    }}
+
+
+def test_dispatch_filters(db):
+    broadcaster = broadcaster_for(db)
+    ids = {c.ref_consultation: c.id_interne for c in db.query(Consultation)}
+    db.add(Consultation(
+        ref_consultation='SSE-1', organisme_acronyme='ONEE', titre='Fournitures', type_marche='fournitures',
+        statut='en_cours', date_publication=datetime(2025, 10, 2),
+    ))
+    db.commit()
+    onee_id = db.query(Consultation).filter_by(ref_consultation='SSE-1').one().id_interne
+
+    async def scenario():
+        everything = broadcaster.subscribe()
+        onee = broadcaster.subscribe(organisme='onee', type_marche='fournitures')
+        # Notifications reçues par le thread d'écoute
+        thread = threading.Thread(target=broadcaster.dispatch, args=([
+            ('insert', ids['AO-00']), ('update', onee_id), ('insert', 123456),
+        ],))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+        drain = lambda subscriber: [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+        return drain(everything), drain(onee)
+
+    everything, onee = asyncio.run(scenario())
+    # La ligne inconnue (supprimée depuis) n'est pas diffusée
+    assert [(e['operation'], e['consultation']['ref_consultation']) for e in everything] == [
+        ('insert', 'AO-00'), ('update', 'SSE-1')
+    ]
+    assert everything[0]['consultation']['statut'] == 'en_cours'
+    assert [e['consultation']['ref_consultation'] for e in onee] == ['SSE-1']
+
+
+def test_bounded_buffer_overflow(db):
+    broadcaster = broadcaster_for(db)
+
+    async def scenario():
+        stream = event_stream(broadcaster, heartbeat=0.05)
+        chunks = [await stream.__anext__()]
+        subscriber = broadcaster.subscribers[0]
+        subscriber.buffer_size = 2
+        broadcaster.publish([event(f'R-{i}') for i in range(5)])
+        await asyncio.sleep(0)
+        assert subscriber.queue.qsize() == 3
+        chunks += [chunk async for chunk in stream]
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[0].startswith(b'retry:')
+    assert [json.loads(c.split(b'data: ')[1])['consultation']['ref_consultation'] for c in chunks[1:3]] == ['R-0', 'R-1']
+    assert chunks[3] == b'event: overflow\ndata: {}\n\n'
+    # Flux terminé: l'abonné est retiré
+    assert broadcaster.subscribers == []
+
+
+def test_heartbeat(db):
+    broadcaster = broadcaster_for(db)
+
+    async def scenario():
+        stream = event_stream(broadcaster, heartbeat=0.01)
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return chunks
+
+    assert asyncio.run(scenario())[1] == b': ping\n\n'
+    assert broadcaster.subscribers == []
+
+
+def test_stream_endpoint(client):
+    from api.main import consultation_events
+
+    # TestClient ne rend la réponse qu'à la fin du flux: requête dans un thread, flux
+    # terminé par un débordement
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        response=client.get('/api/v1/consultations/stream?type_marche=travaux')
+    ))
+    thread.start()
+    while not consultation_events.subscribers:
+        time.sleep(0.01)
+    consultation_events.subscribers[0].buffer_size = 1
+    consultation_events.publish([event('AUTRE', type_marche='services'), event('AO-X'), event('AO-Y')])
+    thread.join(timeout=10)
+
+    response = result['response']
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert 'x-cache' not in response.headers
+    body = [line for line in response.text.splitlines() if line]
+    assert body[0].startswith('retry:')
+    assert body[1:3] == ['event: consultation', 'data: ' + json.dumps(event('AO-X'), separators=(',', ':'))]
+    assert body[3:] == ['event: overflow', 'data: {}']
+    assert consultation_events.subscribers == []
@@ -0,0 +1,82 @@
+"""
+Tests de l'export CSV en flux
+"""
+import csv
+import gzip
+import io
+import tracemalloc
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from api.crud import EXPORT_COLUMNS, iter_export_consultations
+from api.export import ARROW_STREAM_MEDIA_TYPE, csv_stream
+from database.models import Consultation
+
+
+def add_consultations(db, start, count):
+    db.execute(insert(Consultation), [
+        {
+            'ref_consultation': f'EX-{i:06d}', 'organisme_acronyme': 'EXP',
+            'titre': f'Export {i} ' + 'x' * 200, 'type_marche': 'services',
+            'statut': 'cloture', 'date_publication': datetime(2024, 1, 1),
+        }
+        for i in range(start, start + count)
+    ])
+    db.commit()
+
+
+def export_peak(db) -> int:
+    """Pic d'allocation pendant un export complet (octets)"""
+    fieldnames = [column.key for column in EXPORT_COLUMNS]
+    tracemalloc.start()
+    size = sum(len(chunk) for chunk in csv_stream(fieldnames, iter_export_consultations(db, batch_size=500)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert size > 0
+    return peak
+
+
+def test_export_csv_all_rows(client):
+    response = client.get('/api/v1/export/csv')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 25
+    assert rows[0]['type_marche'] == 'travaux'
+    assert rows[0]['statut'] == 'en_cours'
+    assert rows[0]['montant_estime'] == ''
+
+
+def test_export_csv_gzip(client):
+    plain = client.get('/api/v1/export/csv?statut=en_cours')
+    compressed = client.get('/api/v1/export/csv?statut=en_cours&gzip=true')
+    assert compressed.headers['content-type'] == 'application/gzip'
+    assert 'consultations_' in compressed.headers['content-disposition']
+    assert compressed.headers['content-disposition'].endswith('.csv.gz')
+    assert gzip.decompress(compressed.content) == plain.content
+
+
+def test_export_memory_flat(db):
+    """Le pic mémoire ne croît pas avec le nombre de lignes exportées"""
+    add_consultations(db, 0, 2000)
+    small = export_peak(db)
+    add_consultations(db, 2000, 18000)
+    large = export_peak(db)
+    assert large < small * 2
+
+
+def test_export_arrow_stream(client, db):
+    pa = pytest.importorskip('pyarrow')
+    add_consultations(db, 0, 250)
+    response = client.get('/api/v1/export/arrow/consultations?batch_size=100')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == ARROW_STREAM_MEDIA_TYPE
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 275
+    assert pa.types.is_dictionary(table.schema.field('statut').type)
+    assert table.schema.field('montant_estime').type == pa.decimal128(15, 2)
+    assert table.schema.field('date_publication').type == pa.timestamp('us')
+    assert set(table.column('statut').to_pylist()) == {'en_cours', 'cloture'}
+    assert client.get('/api/v1/export/arrow/inconnue').status_code == 404
@@ -0,0 +1,261 @@
+"""
+Tests du scraper httpx: débit, concurrence et erreurs des téléchargements détail
+"""
+import asyncio
+import contextlib
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+import pmmp_consultations_scraper as scraper
+from jsonl_store import JsonlStore
+from pmmp_consultations_scraper import (
+    BASE_URL, FetchStats, KeyIndex, RateLimiter, detail_key, fetch_details, scrape_details, write_record,
+)
+
+
+def detail_url(ref):
+    return f"{BASE_URL}/index.php?page=entreprise.EntrepriseDetailsConsultation&refConsultation={ref}&orgAcronyme=ORG"
+
+
+def mock_client(handler):
+    return httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+
+
+def test_rate_limiter_spaces_requests():
+    """Départs espacés d'au moins `interval`, même avec des tâches concurrentes"""
+    async def main():
+        limiter = RateLimiter(0.05)
+        starts = []
+
+        async def request():
+            await limiter.wait()
+            starts.append(time.monotonic())
+
+        await asyncio.gather(*(request() for _ in range(5)))
+        return sorted(starts)
+
+    starts = asyncio.run(main())
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert min(gaps) >= 0.045
+    assert starts[-1] - starts[0] >= 4 * 0.045
+
+
+def test_fetch_details_bounded_concurrency():
+    """Jamais plus de `concurrency` téléchargements simultanés; ordre des tâches = ordre des URLs"""
+    active, peak = 0, 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, text=request.url.params['refConsultation'])
+
+    async def main():
+        async with mock_client(handler) as client:
+            urls = [detail_url(i) for i in range(12)]
+            tasks = fetch_details(client, urls, RateLimiter(0), FetchStats(), concurrency=3)
+            return [await task for task in tasks]
+
+    assert asyncio.run(main()) == [str(i) for i in range(12)]
+    assert peak == 3
+
+
+def test_fetch_details_error_per_url():
+    """Une erreur HTTP n'affecte que son URL: None et un compteur d'erreurs"""
+    def handler(request):
+        if request.url.params['refConsultation'] == '1':
+            return httpx.Response(500)
+        return httpx.Response(200, text='ok')
+
+    async def main():
+        stats = FetchStats()
+        async with mock_client(handler) as client:
+            tasks = fetch_details(client, [detail_url(i) for i in range(3)], RateLimiter(0), stats)
+            return [await task for task in tasks], stats
+
+    results, stats = asyncio.run(main())
+    assert results == ['ok', None, 'ok']
+    assert (stats.requests, stats.errors) == (3, 1)
+
+
+def test_scrape_details_cancels_pending_fetches():
+    """Le consommateur lève une exception: les téléchargements restants sont annulés"""
+    async def main():
+        never = asyncio.Event()
+
+        async def handler(request):
+            if request.url.params['refConsultation'] != '0':
+                await never.wait()
+            return httpx.Response(200, text='<html></html>')
+
+        async with mock_client(handler) as client:
+            with pytest.raises(RuntimeError):
+                async with contextlib.aclosing(
+                    scrape_details(client, [detail_url(i) for i in range(5)], RateLimiter(0), FetchStats())
+                ) as details:
+                    async for _ in details:
+                        raise RuntimeError('writer en échec')
+            return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(main()) == []
+
+
+# -------- index de collecte (KeyIndex) --------
+
+def test_key_index_ttl_and_filter_stale(tmp_path):
+    """Une clé est fraîche pendant le TTL; filter_stale ne garde que les inconnues ou expirées"""
+    index = KeyIndex(tmp_path / 'keys.tsv', ttl=3600, fsync=False)
+    now = time.time()
+    index.mark(detail_key(detail_url('RECENT')), ts=now - 60)
+    index.mark(detail_key(detail_url('ANCIEN')), ts=now - 7200)
+    assert index.is_fresh(('RECENT', 'ORG'))
+    assert not index.is_fresh(('RECENT', 'ORG'), now=now + 3600)
+    assert not index.is_fresh(None)
+
+    urls = [detail_url('RECENT'), detail_url('ANCIEN'), detail_url('NOUVEAU'), f'{BASE_URL}/sans-cle']
+    assert index.filter_stale(urls) == urls[1:]
+
+
+def test_key_index_reload(tmp_path):
+    """Les clés persistées sont relues; la dernière ligne d'une clé gagne"""
+    path = tmp_path / 'keys.tsv'
+    index = KeyIndex(path, fsync=False)
+    index.mark(('A', 'ORG'), ts=1000)
+    index.mark(('A', 'ORG'), ts=2000)
+    index.mark(('B', 'ORG'), ts=1500)
+    index.flush()
+    index.close()
+
+    reloaded = KeyIndex(path).load()
+    assert reloaded.last_seen == {('A', 'ORG'): 2000.0, ('B', 'ORG'): 1500.0}
+
+
+def test_key_index_rebuilt_from_store(tmp_path):
+    """Sans fichier d'index, les clés sont reconstruites depuis le store de sortie"""
+    store = JsonlStore(tmp_path / 'consultations.jsonl', fsync=False)
+    with store:
+        store.append({'id': '1', 'refConsultation': 'A', 'orgAcronyme': 'ORG', 'scraped_at': '2025-01-02T00:00:00+00:00'})
+    index = KeyIndex(tmp_path / 'keys.tsv').load(store)
+    assert index.last_seen == {('A', 'ORG'): datetime.fromisoformat('2025-01-02T00:00:00+00:00').timestamp()}
+    assert (tmp_path / 'keys.tsv').exists()
+
+
+def test_key_index_persisted_after_store(tmp_path):
+    """Arrêt brutal avant le flush du store: aucune clé persistée sans son enregistrement"""
+    store = JsonlStore(tmp_path / 'consultations.jsonl', flush_every=2, fsync=False).open()
+    index = KeyIndex(tmp_path / 'keys.tsv', fsync=False).load(store).attach(store)
+    seen = set()
+    record = {'id': '1', 'ref': 'AO-1', 'refConsultation': 'A', 'orgAcronyme': 'ORG'}
+    write_record(record, store, seen, index)
+    # Enregistrement encore dans le tampon du store: la clé n'est que marquée en mémoire
+    assert index.is_fresh(('A', 'ORG'))
+    assert KeyIndex(tmp_path / 'keys.tsv').load().last_seen == {}
+
+    write_record(dict(record, id='2', refConsultation='B'), store, seen, index)
+    # flush_every atteint pendant l'ajout de B: clés marquées avant ce flush persistées
+    assert [r['id'] for r in store.iter_records()] == ['1', '2']
+    assert set(KeyIndex(tmp_path / 'keys.tsv').load().last_seen) == {('A', 'ORG')}
+    store.close()
+    index.close()
+    assert set(KeyIndex(tmp_path / 'keys.tsv').load().last_seen) == {('A', 'ORG'), ('B', 'ORG')}
+
+# -------- mode plage (run_range) --------
+
+RECAP = '<div id="recap-consultation"><span id="ctl0_CONTENU_PAGE_idEntrepriseConsultationSummary_reference">{}</span></div>'
+# Au-delà de PAGE_SIZE résultats, la recherche signale une page suivante
+PAGE_SIZE = 3
+
+
+class FakeSearchForm:
+    """Recherche simulée: 3 consultations par jour, la 3e étant (sauf le 1er) la 1re de la veille"""
+
+    def __init__(self, failing_day=None):
+        self.windows = []
+        self.failing_day = failing_day
+
+    def links(self, day):
+        refs = [f'{day:%m%d}-{i}' for i in range(3)]
+        if day.day > 1:
+            refs[2] = f'{day - timedelta(days=1):%m%d}-0'
+        return [detail_url(ref) for ref in refs]
+
+    async def collect(self, client, form, date_start, date_end, limiter=None, follow_pagination=True, **kwargs):
+        start = datetime.strptime(date_start, '%d/%m/%Y').date()
+        end = datetime.strptime(date_end, '%d/%m/%Y').date()
+        self.windows.append((start, end))
+        if start == self.failing_day:
+            raise RuntimeError('recherche en échec')
+        urls = []
+        for offset in range((end - start).days + 1):
+            urls.extend(self.links(start + timedelta(days=offset)))
+        urls = list(dict.fromkeys(urls))
+        return urls, len(urls) > PAGE_SIZE and not follow_pagination
+
+
+@pytest.fixture
+def range_env(tmp_path, monkeypatch):
+    """Sortie dans un dossier temporaire, recherche simulée, pages détail servies localement"""
+    monkeypatch.chdir(tmp_path)
+    form = FakeSearchForm()
+
+    async def load_search_form(client, limiter=None):
+        return form
+
+    def handler(request):
+        return httpx.Response(200, text=RECAP.format(request.url.params['refConsultation']))
+
+    monkeypatch.setattr(scraper, 'load_search_form', load_search_form)
+    monkeypatch.setattr(scraper, 'collect_detail_urls', lambda *a, **kw: form.collect(*a, **kw))
+    monkeypatch.setattr(scraper, 'build_client', lambda: mock_client(handler))
+    monkeypatch.setattr(scraper, 'LIST_REQUEST_INTERVAL', 0)
+    monkeypatch.setattr(scraper, 'DETAIL_REQUEST_INTERVAL', 0)
+    return form
+
+
+def run_range(*args, **kwargs):
+    asyncio.run(asyncio.wait_for(scraper.run_range(*args, **kwargs), timeout=10))
+    return [record['ref'] for record in JsonlStore(scraper.OUTPUT_FILE).iter_records()]
+
+
+def test_run_range_splits_truncated_windows(range_env):
+    """Une fenêtre tronquée est coupée jusqu'au jour; chaque consultation est écrite une fois"""
+    start, end = date(2025, 1, 1), date(2025, 1, 8)
+    written = run_range(start, end, window_days=4, window_concurrency=2)
+
+    expected = {f'01{d:02d}-{i}' for d in range(1, 9) for i in range(2)} | {'0101-2'}
+    assert sorted(written) == sorted(expected)
+
+    windows = range_env.windows
+    assert (start, date(2025, 1, 4)) in windows
+    # Découpe 4 -> 2 -> 1 jours: chaque jour finit interrogé seul
+    assert {(ws, we) for ws, we in windows if ws == we} == {(start + timedelta(days=i),) * 2 for i in range(8)}
+    assert all((we - ws).days < 4 for ws, we in windows)
+
+
+def test_run_range_survives_failing_window(range_env):
+    """Une fenêtre en erreur est journalisée; le run se termine avec les autres"""
+    range_env.failing_day = date(2025, 1, 2)
+    written = run_range(date(2025, 1, 1), date(2025, 1, 3), window_days=1)
+    # La consultation 0102-0 est aussi publiée le 03
+    assert sorted(written) == ['0101-0', '0101-1', '0101-2', '0102-0', '0103-0', '0103-1']
+
+
+def test_run_range_stops_when_writer_fails(range_env, monkeypatch):
+    """Un writer en échec arrête le run au lieu de bloquer les workers sur une file pleine"""
+    def failing_write(*args, **kwargs):
+        raise OSError('disque plein')
+
+    monkeypatch.setattr(scraper, 'write_record', failing_write)
+    monkeypatch.setattr(scraper, 'RANGE_RECORDS_BUFFER', 1)
+    with pytest.raises(OSError, match='disque plein'):
+        run_range(date(2025, 1, 1), date(2025, 1, 8), window_days=1)
@@ -0,0 +1,92 @@
+"""
+Tests unitaires pour la normalisation de l'ingestion JSONL -> PostgreSQL
+"""
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy.dialects import postgresql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from ingest_jsonl import normalize_amounts, normalize_dates, normalize_chunk, to_rows, upsert_chunk
+
+
+NOW = datetime(2025, 11, 1, 12, 0)
+
+
+def record(**overrides):
+    data = {
+        'ref': 'AO 12/2025',
+        'orgAcronyme': 'd4q',
+        'objet': '  Travaux  de voirie ',
+        'categorie': 'Travaux',
+        'entite_publique': 'COMMUNE',
+        'estimation_ttc': '1 227 400,00',
+        'caution_provisoire': '20 000,00 MAD',
+        'date_limite': '14/10/2026 09:00',
+        'scraped_at': '2025-10-27T16:02:37+00:00',
+        'url_detail': 'https://www.marchespublics.gov.ma/index.php?refConsultation=1',
+    }
+    data.update(overrides)
+    return data
+
+
+def test_normalize_amounts():
+    values = normalize_amounts(pd.Series(['1 227 400,00', '20 000,00 MAD', '1.227.400,50', '1500.75', None, '', 'n/a']))
+    assert values.tolist()[:4] == [1227400.0, 20000.0, 1227400.5, 1500.75]
+    assert values.iloc[4:].isna().all()
+
+
+def test_normalize_dates():
+    dates = normalize_dates(pd.Series(['14/10/2026 09:00', '09/12/2025', 'bientôt', None]))
+    assert dates.iloc[0] == pd.Timestamp(2026, 10, 14, 9, 0)
+    assert dates.iloc[1] == pd.Timestamp(2025, 12, 9)
+    assert dates.iloc[2:].isna().all()
+
+
+def test_normalize_chunk_maps_fields():
+    rows, rejects = normalize_chunk([record(), record(ref='AO 13/2025', date_limite='01/10/2025 10:00')], NOW)
+    assert rejects.empty
+    first = to_rows(rows)[0]
+    assert first['ref_consultation'] == 'AO 12/2025'
+    assert first['titre'] == first['objet'] == 'Travaux de voirie'
+    assert first['type_marche'] == 'travaux'
+    assert first['montant_estime'] == 1227400.0
+    assert first['cautionnement_provisoire'] == 20000.0
+    assert first['date_publication'] == datetime(2025, 10, 27, 16, 2, 37)
+    assert rows['statut'].tolist() == ['en_cours', 'cloture']
+
+
+def test_normalize_chunk_rejects():
+    rows, rejects = normalize_chunk([
+        record(),
+        record(ref=None),
+        record(categorie='Autre'),
+        record(objet='   '),
+    ], NOW)
+    assert len(rows) == 1
+    assert rejects['motif'].tolist() == ['ref_consultation_manquant', 'type_marche_manquant', 'titre_manquant']
+
+
+def test_missing_values_become_none():
+    rows, _ = normalize_chunk([record(estimation_ttc=None, date_limite=None)], NOW)
+    row = to_rows(rows)[0]
+    assert row['montant_estime'] is None and row['date_limite'] is None
+
+
+def test_upsert_statement():
+    """Un seul INSERT ... ON CONFLICT par bloc, date_publication non écrasée"""
+    executed = []
+
+    class Conn:
+        def execute(self, stmt, rows):
+            executed.append((str(stmt.compile(dialect=postgresql.dialect())), rows))
+
+    rows, _ = normalize_chunk([record(), record(ref='AO 13/2025')], NOW)
+    assert upsert_chunk(Conn(), rows) == 2
+    sql, params = executed[0]
+    assert 'ON CONFLICT (ref_consultation) DO UPDATE' in sql
+    assert 'date_publication = excluded.date_publication' not in sql
+    assert len(params) == 2
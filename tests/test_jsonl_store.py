@@ -0,0 +1,95 @@
+"""
+Tests unitaires pour le store JSONL du scraper httpx
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from jsonl_store import JsonlStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JsonlStore(tmp_path / 'consultations.jsonl', fsync=False)
+
+
+def test_append_updates_id_index(store):
+    """Les IDs ajoutés sont relus depuis l'index sans parser le JSON"""
+    with store:
+        store.append({'id': 'a', 'ref': '1'})
+        store.append({'id': 'b', 'ref': '2'})
+    assert store.load_ids() == {'a', 'b'}
+    assert [r['id'] for r in store.iter_records()] == ['a', 'b']
+
+
+def test_index_rebuilt_when_missing(store):
+    """L'index est reconstruit depuis les données s'il a disparu"""
+    with store:
+        store.append({'id': 'a'})
+    store.index_path.unlink()
+    assert store.load_ids() == {'a'}
+
+
+def test_roll_to_compressed_segments(tmp_path):
+    """Au-delà du seuil, le segment actif est scellé en gzip"""
+    store = JsonlStore(tmp_path / 'c.jsonl', segment_max_bytes=200, flush_every=1, fsync=False)
+    with store:
+        for i in range(20):
+            store.append({'id': str(i), 'objet': 'x' * 50})
+    assert len(store.segments()) >= 2
+    assert [r['id'] for r in store.iter_records()] == [str(i) for i in range(20)]
+    assert store.load_ids() == {str(i) for i in range(20)}
+
+
+def test_compact_keeps_latest_record(store):
+    """La compaction garde le dernier enregistrement de chaque id"""
+    with store:
+        store.append({'id': 'a', 'v': 1})
+        store.append({'id': 'b', 'v': 1})
+        store.append({'id': 'a', 'v': 2})
+    assert store.compact() == (3, 2)
+    records = {r['id']: r['v'] for r in store.iter_records()}
+    assert records == {'a': 2, 'b': 1}
+    assert not store.path.exists()
+    assert store.load_ids() == {'a', 'b'}
+
+
+def test_compact_readable_at_every_step(store, monkeypatch):
+    """Interrompue entre deux suppressions, la compaction laisse un store lisible et à jour"""
+    with store:
+        store.append({'id': 'a', 'v': 1})
+        store.append({'id': 'b', 'v': 1})
+    store.roll()
+    with store:
+        store.append({'id': 'a', 'v': 2})
+
+    def latest():
+        # Lecture "dernière occurrence gagne", comme la compaction
+        return {r['id']: r['v'] for r in store.iter_records()}
+
+    expected = {'a': 2, 'b': 1}
+    states = []
+    unlink = Path.unlink
+
+    def checked_unlink(path, *args, **kwargs):
+        states.append(latest())
+        return unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, 'unlink', checked_unlink)
+    store.compact()
+    monkeypatch.undo()
+    assert len(states) >= 3
+    assert all(state == expected for state in states)
+    assert latest() == expected
+    assert len(store.segments()) == 1
+
+
+def test_clear(store):
+    with store:
+        store.append({'id': 'a'})
+    store.clear()
+    assert list(store.iter_records()) == []
@@ -0,0 +1,78 @@
+"""
+Tests unitaires pour le modèle de page liste du scraper httpx
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from pmmp_consultations_scraper import (
+    BASE_URL, ListPage, parse_consultation_links, find_next_page_url
+)
+
+
+LIST_HTML = """
+<html><body>
+<form action="/index.php?page=entreprise.EntrepriseAdvancedSearch&amp;searchAnnCons" method="post">
+  <input type="hidden" name="PRADO_PAGESTATE" value="abc">
+  <input type="checkbox" name="unchecked">
+  <input type="checkbox" name="checked" checked value="on">
+  <textarea name="commentaire">texte</textarea>
+  <select name="ctl0$CONTENU_PAGE$resultSearch$listePageSizeTop">
+    <option value="10" selected>10</option>
+    <option value="500">500</option>
+  </select>
+  <table>
+    <tr><td><a href="/index.php?page=entreprise.EntrepriseDetailsConsultation&amp;refConsultation=1&amp;orgAcronyme=A&amp;x=1"><img src="i.png"></a></td></tr>
+    <tr><td><a href="/index.php?page=entreprise.EntrepriseDetailConsultation&amp;refConsultation=2&amp;orgAcronyme=B"><img src="i.png"></a></td></tr>
+    <tr><td><a href="/index.php?page=entreprise.EntrepriseDetailsConsultation&amp;refConsultation=1&amp;orgAcronyme=A">doublon</a></td></tr>
+    <tr><td><a href="/index.php?page=autre">autre</a></td></tr>
+  </table>
+  <a href="/index.php?page=liste&amp;currentPage=2">Page <b>suivante</b> &gt;</a>
+</form>
+</body></html>
+"""
+
+
+def test_detail_links_match_reference():
+    """Les liens détail sont identiques à la version BeautifulSoup"""
+    page = ListPage(LIST_HTML)
+    assert page.detail_links == parse_consultation_links(LIST_HTML, BASE_URL)
+    assert len(page.detail_links) == 2
+
+
+def test_next_page_matches_reference():
+    page = ListPage(LIST_HTML)
+    assert page.next_page_url == find_next_page_url(LIST_HTML, BASE_URL)
+    assert page.next_page_url.endswith('currentPage=2')
+
+
+def test_rel_next_preferred():
+    html = '<a href="/p?currentPage=3">3</a><a rel="nofollow next" href="/p?currentPage=2">&gt;</a>'
+    assert ListPage(html).next_page_url == find_next_page_url(html, BASE_URL)
+
+
+def test_page_size_request():
+    """Le payload reprend le formulaire et force la taille de page à 500"""
+    payload, action = ListPage(LIST_HTML).page_size_request('500')
+    assert action == '/index.php?page=entreprise.EntrepriseAdvancedSearch&searchAnnCons'
+    assert payload == {
+        'PRADO_PAGESTATE': 'abc',
+        'checked': 'on',
+        'commentaire': 'texte',
+        'ctl0$CONTENU_PAGE$resultSearch$listePageSizeTop': '500',
+    }
+
+
+def test_page_size_already_set():
+    html = LIST_HTML.replace('<option value="10" selected>', '<option value="10">').replace(
+        '<option value="500">', '<option value="500" selected>'
+    )
+    assert ListPage(html).page_size_request('500') is None
+
+
+def test_empty_page():
+    page = ListPage('')
+    assert page.detail_links == []
+    assert page.next_page_url is None
+    assert page.page_size_request('500') is None
@@ -0,0 +1,63 @@
+"""
+Tests de la pagination par curseur (keyset) des listes de l'API
+"""
+import pytest
+from datetime import datetime
+
+from api.crud import decode_cursor, encode_cursor, get_consultations
+from database.models import Consultation
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor(datetime(2025, 10, 1, 9, 30), 42)
+    assert decode_cursor(cursor) == (datetime(2025, 10, 1, 9, 30), 42)
+    with pytest.raises(ValueError):
+        decode_cursor('pas-un-curseur')
+
+
+def test_cursor_pages_cover_offset_order(db):
+    """Les pages par curseur donnent exactement l'ordre des pages par offset"""
+    expected = [c.ref_consultation for c in get_consultations(db, limit=100)]
+    seen, cursor = [], None
+    while True:
+        page = get_consultations(db, limit=7, cursor=cursor)
+        seen.extend(c.ref_consultation for c in page)
+        if len(page) < 7:
+            break
+        last = page[-1]
+        cursor = encode_cursor(last.date_publication, last.id_interne)
+    assert seen == expected
+    assert len(seen) == 25
+
+
+def test_cursor_stable_when_rows_inserted(db):
+    """Une insertion en tête ne décale pas la page suivante (contrairement à OFFSET)"""
+    first = get_consultations(db, limit=5)
+    cursor = encode_cursor(first[-1].date_publication, first[-1].id_interne)
+    db.add(Consultation(
+        ref_consultation='AO-NEW', organisme_acronyme='ORG', titre='Nouvelle',
+        type_marche='travaux', statut='en_cours', date_publication=datetime(2025, 10, 2),
+    ))
+    db.commit()
+    second = get_consultations(db, limit=5, cursor=cursor)
+    assert second[0].ref_consultation == get_consultations(db, limit=6, offset=6)[0].ref_consultation
+
+
+def test_api_next_cursor_header(client):
+    response = client.get('/api/v1/consultations?limit=10')
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    cursor = response.headers['X-Next-Cursor']
+    assert 'rel="next"' in response.headers['Link']
+
+    refs = [c['ref_consultation'] for c in response.json()]
+    while cursor:
+        response = client.get(f'/api/v1/consultations?limit=10&cursor={cursor}')
+        refs.extend(c['ref_consultation'] for c in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+    assert len(refs) == len(set(refs)) == 25
+
+
+def test_api_invalid_cursor(client):
+    assert client.get('/api/v1/consultations?cursor=xxx').status_code == 400
+    assert client.get('/api/v1/pv?cursor=xxx').status_code == 400
@@ -0,0 +1,61 @@
+"""
+Tests unitaires pour l'exécuteur de parsing et l'extraction pure du spider
+"""
+import asyncio
+import pytest
+from scraper.parse_executor import ParseExecutor
+from scraper.spiders.consultations_spider import extract_list_page, extract_detail_page
+
+
+LIST_HTML = b"""
+<html><body>
+<table class="data-table"><tbody>
+  <tr>
+    <td>AO-12/2025</td><td>Travaux de voirie</td><td>COMMUNE</td><td>Travaux</td>
+    <td>01/10/2025</td><td>15/10/2025 10:00</td><td>En cours</td>
+    <td><a href="/index.php?page=entreprise.EntrepriseDetailsConsultation&amp;refConsultation=12">voir</a></td>
+  </tr>
+</tbody></table>
+<a rel="next" href="/index.php?page=liste&amp;currentPage=2">Suivant</a>
+</body></html>
+"""
+
+DETAIL_HTML = b"""
+<html><body>
+<div class="objet">  Travaux   de voirie </div>
+<a href="mailto:contact@commune.ma">contact</a>
+<a href="/avis.pdf">Avis</a>
+</body></html>
+"""
+
+
+def test_extract_list_page():
+    page = extract_list_page(LIST_HTML, 'https://www.marchespublics.gov.ma/index.php')
+    assert page['has_table'] and page['row_count'] == 1
+    fields = page['rows'][0]['fields']
+    assert fields['ref_consultation'] and fields['url_detail']
+    assert fields['statut'] == 'en_cours'
+    assert page['next_page'].endswith('currentPage=2')
+
+
+def test_extract_detail_page():
+    detail = extract_detail_page(DETAIL_HTML, 'https://www.marchespublics.gov.ma/index.php')
+    assert detail['fields']['organisme_email'] == 'contact@commune.ma'
+    assert detail['fields']['url_avis'] == 'https://www.marchespublics.gov.ma/avis.pdf'
+    assert detail['lots'] == []
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_pool_matches_inline(workers):
+    """Le résultat est identique que le parsing soit en ligne ou dans le pool"""
+    executor = ParseExecutor(workers, name=f'test-{workers}').start()
+    try:
+        result = asyncio.run(executor.run(extract_list_page, LIST_HTML, 'https://www.marchespublics.gov.ma/'))
+    finally:
+        executor.shutdown()
+    expected = extract_list_page(LIST_HTML, 'https://www.marchespublics.gov.ma/')
+    for row in result['rows'] + expected['rows']:
+        row['fields'].pop('date_extraction')
+    assert result == expected
+    assert executor.stats['completed'] == 1
+    assert executor.queue_depth == 0
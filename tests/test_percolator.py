@@ -0,0 +1,107 @@
+"""
+Tests du percolateur de recherches sauvegardées (alertes)
+"""
+import random
+
+from database.models import NotificationAlerte, RechercheSauvegardee
+from database.percolator import Document, Percolator, SearchSpec, load_percolator, percolate, tokenize
+
+
+def doc(titre='', objet='', organisme='ORG', type_marche='travaux', montant=None):
+    return Document.from_consultation({
+        'ref_consultation': 'AO-X', 'titre': titre, 'objet': objet,
+        'organisme_acronyme': organisme, 'type_marche': type_marche, 'montant_estime': montant,
+    })
+
+
+def test_tokenize():
+    assert tokenize("Réhabilitation des Écoles rurales") == {'rehabilitation', 'ecole', 'rurale'}
+    assert tokenize(None) == set()
+
+
+def test_match_semantics():
+    percolator = Percolator([
+        SearchSpec(1, frozenset(tokenize('école'))),
+        SearchSpec(2, frozenset(tokenize('station épuration'))),
+        SearchSpec(3, frozenset(tokenize('route')), organisme='ORMVA'),
+        SearchSpec(4, frozenset(), type_marche='services'),
+        SearchSpec(5, frozenset(tokenize('route')), montant_min=1_000_000, montant_max=5_000_000),
+    ])
+    # Accents, pluriel, titre ou objet
+    assert percolator.match(doc('Construction des écoles', '')) == [1]
+    # Tous les mots-clés sont requis
+    assert percolator.match(doc('Station de pompage')) == []
+    assert percolator.match(doc('Station', "Extension de l'épuration")) == [2]
+    # Filtres organisme / type / montant
+    assert percolator.match(doc('Route nationale', organisme='ormva')) == [3]
+    assert percolator.match(doc('Gardiennage', type_marche='services')) == [4]
+    assert percolator.match(doc('Route', montant=2_000_000)) == [5]
+    assert percolator.match(doc('Route', montant=6_000_000)) == []
+    # Montant inconnu: les recherches avec filtre de montant ne correspondent pas
+    assert percolator.match(doc('Route')) == []
+
+    percolator.remove(1)
+    assert percolator.match(doc('Construction des écoles')) == []
+    assert len(percolator) == 4
+
+
+def test_same_as_naive():
+    rng = random.Random(7)
+    words = [f'mot{i}' for i in range(40)]
+    searches = [
+        SearchSpec(
+            i, frozenset(rng.sample(words, rng.randint(0, 3))),
+            organisme=rng.choice([None, 'A', 'B']),
+            type_marche=rng.choice([None, 'travaux', 'services']),
+            montant_min=rng.choice([None, 50_000.0, 2_000_000.0]),
+            montant_max=rng.choice([None, 1_000_000.0, 80_000_000.0]),
+        )
+        for i in range(500)
+    ]
+    percolator = Percolator(searches)
+    # Emplacements libérés puis réutilisés
+    for search in searches[:100]:
+        percolator.remove(search.id)
+    for search in searches[:50]:
+        percolator.add(search)
+    active = searches[:50] + searches[100:]
+
+    for _ in range(300):
+        document = Document(
+            'AO-X', frozenset(rng.sample(words, rng.randint(0, 12))),
+            organisme=rng.choice(['A', 'B', 'C']), type_marche=rng.choice(['travaux', 'services']),
+            montant=rng.choice([None, rng.uniform(0, 1e8)]),
+        )
+        expected = sorted(s.id for s in active if s.matches(document))
+        assert sorted(percolator.match(document)) == expected
+
+
+def test_percolate_writes_notifications(db, statements):
+    db.add_all([
+        RechercheSauvegardee(abonne='a@example.ma', mots_cles='consultation', organisme_acronyme='ORG'),
+        RechercheSauvegardee(abonne='b@example.ma', mots_cles='consultation', type_marche='services'),
+        RechercheSauvegardee(abonne='c@example.ma', mots_cles='consultation', active=False),
+    ])
+    db.commit()
+    percolator = load_percolator(db)
+    assert len(percolator) == 2
+
+    consultations = [{'ref_consultation': 'AO-01', 'titre': 'Consultation 1', 'organisme_acronyme': 'ORG',
+                      'type_marche': 'travaux'}]
+    assert percolate(db, percolator, consultations) == 1
+    # Re-crawl: pas de seconde notification
+    assert percolate(db, percolator, consultations) == 0
+    notification = db.query(NotificationAlerte).one()
+    assert notification.ref_consultation == 'AO-01' and not notification.envoyee
+
+    # Notification créée entre-temps par un autre écrivain: ignorée sans erreur, le reste du lot est écrit
+    db.add(NotificationAlerte(id_recherche=1, ref_consultation='AO-02'))
+    db.commit()
+    consultations.append({'ref_consultation': 'AO-02', 'titre': 'Consultation 2', 'organisme_acronyme': 'ORG'})
+    consultations.append({'ref_consultation': 'AO-03', 'titre': 'Consultation 3', 'organisme_acronyme': 'ORG'})
+    del statements[:]
+    assert percolate(db, percolator, consultations) == 1
+    # Pas de lecture préalable: un seul INSERT ... ON CONFLICT DO NOTHING
+    assert [s.split()[0] for s in statements] == ['INSERT']
+    assert 'ON CONFLICT' in statements[0]
+    assert sorted(n.ref_consultation for n in db.query(NotificationAlerte)) == ['AO-01', 'AO-02', 'AO-03']
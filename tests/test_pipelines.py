@@ -1,10 +1,14 @@
 """
 Tests unitaires pour les pipelines
 """
+import logging
+
 import pytest
-from scraper.pipelines import ValidationPipeline, CleaningPipeline
+from scraper import pipelines
+from scraper.pipelines import ValidationPipeline, CleaningPipeline, DatabasePipeline
 from scraper.items import ConsultationItem
 from scrapy.exceptions import DropItem
+from twisted.internet import task
 
 
 def test_validation_pipeline_valid_item():
@@ -45,5 +49,27 @@ def test_cleaning_pipeline():
     # assert isinstance(result['montant_estime'], float)
 
 
+def test_database_pipeline_bumps_version_on_timer(db, monkeypatch):
+    """Version publiée au tick suivant une écriture, même sans autre item; rien sans écriture"""
+    bumps = []
+    monkeypatch.setattr(pipelines, 'SessionLocal', lambda: db)
+    monkeypatch.setattr(pipelines, 'bump_data_version', lambda session: bumps.append(session) or len(bumps))
+    spider = type('Spider', (), {'logger': logging.getLogger('test')})()
+    clock = task.Clock()
+    pipeline = DatabasePipeline(clock=clock)
+    pipeline.open_spider(spider)
+
+    item = ConsultationItem(ref_consultation='AO-00', titre='Consultation modifiée', organisme_acronyme='ORG')
+    pipeline.process_item(item, spider)
+    assert bumps == []
+    clock.advance(pipeline.data_version_interval)
+    assert len(bumps) == 1
+    clock.advance(pipeline.data_version_interval)
+    assert len(bumps) == 1
+
+    pipeline.close_spider(spider)
+    assert len(bumps) == 1 and not pipeline.version_timer.running
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
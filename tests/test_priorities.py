@@ -0,0 +1,134 @@
+"""
+Tests unitaires pour la priorisation des requêtes de détail
+"""
+import pytest
+from datetime import datetime, timedelta
+from scrapy.http import Request
+from scrapy.utils.test import get_crawler
+from scraper.items import ConsultationItem
+from scraper.priorities import DetailPriorityPolicy
+from scraper.middlewares import DetailSchedulingMiddleware
+from scraper.spiders.consultations_spider import ConsultationsSpider
+
+
+NOW = datetime(2025, 10, 1, 12, 0)
+
+
+def make_item(ref, hours_left=None, statut='en_cours', now=NOW):
+    item = ConsultationItem()
+    item['ref_consultation'] = ref
+    item['statut'] = statut
+    item['date_limite'] = now + timedelta(hours=hours_left) if hours_left is not None else None
+    return item
+
+
+def test_policy_deadline_proximity():
+    """Une date limite proche passe avant une date lointaine"""
+    policy = DetailPriorityPolicy()
+    proche = policy.priority_for(make_item('A', hours_left=10), now=NOW)
+    lointaine = policy.priority_for(make_item('B', hours_left=24 * 60), now=NOW)
+    depassee = policy.priority_for(make_item('C', hours_left=-5), now=NOW)
+    assert proche > lointaine > depassee
+
+
+def test_policy_new_before_known():
+    """Une consultation inconnue passe avant une consultation déjà en base"""
+    policy = DetailPriorityPolicy(known_refs={'CONNUE'})
+    nouvelle = policy.priority_for(make_item('NOUVELLE', hours_left=24 * 60), now=NOW)
+    connue = policy.priority_for(make_item('CONNUE', hours_left=10), now=NOW)
+    assert nouvelle > connue
+
+
+def test_policy_statut():
+    """Une consultation annulée passe après une consultation en cours"""
+    policy = DetailPriorityPolicy()
+    en_cours = policy.priority_for(make_item('A', hours_left=48), now=NOW)
+    annulee = policy.priority_for(make_item('B', hours_left=48, statut='annule'), now=NOW)
+    assert en_cours > annulee
+
+
+@pytest.fixture
+def middleware():
+    crawler = get_crawler(ConsultationsSpider, {
+        'DETAIL_MAX_IN_FLIGHT': 2,
+        'DETAIL_MAX_PENDING': 2,
+    })
+    crawler.stats.open_spider(None)
+    crawled = []
+    crawler.engine = type('Engine', (), {'crawled': crawled, 'crawl': lambda self, r: crawled.append(r)})()
+    return DetailSchedulingMiddleware.from_crawler(crawler)
+
+
+def detail_request(ref, hours_left):
+    return Request(f'https://example.org/{ref}', meta={'consultation_item': make_item(ref, hours_left, now=datetime.now())})
+
+
+def test_middleware_caps_and_releases(middleware):
+    """Au-delà du quota, les requêtes sont retenues puis relâchées par priorité"""
+    spider = ConsultationsSpider()
+    requests = [
+        detail_request('R1', 24 * 60),
+        detail_request('R2', 24 * 60),
+        detail_request('R3', 24 * 60),
+        detail_request('R4', 2),
+    ]
+    yielded = list(middleware.process_spider_output(None, requests, spider))
+    assert [r.url for r in yielded] == ['https://example.org/R1', 'https://example.org/R2']
+    assert len(middleware.pending) == 2
+
+    middleware.request_left_downloader(yielded[0], spider)
+    assert middleware.crawler.engine.crawled[0].url == 'https://example.org/R4'
+
+    # Un retry (copie de la requête) ne libère pas de second slot
+    middleware.request_left_downloader(yielded[0], spider)
+    assert len(middleware.crawler.engine.crawled) == 1
+
+
+def test_middleware_overflow_emits_list_item(middleware):
+    """File retenue pleine: la ligne la moins prioritaire est émise sans détail, pas perdue"""
+    spider = ConsultationsSpider()
+    requests = [detail_request(f'R{i}', 24 * 60) for i in range(4)] + [detail_request('URGENT', 2)]
+    yielded = list(middleware.process_spider_output(None, requests, spider))
+    assert len(middleware.pending) == 2
+    assert middleware.pending[-1][2].url == 'https://example.org/URGENT'
+    overflow = [element for element in yielded if isinstance(element, ConsultationItem)]
+    assert [item['ref_consultation'] for item in overflow] == ['R3']
+    assert middleware.crawler.stats.get_value('detail_scheduling/overflow') == 1
+
+
+def test_middleware_defers_list_pages_when_full(middleware):
+    """Contre-pression: la pagination attend que la file retenue se vide"""
+    spider = ConsultationsSpider()
+    output = [detail_request(f'R{i}', 24 * 60) for i in range(4)] + [Request('https://example.org/page2')]
+    yielded = list(middleware.process_spider_output(None, output, spider))
+    assert [r.url for r in yielded] == ['https://example.org/R0', 'https://example.org/R1']
+    assert [r.url for r in middleware.deferred] == ['https://example.org/page2']
+
+    middleware.request_left_downloader(yielded[0], spider)
+    crawled = [r.url for r in middleware.crawler.engine.crawled]
+    assert crawled == ['https://example.org/R2', 'https://example.org/page2']
+    assert not middleware.deferred
+
+
+def test_middleware_errback_releases_slot(middleware):
+    """Requête écartée avant le downloader (seul l'errback est appelé): le slot est rendu"""
+    spider = ConsultationsSpider()
+    calls = []
+    requests = [detail_request(f'R{i}', 24 * 60) for i in range(3)]
+    requests[0] = requests[0].replace(errback=calls.append)
+    yielded = list(middleware.process_spider_output(None, requests, spider))
+    failure = type('Failure', (), {'request': yielded[0]})()
+    yielded[0].errback(failure)
+    assert calls == [failure]
+    assert middleware.in_flight == 2
+    assert [r.url for r in middleware.crawler.engine.crawled] == ['https://example.org/R2']
+    # Idempotent: le downloader peut aussi signaler la même requête
+    middleware.request_left_downloader(yielded[0], spider)
+    assert middleware.in_flight == 2
+
+
+def test_non_detail_requests_pass_through(middleware):
+    """Les pages liste ne sont jamais retenues"""
+    spider = ConsultationsSpider()
+    requests = [Request(f'https://example.org/page{i}') for i in range(5)]
+    assert len(list(middleware.process_spider_output(None, requests, spider))) == 5
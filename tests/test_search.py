@@ -0,0 +1,70 @@
+"""
+Tests de la recherche de consultations
+"""
+from database.migrations import migration_files, split_statements
+
+
+def test_search_route_not_shadowed_by_detail(client):
+    """/consultations/search est servie par la recherche, pas par le détail {ref}"""
+    response = client.get('/api/v1/consultations/search?q=Consultation 1')
+    assert response.status_code == 200
+    refs = {c['ref_consultation'] for c in response.json()}
+    assert 'AO-01' in refs and 'AO-12' in refs
+
+
+def test_search_pagination(client):
+    first = client.get('/api/v1/consultations/search?q=Consultation&limit=10').json()
+    second = client.get('/api/v1/consultations/search?q=Consultation&limit=10&offset=10').json()
+    assert len(first) == len(second) == 10
+    assert not {c['ref_consultation'] for c in first} & {c['ref_consultation'] for c in second}
+
+
+def test_fulltext_migration_statements():
+    """La fonction $$ ... $$ reste une seule instruction; l'index GIN est créé hors transaction"""
+    path = next(p for p in migration_files() if p.stem == '002_consultations_fulltext')
+    statements = split_statements(path.read_text(encoding='utf-8'))
+    assert len(statements) == 4
+    assert statements[1].startswith('CREATE OR REPLACE FUNCTION f_unaccent')
+    assert 'GENERATED ALWAYS AS' in statements[2]
+    assert statements[3].startswith('CREATE INDEX CONCURRENTLY')
+
+
+def test_match_modes(db):
+    """contains / exact / prefix / fuzzy sur l'organisme, insensibles à la casse"""
+    from api.crud import get_consultations
+    from database.models import Consultation
+
+    db.add(Consultation(
+        ref_consultation='AO-ONEE', organisme_acronyme='ONEE_BE', titre='Autre',
+        type_marche='services', statut='en_cours', date_publication=db.query(Consultation).first().date_publication,
+    ))
+    db.commit()
+    refs = lambda **kw: {c.ref_consultation for c in get_consultations(db, limit=100, **kw)}
+    assert refs(organisme='org', organisme_match='exact') == {f'AO-{i:02d}' for i in range(25)}
+    assert refs(organisme='onee', organisme_match='prefix') == {'AO-ONEE'}
+    assert refs(organisme='e_b', organisme_match='fuzzy') == {'AO-ONEE'}
+    # Par défaut: sous-chaîne simple, comme avant les modes
+    assert refs(organisme='NEE_') == {'AO-ONEE'}
+    # Les jokers LIKE de la valeur sont échappés
+    assert refs(organisme='%', organisme_match='prefix') == set()
+
+
+def test_invalid_match_mode(client):
+    assert client.get('/api/v1/consultations?organisme=ORG&organisme_match=regex').status_code == 422
+    assert len(client.get('/api/v1/consultations?organisme=or&organisme_match=prefix').json()) == 25
+
+
+def test_similarity_only_on_fuzzy():
+    """Sur PostgreSQL, la similarité trigramme (ONEE ~ ONEP) n'est appliquée qu'en mode fuzzy"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from api.crud import match_filter
+    from database.models import Consultation
+
+    engine = create_engine('postgresql://pmmp@localhost/pmmp')  # aucune connexion ouverte
+    session = Session(bind=engine)
+    sql = lambda mode: str(match_filter(session, Consultation.organisme_acronyme, 'ONEE', mode).compile(engine))
+    assert 'ILIKE' in sql('contains') and ' %% ' not in sql('contains')
+    assert ' %% ' in sql('fuzzy')
+    assert sql('contains') == str(match_filter(session, Consultation.organisme_acronyme, 'ONEE').compile(engine))
@@ -0,0 +1,112 @@
+"""
+Tests de la sérialisation rapide (négociation JSON / NDJSON / MessagePack, champs fields=)
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from api.schemas import AttributionResponse, ConsultationResponse
+from api.serialization import JSON, MSGPACK, NDJSON, msgpack, negotiate
+from database.models import Attribution, Consultation, Lot
+
+
+@pytest.fixture
+def typed_rows(db):
+    # Décimaux, dates et datetimes avec microsecondes: formats à conserver à l'identique
+    db.add(Consultation(
+        ref_consultation='SER-1', organisme_acronyme='SER', titre='Sérialisation',
+        type_marche='services', statut='cloture',
+        date_publication=datetime(2025, 11, 2, 3, 4, 5, 123000), montant_estime=Decimal('12.50'),
+    ))
+    db.add(Attribution(
+        ref_consultation='SER-1', organisme_acronyme='SER', entreprise_nom='Entreprise',
+        date_attribution=date(2025, 11, 3), montant_ttc=Decimal('100.10'), taux_rabais=Decimal('3.25'),
+    ))
+    db.commit()
+
+
+def pydantic_json(objects, schema) -> list:
+    """Sortie de référence: validation Pydantic objet par objet (ancien chemin)"""
+    return [json.loads(schema.model_validate(obj).model_dump_json()) for obj in objects]
+
+
+def test_negotiate():
+    assert negotiate(None) == JSON
+    assert negotiate('*/*') == JSON
+    assert negotiate('text/html') == JSON
+    assert negotiate('application/x-ndjson') == NDJSON
+    assert negotiate('application/json;q=0.5, application/x-ndjson') == NDJSON
+    assert negotiate('application/x-ndjson;q=0, */*') == JSON
+    if msgpack is None:
+        assert negotiate('application/msgpack, application/json;q=0.1') == JSON
+    else:
+        assert negotiate('application/msgpack, application/json;q=0.1') == MSGPACK
+
+
+def test_json_identical_to_pydantic(client, db, typed_rows):
+    consultations = db.query(Consultation).order_by(Consultation.date_publication.desc(), Consultation.id_interne.desc())
+    response = client.get('/api/v1/consultations?limit=100')
+    assert response.headers['content-type'] == JSON
+    assert response.json() == pydantic_json(consultations, ConsultationResponse)
+
+    response = client.get('/api/v1/attributions')
+    assert response.json() == pydantic_json(db.query(Attribution), AttributionResponse)
+    assert response.json()[0]['montant_ttc'] == 100.1
+    assert response.json()[0]['date_attribution'] == '2025-11-03'
+
+
+def test_ndjson(client):
+    response = client.get('/api/v1/consultations?limit=10', headers={'Accept': 'application/x-ndjson'})
+    assert response.headers['content-type'] == NDJSON
+    lines = response.text.splitlines()
+    assert len(lines) == 10
+    assert [json.loads(line) for line in lines] == client.get('/api/v1/consultations?limit=10').json()
+    # Le curseur reste exposé quel que soit le format
+    assert 'x-next-cursor' in response.headers
+
+
+def test_msgpack(client, typed_rows):
+    pytest.importorskip('msgpack')
+    response = client.get('/api/v1/consultations?limit=100', headers={'Accept': 'application/msgpack'})
+    assert response.headers['content-type'] == MSGPACK
+    assert msgpack.unpackb(response.content) == client.get('/api/v1/consultations?limit=100').json()
+
+
+def test_sparse_fields_projected(client, statements):
+    response = client.get('/api/v1/consultations?limit=5&fields=titre,ref_consultation,montant_estime')
+    assert response.status_code == 200
+    # Ordre du schéma, quel que soit l'ordre demandé
+    assert list(response.json()[0]) == ['ref_consultation', 'titre', 'montant_estime']
+    select_sql = statements[-1].split(' FROM ')[0]
+    assert 'organisme_nom_complet' not in select_sql and 'url_detail' not in select_sql
+
+    # Les clés de pagination sont lues même si elles ne sont pas demandées
+    first = client.get('/api/v1/consultations?limit=10&fields=ref_consultation')
+    second = client.get(f"/api/v1/consultations?limit=10&fields=ref_consultation&cursor={first.headers['x-next-cursor']}")
+    full = client.get('/api/v1/consultations?limit=20').json()
+    assert first.json() + second.json() == [{'ref_consultation': c['ref_consultation']} for c in full]
+
+
+def test_sparse_fields_unknown(client):
+    response = client.get('/api/v1/consultations?fields=ref_consultation,page_html_archivee')
+    assert response.status_code == 400
+    assert 'page_html_archivee' in response.json()['detail']
+    assert client.get('/api/v1/attributions?fields=objet').status_code == 400
+
+
+def test_sparse_fields_detail(client, db, statements):
+    db.add(Lot(ref_consultation='AO-00', numero_lot='1', designation='Lot unique'))
+    db.commit()
+    response = client.get('/api/v1/consultations/AO-00?fields=titre,date_limite')
+    assert response.json() == {'titre': 'Consultation 0', 'date_limite': None}
+    assert 'objet' not in statements[-1].split(' FROM ')[0]
+    assert not any('FROM lots' in sql for sql in statements)
+
+    response = client.get('/api/v1/consultations/AO-00?fields=titre,lots')
+    assert response.json() == {
+        'titre': 'Consultation 0',
+        'lots': [{'numero_lot': '1', 'designation': 'Lot unique', 'montant_estime': None}],
+    }
+    assert client.get('/api/v1/consultations/INCONNUE?fields=titre').status_code == 404
@@ -0,0 +1,74 @@
+"""
+Tests des statistiques globales
+"""
+import re
+
+from database.migrations import migration_files, split_statements
+
+
+def test_stats_fallback_without_postgres(client):
+    """Hors PostgreSQL, /api/v1/stats agrège directement les tables sources"""
+    stats = client.get('/api/v1/stats').json()
+    assert stats['total_consultations'] == 25
+    assert stats['consultations_en_cours'] == 25
+    assert stats['nombre_organismes'] == 1
+    assert stats['total_attributions'] == 0
+
+
+def test_stats_migration_statements():
+    """Les corps plpgsql restent des instructions uniques; la réconciliation initialise la ligne"""
+    path = next(p for p in migration_files() if p.stem == '004_stats_globales')
+    statements = split_statements(path.read_text(encoding='utf-8'))
+    functions = [s for s in statements if s.startswith('CREATE OR REPLACE FUNCTION')]
+    assert len(functions) == 4
+    assert all(s.rstrip(';').endswith('$$') for s in functions)
+    assert statements[-1] == 'SELECT reconcile_stats_globales();'
+
+
+def test_stats_statement_triggers_migration():
+    """Un trigger par instruction et par opération, avec ses tables de transition"""
+    path = next(p for p in migration_files() if p.stem == '009_stats_globales_statement_triggers')
+    statements = split_statements(path.read_text(encoding='utf-8'))
+    triggers = [s for s in statements if s.startswith('CREATE TRIGGER')]
+    assert len(triggers) == 6
+    assert all('FOR EACH STATEMENT' in s and 'FOR EACH ROW' not in s for s in triggers)
+    for trigger in triggers:
+        operation = re.search(r'AFTER (\w+) ON', trigger).group(1)
+        expected = {
+            'INSERT': 'REFERENCING NEW TABLE AS nouvelles',
+            'UPDATE': 'REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles',
+            'DELETE': 'REFERENCING OLD TABLE AS anciennes',
+        }[operation]
+        assert expected in trigger
+    # Les anciens triggers par ligne sont supprimés avant la réconciliation
+    assert 'DROP TRIGGER IF EXISTS trg_stats_consultations ON consultations;' in statements
+    assert 'DROP TRIGGER IF EXISTS trg_stats_attributions ON attributions;' in statements
+    assert statements[-1] == 'SELECT reconcile_stats_globales();'
+
+
+def test_monthly_series(client):
+    """Un point par mois, filtrable par statut; les 25 consultations tombent en septembre / octobre 2025"""
+    series = client.get('/api/v1/stats/mensuelles').json()
+    assert [p['mois'][:7] for p in series] == ['2025-09', '2025-10']
+    assert sum(p['nombre_consultations'] for p in series) == 25
+    assert client.get('/api/v1/stats/mensuelles?statut=cloture').json() == []
+    october = client.get('/api/v1/stats/mensuelles?date_debut=2025-10-15').json()
+    assert [p['mois'][:7] for p in october] == ['2025-10']
+
+
+def test_top_organismes(client):
+    top = client.get('/api/v1/stats/organismes?limit=5').json()
+    assert top == [{
+        'acronyme': 'ORG', 'nom': None, 'nombre_consultations': 25,
+        'montant_total': 0.0, 'derniere_publication': '2025-10-01T00:00:00',
+    }]
+    assert client.get('/api/v1/stats/attributaires').json() == []
+
+
+def test_analytics_migration_unique_indexes():
+    """REFRESH ... CONCURRENTLY: chaque vue matérialisée a un index unique sur colonnes"""
+    path = next(p for p in migration_files() if p.stem == '005_analytics_materialized_views')
+    sql = path.read_text(encoding='utf-8')
+    for view in ('v_stats_consultations', 'v_top_organismes', 'v_top_attributaires'):
+        assert f'CREATE MATERIALIZED VIEW IF NOT EXISTS {view}' in sql
+        assert re.search(rf'CREATE UNIQUE INDEX IF NOT EXISTS \w+\s+ON {view} \(', sql)